@@ -0,0 +1,296 @@
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.models import User, Patient, Appointment
+from app.dashboard import GENDERS, BLOOD_TYPES, APPOINTMENT_STATUSES, AGE_BANDS, years_ago
+from app.replica import read_only
+from app import db
+from datetime import datetime, date
+from sqlalchemy import func
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:  # Analytics is optional; the endpoint reports 503 without numpy
+    np = None
+
+analytics_bp = Blueprint('analytics', __name__)
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+def _codes(labels):
+    return {label: code for code, label in enumerate(labels)}
+
+_GENDER_CODES = _codes(GENDERS)
+_BLOOD_CODES = _codes(BLOOD_TYPES)
+_STATUS_CODES = _codes(APPOINTMENT_STATUSES)
+
+class ColumnTable:
+    """Columns of one table as NumPy arrays, kept sorted by primary key.
+    
+    `columns` is a list of (name, dtype, convert) where convert maps the database
+    value to what NumPy stores (codes for categories, NaT/-1 for missing values).
+    """
+    
+    def __init__(self, columns):
+        self.columns = columns
+        self.ids = np.empty(0, dtype=np.int64)
+        self.data = {name: np.empty(0, dtype=dtype) for name, dtype, convert in columns}
+    
+    def __len__(self):
+        return len(self.ids)
+    
+    def _build(self, rows):
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        data = {}
+        for position, (name, dtype, convert) in enumerate(self.columns, start=1):
+            data[name] = np.array([convert(row[position]) for row in rows], dtype=dtype)
+        return ids, data
+    
+    def replace(self, rows):
+        """Load all rows, discarding the current contents"""
+        ids, data = self._build(rows)
+        order = np.argsort(ids, kind='stable')
+        self.ids = ids[order]
+        self.data = {name: values[order] for name, values in data.items()}
+    
+    def upsert(self, rows):
+        """Overwrite rows whose id is already loaded and append the rest"""
+        if not rows:
+            return
+        ids, data = self._build(rows)
+        positions = np.searchsorted(self.ids, ids)
+        clipped = np.minimum(positions, max(len(self.ids) - 1, 0))
+        existing = (positions < len(self.ids)) & (self.ids[clipped] == ids) if len(self.ids) else np.zeros(len(ids), dtype=bool)
+        
+        for name, values in data.items():
+            self.data[name][positions[existing]] = values[existing]
+        
+        added = ~existing
+        if added.any():
+            merged_ids = np.concatenate([self.ids, ids[added]])
+            order = np.argsort(merged_ids, kind='stable')
+            self.ids = merged_ids[order]
+            self.data = {name: np.concatenate([self.data[name], values[added]])[order]
+                         for name, values in data.items()}
+
+class AnalyticsSnapshot:
+    """Columnar copy of patients and appointments for clinic-wide statistics.
+    
+    Refreshes are incremental: only rows whose updated_at is at or after the last
+    seen value are re-read. A table is reloaded in full when its row count no longer
+    matches (rows deleted outright never show up in an updated_at scan).
+    """
+    
+    def __init__(self):
+        self.patients = ColumnTable([
+            ('user_id', np.int64, lambda value: value),
+            ('date_of_birth', 'datetime64[D]', lambda value: value),
+            ('gender', np.int8, lambda value: _GENDER_CODES.get(value, -1)),
+            ('blood_type', np.int8, lambda value: _BLOOD_CODES.get(value, -1)),
+            ('created_at', 'datetime64[s]', lambda value: value),
+            ('is_active', np.bool_, lambda value: bool(value)),
+        ])
+        self.appointments = ColumnTable([
+            ('patient_id', np.int64, lambda value: value),
+            ('doctor_id', np.int64, lambda value: -1 if value is None else value),
+            ('appointment_date', 'datetime64[s]', lambda value: value),
+            ('status', np.int8, lambda value: _STATUS_CODES.get(value or 'scheduled', -1)),
+        ])
+        self.watermarks = {}
+        self.refreshed_at = None
+        self.last_refresh_time = 0.0
+        self._lock = threading.Lock()
+    
+    def _refresh_table(self, table, model, columns):
+        watermark = self.watermarks.get(model.__tablename__)
+        query = db.session.query(model.id, *columns, model.updated_at)
+        if watermark is not None:
+            query = query.filter(model.updated_at >= watermark)
+        rows = query.all()
+        
+        if watermark is None:
+            table.replace(rows)
+        else:
+            table.upsert(rows)
+        if rows:
+            latest = max((row[-1] for row in rows if row[-1] is not None), default=watermark)
+            self.watermarks[model.__tablename__] = latest
+        
+        if db.session.query(func.count(model.id)).scalar() != len(table):
+            rows = db.session.query(model.id, *columns, model.updated_at).all()
+            table.replace(rows)
+            self.watermarks[model.__tablename__] = max(
+                (row[-1] for row in rows if row[-1] is not None), default=None
+            )
+    
+    @read_only
+    def _load(self):
+        self._refresh_table(self.patients, Patient, [
+            Patient.user_id, Patient.date_of_birth, Patient.gender,
+            Patient.blood_type, Patient.created_at, Patient.is_active
+        ])
+        self._refresh_table(self.appointments, Appointment, [
+            Appointment.patient_id, Appointment.doctor_id,
+            Appointment.appointment_date, Appointment.status
+        ])
+    
+    def refresh(self):
+        """Pull changed rows into the arrays"""
+        started = time.perf_counter()
+        # A separate app context has its own session, so the caller's transaction is
+        # left alone and the read transaction ends when the context is torn down
+        with current_app.app_context():
+            self._load()
+        self.refreshed_at = time.time()
+        self.last_refresh_time = time.perf_counter() - started
+    
+    def is_stale(self, max_age):
+        return self.refreshed_at is None or time.time() - self.refreshed_at > max_age
+    
+    def ensure_fresh(self, max_age):
+        """Refresh when older than max_age; concurrent callers reuse the current arrays"""
+        if not self.is_stale(max_age):
+            return
+        blocking = self.refreshed_at is None
+        if not self._lock.acquire(blocking=blocking):
+            return
+        try:
+            if self.is_stale(max_age):
+                self.refresh()
+        finally:
+            self._lock.release()
+    
+    def info(self):
+        return {
+            'patients': len(self.patients),
+            'appointments': len(self.appointments),
+            'refreshed_at': datetime.fromtimestamp(self.refreshed_at).isoformat() if self.refreshed_at else None,
+            'age_seconds': round(time.time() - self.refreshed_at, 1) if self.refreshed_at else None,
+            'last_refresh_ms': round(self.last_refresh_time * 1000, 2)
+        }
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+def get_snapshot():
+    """Return the process-wide snapshot, refreshing it when older than ANALYTICS_REFRESH_SECONDS"""
+    global _snapshot
+    with _snapshot_lock:
+        if _snapshot is None:
+            _snapshot = AnalyticsSnapshot()
+    _snapshot.ensure_fresh(current_app.config['ANALYTICS_REFRESH_SECONDS'])
+    return _snapshot
+
+def _labelled(counts, labels):
+    """Turn bincount output (index 0 = unknown) into {label: count}"""
+    result = {label: int(count) for label, count in zip(labels, counts[1:]) if count}
+    if counts[0]:
+        result['Unknown'] = int(counts[0])
+    return result
+
+def population_statistics(snapshot, months=12, today=None):
+    """Clinic-wide demographics and appointment trends, computed with vectorized operations"""
+    today = today or date.today()
+    patients = snapshot.patients.data
+    appointments = snapshot.appointments.data
+    active = patients['is_active']
+    
+    gender = patients['gender'][active].astype(np.int64) + 1
+    blood = patients['blood_type'][active].astype(np.int64) + 1
+    
+    # Age band by comparing birth dates against cutoff dates, oldest band first
+    dob = patients['date_of_birth'][active]
+    known_dob = ~np.isnat(dob)
+    band_labels = [band for band, upper_age in AGE_BANDS]
+    edges = np.array(sorted(years_ago(today, upper_age) for band, upper_age in AGE_BANDS if upper_age),
+                     dtype='datetime64[D]')
+    # searchsorted gives 0 for the oldest band, so flip to AGE_BANDS order (youngest first)
+    age_band = len(edges) - np.searchsorted(edges, dob, side='left')
+    age_band = np.where(known_dob, age_band + 1, 0)
+    
+    gender_by_age = np.bincount(gender * (len(band_labels) + 1) + age_band,
+                                minlength=(len(GENDERS) + 1) * (len(band_labels) + 1))
+    gender_by_age = gender_by_age.reshape(len(GENDERS) + 1, len(band_labels) + 1)
+    
+    # Monthly windows ending with the current month
+    current_month = np.datetime64(today, 'M')
+    first_month = current_month - (months - 1)
+    month_labels = [str(first_month + offset) for offset in range(months)]
+    
+    created = patients['created_at'][active].astype('datetime64[M]')
+    in_window = (created >= first_month) & (created <= current_month)
+    registrations = np.bincount((created[in_window] - first_month).astype(np.int64), minlength=months)
+    
+    # Appointments count only while their patient is active
+    patient_ids = snapshot.patients.ids
+    position = np.searchsorted(patient_ids, appointments['patient_id'])
+    clipped = np.minimum(position, max(len(patient_ids) - 1, 0))
+    if len(patient_ids):
+        counted = (position < len(patient_ids)) & (patient_ids[clipped] == appointments['patient_id'])
+        counted &= patients['is_active'][clipped]
+    else:
+        counted = np.zeros(len(appointments['patient_id']), dtype=bool)
+    
+    status = appointments['status'][counted].astype(np.int64) + 1
+    appointment_month = appointments['appointment_date'][counted].astype('datetime64[M]')
+    in_window = (appointment_month >= first_month) & (appointment_month <= current_month)
+    month_index = (appointment_month[in_window] - first_month).astype(np.int64)
+    status_by_month = np.bincount(month_index * (len(APPOINTMENT_STATUSES) + 1) + status[in_window],
+                                  minlength=months * (len(APPOINTMENT_STATUSES) + 1))
+    status_by_month = status_by_month.reshape(months, len(APPOINTMENT_STATUSES) + 1)
+    
+    # 1970-01-01 was a Thursday, so shift day numbers by 3 to make Monday 0
+    days = appointments['appointment_date'][counted].astype('datetime64[D]').astype(np.int64)
+    weekdays = np.bincount((days + 3) % 7, minlength=7)
+    
+    return {
+        'total_patients': int(active.sum()),
+        'total_appointments': int(counted.sum()),
+        'gender_distribution': _labelled(np.bincount(gender, minlength=len(GENDERS) + 1), GENDERS),
+        'blood_type_distribution': _labelled(np.bincount(blood, minlength=len(BLOOD_TYPES) + 1), BLOOD_TYPES),
+        'age_distribution': _labelled(np.bincount(age_band, minlength=len(band_labels) + 1), band_labels),
+        'gender_by_age': {
+            gender_label: _labelled(gender_by_age[code + 1], band_labels)
+            for code, gender_label in enumerate(GENDERS)
+        },
+        'monthly_registrations': dict(zip(month_labels, registrations.tolist())),
+        'appointment_status_by_month': {
+            month: _labelled(status_by_month[index], APPOINTMENT_STATUSES)
+            for index, month in enumerate(month_labels)
+        },
+        'appointment_status_distribution': _labelled(
+            np.bincount(status, minlength=len(APPOINTMENT_STATUSES) + 1), APPOINTMENT_STATUSES
+        ),
+        'appointments_by_weekday': dict(zip(WEEKDAYS, weekdays.tolist()))
+    }
+
+@analytics_bp.route('/analytics/population', methods=['GET'])
+@jwt_required()
+def get_population_analytics():
+    """Get clinic-wide demographics and appointment trends (admin only)"""
+    try:
+        current_user = User.query.get(get_jwt_identity())
+        if not current_user or current_user.role != 'admin':
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        if np is None:
+            return jsonify({'error': 'Analytics is unavailable: numpy is not installed'}), 503
+        
+        months = request.args.get('months', 12, type=int)
+        if months < 1 or months > 120:
+            return jsonify({'error': 'months must be between 1 and 120'}), 400
+        
+        snapshot = get_snapshot()
+        started = time.perf_counter()
+        statistics = population_statistics(snapshot, months)
+        
+        return jsonify({
+            'statistics': statistics,
+            'snapshot': snapshot.info(),
+            'compute_ms': round((time.perf_counter() - started) * 1000, 2)
+        }), 200
+    
+    except Exception as e:
+        current_app.logger.error(f"Population analytics error: {str(e)}")
+        return jsonify({'error': 'Failed to retrieve analytics'}), 500
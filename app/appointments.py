@@ -1,9 +1,18 @@
 from flask import Blueprint, request, jsonify
-from app.models import Appointment, Patient, User
+from app.models import Appointment, Patient, User, appointment_serializer
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.middleware import doctor_required, admin_required
 from app import db
-from datetime import datetime
+from app import reminders
+from app import events
+from app import waitlist
+from app import counters
+from app import rollups
+from app.doctors import doctor_display_name, resolve_doctor_id, doctor_name_index, doctor_filter, normalize_doctor_name
+from app.readpath import select_for, read_dicts, export_response
+from app.serializers import requested_fields
+from datetime import datetime, timedelta
+from sqlalchemy import case
 import traceback
 
 appointments_bp = Blueprint('appointments', __name__)
@@ -13,6 +22,24 @@ def handle_database_error(e):
     print(f"Database error: {str(e)}")
     return jsonify({'error': 'Database operation failed'}), 500
 
+def _appointment_datetime(day, time_of_day=None):
+    """Combine a YYYY-MM-DD date and an optional HH:MM time into appointment_date"""
+    value = datetime.strptime(day, '%Y-%m-%d')
+    if time_of_day:
+        value = datetime.combine(value.date(), datetime.strptime(time_of_day, '%H:%M').time())
+    return value
+
+def visible_appointments(current_user, current_user_id, fields=None):
+    """Core select of the appointments a user may see, or None when a regular user has no patient record"""
+    query = select_for(appointment_serializer, fields)
+    if current_user.role in ['admin', 'doctor']:
+        return query
+    # Regular users can only see their own appointments
+    patient = Patient.query.filter_by(user_id=current_user_id, is_active=True).first()
+    if not patient:
+        return None
+    return query.where(Appointment.patient_id == patient.id)
+
 @appointments_bp.route('/appointments', methods=['GET'])
 @jwt_required()
 def get_appointments():
@@ -24,20 +51,41 @@ def get_appointments():
         if not current_user:
             return jsonify({'error': 'User not found'}), 404
         
-        # Admin and doctors can see all appointments
-        if current_user.role in ['admin', 'doctor']:
-            appointments = Appointment.query.filter_by(is_active=True).all()
-        else:
-            # Regular users can only see their own appointments
-            patient = Patient.query.filter_by(user_id=current_user_id, is_active=True).first()
-            if not patient:
-                return jsonify({'error': 'Patient record not found'}), 404
-            appointments = Appointment.query.filter_by(patient_id=patient.id, is_active=True).all()
+        # Admin and doctors see all appointments, users their own (plain rows, no ORM instances)
+        query = visible_appointments(current_user, current_user_id)
+        if query is None:
+            return jsonify({'error': 'Patient record not found'}), 404
         
         return jsonify({
-            'appointments': [appointment.to_dict() for appointment in appointments]
+            'appointments': read_dicts(appointment_serializer, query)
         })
+    
+    except Exception as e:
+        return handle_database_error(e)
+
+@appointments_bp.route('/appointments/export', methods=['GET'])
+@jwt_required()
+def export_appointments():
+    """Export the appointments the user can see as JSON or CSV (?format=csv, ?fields=a,b)"""
+    try:
+        current_user_id = get_jwt_identity()
+        current_user = User.query.get(current_user_id)
+        
+        if not current_user:
+            return jsonify({'error': 'User not found'}), 404
         
+        try:
+            fields = requested_fields(appointment_serializer, request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        query = visible_appointments(current_user, current_user_id, fields)
+        if query is None:
+            return jsonify({'error': 'Patient record not found'}), 404
+        
+        query = query.order_by(Appointment.appointment_date, Appointment.id)
+        return export_response('appointments', appointment_serializer, query, fields, request.args.get('format', 'json'))
+    
     except Exception as e:
         return handle_database_error(e)
 
@@ -50,7 +98,7 @@ def get_appointment(appointment_id):
         current_user = User.query.get(current_user_id)
         
         appointment = Appointment.query.get(appointment_id)
-        if not appointment or not appointment.is_active:
+        if not appointment:
             return jsonify({'error': 'Appointment not found'}), 404
         
         # Check if user has access to this appointment
@@ -60,7 +108,7 @@ def get_appointment(appointment_id):
                 return jsonify({'error': 'Access denied'}), 403
         
         return jsonify({'appointment': appointment.to_dict()})
-        
+    
     except Exception as e:
         return handle_database_error(e)
 
@@ -88,26 +136,37 @@ def create_appointment():
         if not patient or not patient.is_active:
             return jsonify({'error': 'Patient not found'}), 404
         
-        # Create appointment
+        try:
+            appointment_date = _appointment_datetime(data['appointment_date'], data['appointment_time'])
+        except ValueError:
+            return jsonify({'error': 'Invalid date or time format. Use YYYY-MM-DD and HH:MM'}), 400
+        
+        # Create appointment (the reason for the visit is recorded as its symptoms)
         appointment = Appointment(
             patient_id=data['patient_id'],
             doctor_id=current_user_id,
-            appointment_date=datetime.strptime(data['appointment_date'], '%Y-%m-%d').date(),
-            appointment_time=datetime.strptime(data['appointment_time'], '%H:%M').time(),
-            reason=data['reason'],
-            status='Scheduled',
-            notes=data.get('notes', ''),
-            created_by=current_user_id
+            doctor_name=doctor_display_name(current_user),
+            appointment_date=appointment_date,
+            appointment_type=data.get('appointment_type'),
+            symptoms=data['reason'],
+            status='scheduled',
+            notes=data.get('notes', '')
         )
         
         db.session.add(appointment)
+        db.session.flush()
+        reminders.sync_appointment(appointment)
+        counters.record_appointment_changes([(None, counters.appointment_state(appointment, patient))])
         db.session.commit()
         
+        events.emit('appointments_changed', action='create', patient_id=patient.id,
+                    user_id=patient.user_id, appointment_ids=[appointment.id])
+        
         return jsonify({
             'message': 'Appointment created successfully',
             'appointment': appointment.to_dict()
         }), 201
-        
+    
     except Exception as e:
         db.session.rollback()
         return handle_database_error(e)
@@ -125,33 +184,51 @@ def update_appointment(appointment_id):
             return jsonify({'error': 'Only doctors and admins can update appointments'}), 403
         
         appointment = Appointment.query.get(appointment_id)
-        if not appointment or not appointment.is_active:
+        if not appointment:
             return jsonify({'error': 'Appointment not found'}), 404
         
         data = request.get_json()
+        counted_before = counters.appointment_state(appointment, appointment.patient)
+        previous_status = appointment.status
         
-        # Update fields
-        if 'appointment_date' in data:
-            appointment.appointment_date = datetime.strptime(data['appointment_date'], '%Y-%m-%d').date()
-        if 'appointment_time' in data:
-            appointment.appointment_time = datetime.strptime(data['appointment_time'], '%H:%M').time()
+        # Update fields (a new date keeps the time of day unless appointment_time is given too)
+        if 'appointment_date' in data or 'appointment_time' in data:
+            try:
+                appointment.appointment_date = _appointment_datetime(
+                    data.get('appointment_date') or appointment.appointment_date.strftime('%Y-%m-%d'),
+                    data.get('appointment_time') or appointment.appointment_date.strftime('%H:%M')
+                )
+            except ValueError:
+                return jsonify({'error': 'Invalid date or time format. Use YYYY-MM-DD and HH:MM'}), 400
+        if 'appointment_type' in data:
+            appointment.appointment_type = data['appointment_type']
         if 'reason' in data:
-            appointment.reason = data['reason']
-        if 'status' in data:
-            appointment.status = data['status']
-        if 'notes' in data:
-            appointment.notes = data['notes']
+            appointment.symptoms = data['reason']
+        for field in ['symptoms', 'diagnosis', 'prescription', 'status', 'notes']:
+            if field in data:
+                setattr(appointment, field, data[field])
         
         appointment.updated_at = datetime.utcnow()
-        appointment.updated_by = current_user_id
         
+        db.session.flush()
+        reminders.sync_appointment(appointment)
+        counters.record_appointment_changes([
+            (counted_before, counters.appointment_state(appointment, appointment.patient))
+        ])
         db.session.commit()
         
+        events.emit('appointments_changed', action='update', patient_id=appointment.patient_id,
+                    user_id=appointment.patient.user_id, appointment_ids=[appointment.id])
+        
+        # Hand a newly cancelled slot to the best waiting patient
+        if appointment.status == 'cancelled' and previous_status != 'cancelled':
+            waitlist.offer_slot(appointment.doctor_id, appointment.appointment_date)
+        
         return jsonify({
             'message': 'Appointment updated successfully',
             'appointment': appointment.to_dict()
         })
-        
+    
     except Exception as e:
         db.session.rollback()
         return handle_database_error(e)
@@ -169,18 +246,28 @@ def delete_appointment(appointment_id):
             return jsonify({'error': 'Only doctors and admins can delete appointments'}), 403
         
         appointment = Appointment.query.get(appointment_id)
-        if not appointment or not appointment.is_active:
+        if not appointment:
             return jsonify({'error': 'Appointment not found'}), 404
         
-        # Soft delete
-        appointment.is_active = False
+        # Appointments have no soft-delete flag: deleting one cancels it, keeping its history
+        counted_before = counters.appointment_state(appointment, appointment.patient)
+        was_cancelled = appointment.status == 'cancelled'
+        appointment.status = 'cancelled'
         appointment.updated_at = datetime.utcnow()
-        appointment.updated_by = current_user_id
+        reminders.clear_appointments([appointment.id])
+        counters.record_appointment_changes([
+            (counted_before, counters.appointment_state(appointment, appointment.patient))
+        ])
         
         db.session.commit()
         
-        return jsonify({'message': 'Appointment deleted successfully'})
+        events.emit('appointments_changed', action='delete', patient_id=appointment.patient_id,
+                    user_id=appointment.patient.user_id, appointment_ids=[appointment.id])
+        if not was_cancelled:
+            waitlist.offer_slot(appointment.doctor_id, appointment.appointment_date)
         
+        return jsonify({'message': 'Appointment deleted successfully'})
+    
     except Exception as e:
         db.session.rollback()
         return handle_database_error(e)
@@ -200,8 +287,8 @@ def search_appointments():
         date_to = request.args.get('date_to', '')
         status = request.args.get('status', '')
         
-        # Build query
-        query = Appointment.query.filter_by(is_active=True)
+        # Build query (appointments have no soft-delete flag; cancelled ones keep their status)
+        query = Appointment.query
         
         if patient_name:
             query = query.join(Patient).filter(
@@ -219,7 +306,8 @@ def search_appointments():
         if date_to:
             try:
                 date_to_obj = datetime.strptime(date_to, '%Y-%m-%d').date()
-                query = query.filter(Appointment.appointment_date <= date_to_obj)
+                # Half-open range: include the whole of date_to
+                query = query.filter(Appointment.appointment_date < date_to_obj + timedelta(days=1))
             except ValueError:
                 pass
         
@@ -239,6 +327,266 @@ def search_appointments():
         return jsonify({
             'appointments': [appointment.to_dict() for appointment in appointments]
         })
+    
+    except Exception as e:
+        return handle_database_error(e)
+
+def _parse_day(value):
+    """Parse a YYYY-MM-DD string into a datetime at midnight"""
+    return datetime.strptime(value, '%Y-%m-%d')
+
+def _bulk_targets(rows, data):
+    """Compute the new appointment datetime for each row being rescheduled"""
+    targets = {}
+    if data.get('shift_days') is not None or data.get('shift_minutes') is not None:
+        try:
+            shift = timedelta(days=int(data.get('shift_days') or 0), minutes=int(data.get('shift_minutes') or 0))
+        except (TypeError, ValueError):
+            raise ValueError('shift_days and shift_minutes must be integers')
+        for row in rows:
+            targets[row.id] = row.appointment_date + shift
+    elif data.get('target_date'):
+        # Move to another day, keeping each appointment's time of day
+        try:
+            target_day = _parse_day(data['target_date']).date()
+        except (TypeError, ValueError):
+            raise ValueError('Invalid target_date format. Use YYYY-MM-DD')
+        for row in rows:
+            targets[row.id] = datetime.combine(target_day, row.appointment_date.time())
+    else:
+        raise ValueError('Reschedule requires shift_days, shift_minutes or target_date')
+    return targets
+
+def _doctor_key(doctor_id, doctor_name, index):
+    """Identify a doctor by user id, resolving the name for rows not yet backfilled"""
+    if doctor_id is None:
+        doctor_id = resolve_doctor_id(doctor_name, index)
+    return doctor_id if doctor_id is not None else normalize_doctor_name(doctor_name)
+
+def _bulk_conflicts(rows, targets):
+    """Check every target slot against existing appointments in a single query"""
+    conflicts = []
+    index = doctor_name_index()
+    
+    # Two moved appointments landing on the same doctor slot
+    seen = {}
+    for row in rows:
+        slot = (_doctor_key(row.doctor_id, row.doctor_name, index), targets[row.id])
+        if slot in seen:
+            conflicts.append({'appointment_id': row.id, 'conflicts_with': seen[slot],
+                              'appointment_date': targets[row.id].isoformat()})
+        seen[slot] = row.id
+    
+    doctor_ids = {key for key, _ in seen if isinstance(key, int)}
+    # Doctors without a user account can only be matched by their stored names
+    doctor_names = {row.doctor_name for row in rows
+                    if not isinstance(_doctor_key(row.doctor_id, row.doctor_name, index), int)}
+    moving_ids = [row.id for row in rows]
+    existing = db.session.query(
+        Appointment.id, Appointment.doctor_id, Appointment.doctor_name, Appointment.appointment_date
+    ).filter(
+        doctor_filter(doctor_ids, doctor_names, index),
+        Appointment.appointment_date.in_(set(targets.values())),
+        Appointment.status != 'cancelled',
+        Appointment.id.notin_(moving_ids)
+    ).all()
+    
+    for existing_id, doctor_id, doctor_name, appointment_date in existing:
+        moved_id = seen.get((_doctor_key(doctor_id, doctor_name, index), appointment_date))
+        if moved_id is not None:
+            conflicts.append({'appointment_id': moved_id, 'conflicts_with': existing_id,
+                              'appointment_date': appointment_date.isoformat()})
+    return conflicts
+
+@appointments_bp.route('/appointments/bulk', methods=['POST'])
+@jwt_required()
+def bulk_update_appointments():
+    """Cancel or reschedule a doctor's appointments in one transaction (admin/doctor only)"""
+    try:
+        current_user_id = get_jwt_identity()
+        current_user = User.query.get(current_user_id)
+        
+        if not current_user or current_user.role not in ['admin', 'doctor']:
+            return jsonify({'error': 'Only doctors and admins can update appointments'}), 403
+        
+        data = request.get_json() or {}
+        action = data.get('action')
+        if action not in ['cancel', 'reschedule']:
+            return jsonify({'error': 'Action must be cancel or reschedule'}), 400
+        
+        # Select the affected appointments: explicit ids, or a doctor's date range
+        query = db.session.query(
+            Appointment.id, Appointment.patient_id, Appointment.doctor_id, Appointment.doctor_name,
+            Appointment.appointment_date, Appointment.status, Patient.user_id, Patient.is_active
+        ).join(Patient, Appointment.patient_id == Patient.id).filter(
+            Appointment.status.in_(['scheduled', 'rescheduled'])
+        )
+        
+        if data.get('appointment_ids'):
+            try:
+                if not isinstance(data['appointment_ids'], list):
+                    raise TypeError
+                appointment_ids = [int(i) for i in data['appointment_ids']]
+            except (TypeError, ValueError):
+                return jsonify({'error': 'appointment_ids must be a list of integers'}), 400
+            query = query.filter(Appointment.id.in_(appointment_ids))
+        elif (data.get('doctor_id') or data.get('doctor_name')) and data.get('date_from'):
+            try:
+                date_from = _parse_day(data['date_from'])
+                date_to = _parse_day(data.get('date_to') or data['date_from'])
+            except ValueError:
+                return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+            
+            try:
+                doctor_id = int(data['doctor_id']) if data.get('doctor_id') else resolve_doctor_id(data['doctor_name'])
+            except (TypeError, ValueError):
+                return jsonify({'error': 'doctor_id must be an integer'}), 400
+            doctor_names = [data['doctor_name']] if data.get('doctor_name') else []
+            # Range scans on (doctor_id, appointment_date), plus rows not yet backfilled by name
+            query = query.filter(
+                doctor_filter([doctor_id] if doctor_id else [], doctor_names),
+                Appointment.appointment_date >= date_from,
+                Appointment.appointment_date < date_to + timedelta(days=1)
+            )
+        else:
+            return jsonify({'error': 'Provide appointment_ids, or doctor_id/doctor_name and date_from'}), 400
+        
+        rows = query.all()
+        if not rows:
+            return jsonify({'message': 'No matching appointments', 'updated': 0}), 200
+        
+        ids = [row.id for row in rows]
+        now = datetime.utcnow()
+        
+        if action == 'cancel':
+            Appointment.query.filter(Appointment.id.in_(ids)).update({
+                Appointment.status: 'cancelled',
+                Appointment.updated_at: now
+            }, synchronize_session=False)
+            reminders.clear_appointments(ids)
+        else:
+            try:
+                targets = _bulk_targets(rows, data)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            conflicts = _bulk_conflicts(rows, targets)
+            if conflicts:
+                return jsonify({'error': 'Target slots are already booked', 'conflicts': conflicts}), 409
+            
+            # One UPDATE moves every appointment to its own target slot
+            Appointment.query.filter(Appointment.id.in_(ids)).update({
+                Appointment.appointment_date: case(targets, value=Appointment.id),
+                Appointment.status: 'scheduled',
+                Appointment.updated_at: now
+            }, synchronize_session=False)
+            reminders.sync_appointments(ids)
+            rollups.mark_days([row.appointment_date for row in rows])
+        
+        new_status = 'cancelled' if action == 'cancel' else 'scheduled'
+        counters.record_appointment_changes([
+            ((row.user_id, row.status), (row.user_id, new_status)) for row in rows if row.is_active
+        ])
+        
+        db.session.commit()
+        
+        # One change event per affected patient for notification fan-out
+        by_patient = {}
+        for row in rows:
+            by_patient.setdefault((row.patient_id, row.user_id), []).append(row.id)
+        for (patient_id, user_id), appointment_ids in by_patient.items():
+            events.emit('appointments_changed', action=action, patient_id=patient_id,
+                        user_id=user_id, appointment_ids=appointment_ids)
+        
+        # Offer every freed slot to the doctor's waitlist
+        if action == 'cancel':
+            for row in rows:
+                waitlist.offer_slot(row.doctor_id, row.appointment_date)
+        
+        return jsonify({
+            'message': f'{len(ids)} appointments updated',
+            'action': action,
+            'updated': len(ids),
+            'appointment_ids': ids,
+            'patients_notified': len(by_patient)
+        }), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        return handle_database_error(e)
+
+@appointments_bp.route('/doctors/<int:doctor_id>/appointments', methods=['GET'])
+@jwt_required()
+def get_doctor_appointments(doctor_id):
+    """List a doctor's appointments in a date range (admin/doctor only)"""
+    try:
+        current_user_id = get_jwt_identity()
+        current_user = User.query.get(current_user_id)
+        
+        if not current_user or current_user.role not in ['admin', 'doctor']:
+            return jsonify({'error': 'Access denied'}), 403
+        
+        try:
+            date_from = _parse_day(request.args.get('date_from', datetime.now().strftime('%Y-%m-%d')))
+            date_to = _parse_day(request.args.get('date_to', date_from.strftime('%Y-%m-%d')))
+        except ValueError:
+            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+        
+        # Includes rows whose doctor_id has not been backfilled yet, matched by doctor_name
+        appointments = Appointment.query.filter(
+            doctor_filter([doctor_id]),
+            Appointment.appointment_date >= date_from,
+            Appointment.appointment_date < date_to + timedelta(days=1)
+        ).order_by(Appointment.appointment_date).all()
+        
+        return jsonify({
+            'doctor_id': doctor_id,
+            'appointments': [appointment.to_dict() for appointment in appointments]
+        })
+    
+    except Exception as e:
+        return handle_database_error(e)
+
+@appointments_bp.route('/doctors/<int:doctor_id>/availability', methods=['GET'])
+@jwt_required()
+def get_doctor_availability(doctor_id):
+    """List a doctor's free slots for a day"""
+    try:
+        try:
+            day = _parse_day(request.args.get('date', datetime.now().strftime('%Y-%m-%d')))
+            start = datetime.strptime(request.args.get('start', '09:00'), '%H:%M').time()
+            end = datetime.strptime(request.args.get('end', '17:00'), '%H:%M').time()
+        except ValueError:
+            return jsonify({'error': 'Invalid date or time format'}), 400
+        slot_minutes = max(request.args.get('slot_minutes', 30, type=int), 5)
+        
+        day_start = datetime.combine(day.date(), start)
+        day_end = datetime.combine(day.date(), end)
+        
+        # Only the booked start times are needed, read off the (doctor_id, appointment_date) index
+        # plus any rows still matched by doctor_name
+        booked = {
+            appointment_date for (appointment_date,) in db.session.query(Appointment.appointment_date).filter(
+                doctor_filter([doctor_id]),
+                Appointment.appointment_date >= day_start,
+                Appointment.appointment_date < day_end,
+                Appointment.status != 'cancelled'
+            ).all()
+        }
+        
+        slots = []
+        slot = day_start
+        while slot < day_end:
+            if slot not in booked:
+                slots.append(slot.isoformat())
+            slot += timedelta(minutes=slot_minutes)
         
+        return jsonify({
+            'doctor_id': doctor_id,
+            'date': day.strftime('%Y-%m-%d'),
+            'slot_minutes': slot_minutes,
+            'available_slots': slots
+        })
+    
     except Exception as e:
         return handle_database_error(e)
@@ -0,0 +1,178 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip variants are built
+    brotli = None
+
+# Fingerprinted URLs (name.<hash>.ext) never change content, so browsers may keep them for a year
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Everything else is revalidated with its ETag on each use (a 304 costs no body)
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+MIN_COMPRESS_BYTES = 512
+
+# src="x.js" / href="x.css" references that are rewritten to fingerprinted URLs
+_REFERENCE = re.compile(r'''(\b(?:src|href)=["'])(/?)([^"'?#:]+)(["'])''')
+
+class Asset:
+    """One static file held in memory with its precompressed variants"""
+    
+    __slots__ = ('path', 'mimetype', 'variants', 'fingerprinted_path')
+    
+    def __init__(self, path, body, mimetype):
+        self.path = path
+        self.mimetype = mimetype
+        digest = hashlib.sha256(body).hexdigest()[:16]
+        stem, ext = os.path.splitext(path)
+        self.fingerprinted_path = f"{stem}.{digest[:10]}{ext}"
+        # content-encoding -> (body, etag); identity is always present
+        self.variants = {'identity': (body, f'"{digest}"')}
+        if len(body) >= MIN_COMPRESS_BYTES and mimetype.startswith(COMPRESSIBLE_TYPES):
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(compressed) < len(body):
+                self.variants['gzip'] = (compressed, f'"{digest}-gz"')
+            if brotli is not None:
+                compressed = brotli.compress(body, quality=11)
+                if len(compressed) < len(body):
+                    self.variants['br'] = (compressed, f'"{digest}-br"')
+    
+    def matches(self, if_none_match):
+        """True when the client's If-None-Match names any variant of this content"""
+        return any(etag in if_none_match for _, etag in self.variants.values()) or '*' in if_none_match
+
+class AssetManifest:
+    """Maps request paths to static files resolved (and compressed) once at startup.
+    
+    Earlier roots win, matching the old lookup order (app/static, then /static).
+    """
+    
+    def __init__(self, roots):
+        self.roots = roots
+        self.assets = {}
+        self._signature = None
+        self._lock = threading.Lock()
+        self.load()
+    
+    def _scan(self):
+        files = {}
+        for root in self.roots:
+            if not os.path.isdir(root):
+                continue
+            for directory, _, names in os.walk(root):
+                for name in names:
+                    full_path = os.path.join(directory, name)
+                    relative = os.path.relpath(full_path, root).replace(os.sep, '/')
+                    files.setdefault(relative, full_path)
+        return files
+    
+    def _signature_of(self, files):
+        signature = []
+        for relative, full_path in sorted(files.items()):
+            stat = os.stat(full_path)
+            signature.append((relative, stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+    
+    def load(self):
+        """(Re)build the manifest from disk"""
+        files = self._scan()
+        bodies = {}
+        for relative, full_path in files.items():
+            with open(full_path, 'rb') as f:
+                bodies[relative] = f.read()
+        
+        # Assets first, so pages can reference their fingerprinted URLs
+        assets = {}
+        for relative, body in bodies.items():
+            if not relative.endswith('.html'):
+                assets[relative] = Asset(relative, body, self._mimetype(relative))
+        for relative, body in bodies.items():
+            if relative.endswith('.html'):
+                body = self._fingerprint_references(relative, body, assets)
+                assets[relative] = Asset(relative, body, self._mimetype(relative))
+        
+        index = dict(assets)
+        for asset in assets.values():
+            if not asset.path.endswith('.html'):
+                index[asset.fingerprinted_path] = asset
+        with self._lock:
+            self.assets = index
+            self._signature = self._signature_of(files)
+        return len(assets)
+    
+    def reload_if_changed(self):
+        """Rebuild when files were added, removed or modified (used in debug mode)"""
+        if self._signature_of(self._scan()) != self._signature:
+            self.load()
+    
+    @staticmethod
+    def _mimetype(path):
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if mimetype.startswith('text/') or mimetype == 'application/javascript':
+            mimetype += '; charset=utf-8'
+        return mimetype
+    
+    @staticmethod
+    def _fingerprint_references(page, body, assets):
+        base = os.path.dirname(page)
+        
+        def replace(match):
+            prefix, slash, target, quote = match.groups()
+            resolved = target if slash else os.path.normpath(os.path.join(base, target)).replace(os.sep, '/')
+            asset = assets.get(resolved)
+            if asset is None:
+                return match.group(0)
+            url = asset.fingerprinted_path if slash else os.path.relpath(asset.fingerprinted_path, base or '.').replace(os.sep, '/')
+            return f"{prefix}{slash}{url}{quote}"
+        
+        try:
+            text = body.decode('utf-8')
+        except UnicodeDecodeError:
+            return body
+        return _REFERENCE.sub(replace, text).encode('utf-8')
+    
+    def response(self, path):
+        """Response for a static path, a 304 when the client's copy is current, or None"""
+        asset = self.assets.get(path)
+        if asset is None:
+            return None
+        
+        cache_control = IMMUTABLE_CACHE_CONTROL if path == asset.fingerprinted_path else REVALIDATE_CACHE_CONTROL
+        encoding = 'identity'
+        for candidate in ('br', 'gzip'):
+            if candidate in asset.variants and request.accept_encodings[candidate]:
+                encoding = candidate
+                break
+        body, etag = asset.variants[encoding]
+        
+        response_class = current_app.response_class
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match and asset.matches(if_none_match):
+            response = response_class(status=304)
+        else:
+            response = response_class(body, content_type=asset.mimetype)
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+        response.headers['ETag'] = etag
+        response.headers['Cache-Control'] = cache_control
+        if len(asset.variants) > 1:
+            response.headers['Vary'] = 'Accept-Encoding'
+        return response
+
+def init_assets(app, roots):
+    """Build the app's asset manifest and keep it fresh while debugging"""
+    manifest = AssetManifest(roots)
+    app.extensions['asset_manifest'] = manifest
+    
+    @app.before_request
+    def reload_assets():
+        if app.debug:
+            manifest.reload_if_changed()
+    return manifest
@@ -1,8 +1,12 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
-from app.models import User
+from app.models import User, Patient
 from app.middleware import validate_email, validate_password, validate_phone, handle_validation_errors
+from app.query_monitor import query_budget
+from app.counting import paginate_query, count_rows, wants_exact_count
+from app.replica import primary_only
 from app import db
+from sqlalchemy import select, func
 import uuid
 from datetime import datetime
 
@@ -263,6 +267,7 @@ def update_profile():
         return jsonify({'error': 'Profile update failed'}), 500
 
 @auth_bp.route('/users', methods=['GET'])
+@query_budget(5)
 @jwt_required()
 def get_all_users():
     """Get all users for admin management"""
@@ -278,39 +283,25 @@ def get_all_users():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
         
-        users = User.query.paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
+        # Patient totals come from one grouped count joined per user, not the patient rows
+        patient_counts = db.session.query(
+            Patient.user_id, func.count(Patient.id).label('total_patients')
+        ).group_by(Patient.user_id).subquery()
+        rows, pagination = paginate_query(
+            db.session.query(User, func.coalesce(patient_counts.c.total_patients, 0)).outerjoin(
+                patient_counts, patient_counts.c.user_id == User.id
+            ).order_by(User.id),
+            page, per_page, count_query=User.query, whole_table=User
         )
         
-        user_list = []
-        for user in users.items:
-            user_data = {
-                'id': user.id,
-                'username': user.username,
-                'email': user.email,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-                'phone': user.phone,
-                'role': user.role,
-                'is_active': user.is_active,
-                'created_at': user.created_at.isoformat() if user.created_at else None,
-                'updated_at': user.updated_at.isoformat() if user.updated_at else None,
-                'total_patients': len(user.patients) if user.patients else 0
-            }
-            user_list.append(user_data)
+        user_list = [
+            dict(user.to_dict(), total_patients=int(total_patients))
+            for user, total_patients in rows
+        ]
         
         return jsonify({
             'users': user_list,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': users.total,
-                'pages': users.pages,
-                'has_next': users.has_next,
-                'has_prev': users.has_prev
-            }
+            'pagination': pagination
         }), 200
         
     except Exception as e:
@@ -396,12 +387,15 @@ def delete_user(user_id):
 def health_check():
     """Simple health check for database connectivity"""
     try:
-        # Test database connection
-        user_count = User.query.count()
+        # Test database connection with a real round trip on every check (the count below may be cached)
+        db.session.execute(select(User.id).limit(1)).first()
+        # Statistics-based count unless ?exact_count=1
+        user_count, user_count_exact = count_rows(User.query, exact=wants_exact_count(), whole_table=User)
         return jsonify({
             'status': 'healthy',
             'database': 'connected',
             'user_count': user_count,
+            'user_count_exact': user_count_exact,
             'message': 'Database connection is working'
         }), 200
     except Exception as e:
@@ -413,6 +407,7 @@ def health_check():
         }), 500
 
 @auth_bp.route('/test-db', methods=['GET'])
+@primary_only
 def test_database():
     """Test database connectivity and user creation"""
     try:
@@ -0,0 +1,34 @@
+from app.models import db, User, Patient, StatCounter
+from app.counters import rebuild_counters
+from flask_migrate import upgrade
+
+def bootstrap_database():
+    """One-time startup work: apply migrations, backfill counters and make sure the admin user exists.
+    
+    Runs once per deployment start (in the server's master process or run.py),
+    never in request-serving workers.
+    """
+    upgrade()
+    
+    # Databases that predate the counters table start with it empty: backfill it once
+    if StatCounter.query.first() is None and Patient.query.filter_by(is_active=True).first() is not None:
+        rebuild_counters()
+        db.session.commit()
+    
+    admin_user = User.query.filter_by(username='admin').first()
+    created = False
+    if not admin_user:
+        admin_user = User(
+            username='admin',
+            email='admin@medora.com',
+            password='Admin123!',
+            first_name='Admin',
+            last_name='User',
+            role='admin'
+        )
+        db.session.add(admin_user)
+        db.session.commit()
+        created = True
+    
+    db.session.remove()
+    return created
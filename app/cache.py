@@ -0,0 +1,124 @@
+import threading
+import time
+from collections import OrderedDict
+
+class SnapshotCache:
+    """Per-key cache of computed snapshots with TTL and stale-while-revalidate.
+    
+    A fresh entry is returned as is. Once an entry expires or is invalidated, exactly
+    one caller per key recomputes it while concurrent callers keep getting the stale
+    value (for up to `max_stale` seconds past expiry). Callers only block when there is
+    no usable value at all.
+    
+    `invalidate` only reaches the current process. Writers in other processes are seen
+    through `version`: an entry computed at a different version counts as invalidated.
+    At most `max_entries` keys are kept; the least recently computed are dropped first.
+    """
+    
+    def __init__(self, name, max_entries=1024):
+        self.name = name
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> [value, computed_at, invalidated, version]
+        self._generations = {}  # key -> invalidation counter
+        self._locks = {}
+        self._registry_lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.recomputes = 0
+        self.recompute_time = 0.0
+        self.last_recompute_time = 0.0
+    
+    def _lock_for(self, key):
+        with self._registry_lock:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+    
+    def _store(self, key, entry):
+        with self._registry_lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._generations.pop(evicted, None)
+                self._locks.pop(evicted, None)
+    
+    def _recompute(self, key, compute, version):
+        generation = self._generations.get(key, 0)
+        started = time.perf_counter()
+        value = compute()
+        elapsed = time.perf_counter() - started
+        # An invalidation that lands mid-compute leaves the new value stale
+        self._store(key, [value, time.monotonic(), self._generations.get(key, 0) != generation, version])
+        self.recomputes += 1
+        self.recompute_time += elapsed
+        self.last_recompute_time = elapsed
+        return value
+    
+    def get(self, key, compute, ttl, max_stale=0, version=None):
+        """Return the cached value for key, calling compute() when it must be refreshed"""
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        
+        if entry is not None:
+            value, computed_at, invalidated, entry_version = entry
+            invalidated = invalidated or entry_version != version
+            age = now - computed_at
+            if not invalidated and age < ttl:
+                self.hits += 1
+                return value
+            
+            if age < ttl + max_stale:
+                # Stale but usable: one caller refreshes, everyone else gets the old snapshot
+                lock = self._lock_for(key)
+                if not lock.acquire(blocking=False):
+                    self.stale_hits += 1
+                    return value
+                try:
+                    self.misses += 1
+                    return self._recompute(key, compute, version)
+                finally:
+                    lock.release()
+        
+        # Nothing usable: wait for whoever is computing, then re-check before computing again
+        with self._lock_for(key):
+            entry = self._entries.get(key)
+            if (entry is not None and not entry[2] and entry[3] == version
+                    and time.monotonic() - entry[1] < ttl):
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return self._recompute(key, compute, version)
+    
+    def invalidate(self, key):
+        """Mark a key stale; the next read recomputes it"""
+        if key not in self._entries and key not in self._locks:
+            return
+        self._generations[key] = self._generations.get(key, 0) + 1
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry[2] = True
+    
+    def clear(self):
+        with self._registry_lock:
+            self._entries.clear()
+            self._generations.clear()
+            self._locks.clear()
+    
+    def stats(self):
+        """Hit rate and recompute timings for monitoring"""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            'name': self.name,
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'hit_rate': round((self.hits + self.stale_hits) / lookups, 4) if lookups else None,
+            'recomputes': self.recomputes,
+            'avg_recompute_ms': round(self.recompute_time / self.recomputes * 1000, 2) if self.recomputes else None,
+            'last_recompute_ms': round(self.last_recompute_time * 1000, 2)
+        }
@@ -0,0 +1,107 @@
+import click
+import os
+from app import db
+
+def register_commands(app):
+    """Register maintenance commands on the Flask CLI (flask <command>)"""
+    
+    @app.cli.command('rebuild-reminders')
+    def rebuild_reminders_command():
+        """Rebuild the precomputed notifications table from scratch"""
+        from app.reminders import rebuild_reminders
+        
+        count = rebuild_reminders()
+        db.session.commit()
+        print(f"✅ Rebuilt {count} notifications")
+    
+    @app.cli.command('backfill-doctor-ids')
+    @click.option('--chunk-size', default=1000, show_default=True, help='Appointments updated per transaction')
+    def backfill_doctor_ids_command(chunk_size):
+        """Map free-text Appointment.doctor_name values to doctor user ids"""
+        from app.doctors import backfill_doctor_ids
+        
+        updated, unmatched = backfill_doctor_ids(chunk_size=chunk_size)
+        print(f"✅ Linked {updated} appointments to doctor accounts")
+        if unmatched:
+            print(f"⚠️  {sum(unmatched.values())} appointments could not be matched:")
+            for name, count in sorted(unmatched.items(), key=lambda item: -item[1]):
+                print(f"   - {name!r}: {count}")
+    
+    @app.cli.command('reconcile-counters')
+    @click.option('--user-id', type=int, default=None, help='Only rebuild this user\'s counters')
+    def reconcile_counters_command(user_id):
+        """Rebuild dashboard statistics counters from scratch to repair drift"""
+        from app.counters import rebuild_counters
+        
+        rows, drifted = rebuild_counters(user_id=user_id)
+        db.session.commit()
+        print(f"✅ Rebuilt {rows} counters ({drifted} had drifted)")
+    
+    @app.cli.command('run-rollups')
+    @click.option('--full', is_flag=True, help='Rebuild every day instead of only touched days')
+    def run_rollups_command(full):
+        """Update the daily registration and appointment rollups"""
+        from app.rollups import run_rollups
+        
+        days, rows = run_rollups(full=full)
+        scope = 'all days' if days is None else f"{days} touched days"
+        print(f"✅ Rolled up {scope} ({rows} rows written)")
+    
+    @app.cli.command('expire-waitlist-offers')
+    def expire_waitlist_offers_command():
+        """Return unanswered or past waitlist offers to waiting and offer open slots to the next entry"""
+        from app.models import WaitlistEntry
+        from app.waitlist import DoctorWaitlist, expire_offers
+        
+        doctor_ids = [doctor_id for (doctor_id,) in db.session.query(WaitlistEntry.doctor_id).filter(
+            WaitlistEntry.status == 'offered'
+        ).distinct()]
+        expired = 0
+        for doctor_id in doctor_ids:
+            waitlist = DoctorWaitlist(doctor_id)
+            waitlist.load()
+            expired += expire_offers(waitlist)
+        print(f"✅ Returned {expired} waitlist offers to waiting")
+    
+    @app.cli.command('sync-replica')
+    def sync_replica_command():
+        """Copy the primary SQLite database over the replica file (local stand-in for replication)"""
+        from app.replica import REPLICA_BIND, sync_sqlite_replica
+        
+        if REPLICA_BIND not in app.config.get('SQLALCHEMY_BINDS', {}):
+            raise click.ClickException('REPLICA_DATABASE_URL is not set')
+        pages = sync_sqlite_replica()
+        print(f"✅ Copied {pages} pages from the primary to the replica")
+    
+    @app.cli.command('serve')
+    @click.option('--bind', default=None, help='Address to listen on (default from gunicorn.conf.py)')
+    @click.option('--workers', type=int, default=None, help='Number of worker processes')
+    @click.option('--threads', type=int, default=None, help='Threads per worker')
+    @click.option('--max-requests', type=int, default=None, help='Recycle a worker after this many requests')
+    def serve_command(bind, workers, threads, max_requests):
+        """Serve the app with pre-forked gunicorn workers (settings from gunicorn.conf.py)"""
+        try:
+            from gunicorn.app.base import BaseApplication
+        except ImportError:
+            print("❌ gunicorn is not installed: pip install gunicorn")
+            return
+        import runpy
+        from flask import current_app
+        
+        config_path = os.path.join(os.path.dirname(current_app.root_path), 'gunicorn.conf.py')
+        overrides = {'bind': bind, 'workers': workers, 'threads': threads, 'max_requests': max_requests}
+        wsgi_app = current_app._get_current_object()
+        
+        class MedoraServer(BaseApplication):
+            def load_config(self):
+                settings = runpy.run_path(config_path) if os.path.exists(config_path) else {}
+                settings.update({key: value for key, value in overrides.items() if value is not None})
+                for key, value in settings.items():
+                    if key in self.cfg.settings and value is not None:
+                        self.cfg.set(key, value)
+            
+            def load(self):
+                return wsgi_app
+        
+        print(f"🚀 Serving Medora with gunicorn ({config_path})")
+        MedoraServer().run()
@@ -0,0 +1,239 @@
+from app.models import StatCounter, Patient, Appointment
+from app import db
+from collections import Counter
+from datetime import date
+from sqlalchemy import func, insert
+
+# Dimensions maintained per user:
+#   patients/total, gender/<gender>, blood_type/<type>, birth_date/<YYYY-MM-DD>,
+#   registration_month/<YYYY-MM>, appointments/total, appointment_status/<status>
+# Only active patients, and appointments of active patients, are counted.
+# version/total is bumped by every counter write; caches in any worker compare it
+# to the version their snapshot was computed at.
+
+VERSION_KEY = ('version', 'total')
+
+def patient_state(patient):
+    """Snapshot the counted attributes of a patient (None when it is not counted)"""
+    if not patient.is_active:
+        return None
+    return (patient.user_id, patient.gender, patient.blood_type, patient.date_of_birth, patient.created_at)
+
+def appointment_state(appointment, patient):
+    """Snapshot the counted attributes of an appointment (None when it is not counted)"""
+    if not patient.is_active:
+        return None
+    return (patient.user_id, appointment.status or 'scheduled')
+
+def _patient_buckets(state):
+    user_id, gender, blood_type, date_of_birth, created_at = state
+    buckets = [('patients', 'total'), ('gender', gender)]
+    if blood_type:
+        buckets.append(('blood_type', blood_type))
+    if date_of_birth:
+        buckets.append(('birth_date', date_of_birth.isoformat()))
+    if created_at:
+        buckets.append(('registration_month', created_at.strftime('%Y-%m')))
+    return [(user_id, dimension, bucket) for dimension, bucket in buckets]
+
+def _appointment_buckets(state):
+    user_id, status = state
+    return [(user_id, 'appointments', 'total'), (user_id, 'appointment_status', status)]
+
+def _patient_appointment_deltas(patient_id, user_id, sign):
+    """Deltas moving all of a patient's appointments in or out of a user's counters"""
+    deltas = Counter()
+    rows = db.session.query(Appointment.status, func.count(Appointment.id)).filter(
+        Appointment.patient_id == patient_id
+    ).group_by(Appointment.status).all()
+    for status, count in rows:
+        for key in _appointment_buckets((user_id, status or 'scheduled')):
+            deltas[key] += sign * count
+    return deltas
+
+def _upsert(rows):
+    """Add each row's count to its counter, creating missing counters"""
+    table = StatCounter.__table__
+    dialect = db.session.get_bind().dialect.name
+    
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(table)
+        stmt = stmt.on_duplicate_key_update(count=table.c.count + stmt.inserted['count'])
+        db.session.execute(stmt, rows)
+    elif dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.dimension, table.c.bucket],
+            set_={'count': table.c.count + stmt.excluded['count']}
+        )
+        db.session.execute(stmt, rows)
+    else:
+        for row in rows:
+            updated = db.session.execute(
+                table.update().where(
+                    table.c.user_id == row['user_id'],
+                    table.c.dimension == row['dimension'],
+                    table.c.bucket == row['bucket']
+                ).values(count=table.c.count + row['count'])
+            ).rowcount
+            if not updated:
+                db.session.execute(insert(table), row)
+
+def apply_deltas(deltas):
+    """Apply {(user_id, dimension, bucket): delta} in the current transaction"""
+    rows = [
+        {'user_id': user_id, 'dimension': dimension, 'bucket': bucket, 'count': delta}
+        for (user_id, dimension, bucket), delta in deltas.items() if delta
+    ]
+    if rows:
+        rows.extend(_version_rows({row['user_id'] for row in rows}))
+        _upsert(rows)
+
+def _version_rows(user_ids):
+    return [
+        {'user_id': user_id, 'dimension': VERSION_KEY[0], 'bucket': VERSION_KEY[1], 'count': 1}
+        for user_id in sorted(user_ids)
+    ]
+
+def read_version(user_id):
+    """Current counter version of a user (0 before the first write)"""
+    return db.session.query(StatCounter.count).filter(
+        StatCounter.user_id == user_id,
+        StatCounter.dimension == VERSION_KEY[0],
+        StatCounter.bucket == VERSION_KEY[1]
+    ).scalar() or 0
+
+def record_patient_change(patient_id, before, after):
+    """Update counters for a patient insert/update/soft-delete (states from patient_state)"""
+    deltas = Counter()
+    for key in _patient_buckets(before) if before else []:
+        deltas[key] -= 1
+    for key in _patient_buckets(after) if after else []:
+        deltas[key] += 1
+    
+    # A patient's appointments are counted for its owner only while it is active
+    before_user = before[0] if before else None
+    after_user = after[0] if after else None
+    if before_user != after_user:
+        if before_user is not None:
+            deltas.update(_patient_appointment_deltas(patient_id, before_user, -1))
+        if after_user is not None:
+            deltas.update(_patient_appointment_deltas(patient_id, after_user, 1))
+    
+    apply_deltas(deltas)
+
+def record_appointment_changes(changes):
+    """Update counters for appointment writes given (before, after) appointment states"""
+    deltas = Counter()
+    for before, after in changes:
+        for key in _appointment_buckets(before) if before else []:
+            deltas[key] -= 1
+        for key in _appointment_buckets(after) if after else []:
+            deltas[key] += 1
+    apply_deltas(deltas)
+
+def read_counters(user_id, dimensions=None):
+    """Read a user's counters as {dimension: {bucket: count}} with one primary-key range read"""
+    query = StatCounter.query.filter(StatCounter.user_id == user_id)
+    if dimensions:
+        query = query.filter(StatCounter.dimension.in_(dimensions))
+    
+    counters = {}
+    for counter in query.all():
+        if counter.count:
+            counters.setdefault(counter.dimension, {})[counter.bucket] = counter.count
+    return counters
+
+def age_band(age):
+    """Map an age in years to the dashboard's age ranges"""
+    if age < 18:
+        return '0-17'
+    elif age < 30:
+        return '18-29'
+    elif age < 50:
+        return '30-49'
+    elif age < 65:
+        return '50-64'
+    return '65+'
+
+def age_distribution(birth_dates, today=None):
+    """Fold birth_date counters into age ranges"""
+    today = today or date.today()
+    distribution = {}
+    for bucket, count in birth_dates.items():
+        dob = date.fromisoformat(bucket)
+        age = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
+        band = age_band(age)
+        distribution[band] = distribution.get(band, 0) + count
+    return distribution
+
+def _month_bucket(column):
+    """SQL expression formatting a datetime column as YYYY-MM on the active database"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        return func.strftime('%Y-%m', column)
+    if dialect == 'postgresql':
+        return func.to_char(column, 'YYYY-MM')
+    return func.date_format(column, '%Y-%m')
+
+def rebuild_counters(user_id=None):
+    """Recompute counters from scratch (all users or one) to repair drift. No commit.
+    
+    Returns (rows_written, drifted_buckets).
+    """
+    # The version counter survives the rebuild so it never goes back to a value a cache has seen
+    existing = StatCounter.query.filter(StatCounter.dimension != VERSION_KEY[0])
+    if user_id is not None:
+        existing = existing.filter(StatCounter.user_id == user_id)
+    previous = {(c.user_id, c.dimension, c.bucket): c.count for c in existing.all() if c.count}
+    existing.delete(synchronize_session=False)
+    
+    patient_filter = [Patient.is_active == True]
+    if user_id is not None:
+        patient_filter.append(Patient.user_id == user_id)
+    
+    fresh = Counter()
+    grouped = [
+        ('patients', None),
+        ('gender', Patient.gender),
+        ('blood_type', Patient.blood_type),
+        ('birth_date', Patient.date_of_birth),
+        ('registration_month', _month_bucket(Patient.created_at)),
+    ]
+    for dimension, expression in grouped:
+        if expression is None:
+            rows = db.session.query(Patient.user_id, func.count(Patient.id)).filter(
+                *patient_filter
+            ).group_by(Patient.user_id).all()
+            rows = [(uid, 'total', count) for uid, count in rows]
+        else:
+            rows = db.session.query(Patient.user_id, expression, func.count(Patient.id)).filter(
+                *patient_filter
+            ).group_by(Patient.user_id, expression).all()
+        for uid, bucket, count in rows:
+            if bucket is None:
+                continue
+            if isinstance(bucket, date):
+                bucket = bucket.isoformat()
+            fresh[(uid, dimension, str(bucket))] += count
+    
+    rows = db.session.query(Patient.user_id, Appointment.status, func.count(Appointment.id)).join(
+        Patient, Appointment.patient_id == Patient.id
+    ).filter(*patient_filter).group_by(Patient.user_id, Appointment.status).all()
+    for uid, status, count in rows:
+        for key in _appointment_buckets((uid, status or 'scheduled')):
+            fresh[key] += count
+    
+    apply_deltas(fresh)
+    # Users left with no counters at all still need their cached snapshots refreshed
+    emptied = {uid for uid, _, _ in previous} - {uid for uid, _, _ in fresh}
+    if emptied:
+        _upsert(_version_rows(emptied))
+    
+    drifted = sum(1 for key in set(previous) | set(fresh) if previous.get(key, 0) != fresh.get(key, 0))
+    return len(fresh), drifted
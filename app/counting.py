@@ -0,0 +1,122 @@
+from flask import request, current_app
+from app import db
+from sqlalchemy import func, select, text
+from sqlalchemy.sql import Select
+from app.readpath import fetch_rows
+import json
+import math
+import time
+
+# table name -> (estimated rows, fetched at)
+_table_estimates = {}
+
+def wants_exact_count():
+    """True when the caller opted into exact totals with ?exact_count=1"""
+    return request.args.get('exact_count', '').lower() in ('1', 'true', 'yes')
+
+def table_row_estimate(model):
+    """Row count of a whole table from database statistics, cached for COUNT_ESTIMATE_TTL"""
+    table = model.__tablename__
+    cached = _table_estimates.get(table)
+    if cached and time.monotonic() - cached[1] < current_app.config['COUNT_ESTIMATE_TTL']:
+        return cached[0]
+    
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'mysql':
+        estimate = db.session.execute(text(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+        ), {'table': table}).scalar()
+    elif dialect == 'postgresql':
+        estimate = db.session.execute(text(
+            "SELECT reltuples::bigint FROM pg_class WHERE relname = :table"
+        ), {'table': table}).scalar()
+        if estimate is not None and estimate < 0:  # never analyzed
+            estimate = None
+    else:
+        # SQLite keeps no row statistics; the highest id is a primary-key lookup
+        estimate = db.session.query(func.max(model.id)).scalar() or 0
+    
+    if estimate is None:
+        estimate = db.session.query(func.count(model.id)).scalar()
+    _table_estimates[table] = (int(estimate), time.monotonic())
+    return int(estimate)
+
+def _statement(query):
+    """The Core select behind an ORM Query (a select is returned as is)"""
+    return query if isinstance(query, Select) else query.statement
+
+def _planner_estimate(query):
+    """Row estimate for a filtered query from the planner, or None where unavailable"""
+    bind = db.session.get_bind()
+    if bind.dialect.name not in ('mysql', 'postgresql'):
+        return None
+    compiled = _statement(query).compile(dialect=bind.dialect)
+    connection = db.session.connection()
+    if bind.dialect.name == 'mysql':
+        rows = connection.exec_driver_sql(f"EXPLAIN {compiled}", compiled.params).mappings().all()
+        return int(rows[0]['rows'] * float(rows[0].get('filtered') or 100) / 100) if rows else None
+    plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    return int(plan[0]['Plan']['Plan Rows'])
+
+def count_rows(query, exact=False, whole_table=None):
+    """Count a query's rows cheaply. Returns (count, is_exact).
+    
+    With exact=True this is a plain COUNT(*). Otherwise `whole_table` (a model) means
+    the query is unfiltered and table statistics are used; filtered queries count at
+    most COUNT_EXACT_LIMIT rows exactly and fall back to the planner's estimate beyond.
+    """
+    query = query.order_by(None)
+    if exact:
+        if isinstance(query, Select):
+            return db.session.execute(select(func.count()).select_from(query.subquery())).scalar(), True
+        return query.count(), True
+    if whole_table is not None:
+        return table_row_estimate(whole_table), False
+    
+    limit = current_app.config['COUNT_EXACT_LIMIT']
+    capped = db.session.query(func.count()).select_from(query.limit(limit + 1).subquery()).scalar()
+    if capped <= limit:
+        return capped, True
+    return max(_planner_estimate(query) or 0, capped), False
+
+def paginate_query(query, page, per_page, count_query=None, whole_table=None, known_total=None, exact=None):
+    """Fetch one page without an exact COUNT(*) unless the caller asks for it.
+    
+    `query` is an ORM Query (items are instances) or a Core select (items are Row
+    tuples, see app/readpath.py). `known_total` is an exact total maintained
+    elsewhere (e.g. counters). Returns (items, pagination) where
+    pagination['total_exact'] says whether total is estimated.
+    """
+    if exact is None:
+        exact = wants_exact_count()
+    page = max(page, 1)
+    
+    # One extra row tells us whether there is a next page without counting
+    query = query.limit(per_page + 1).offset((page - 1) * per_page)
+    rows = fetch_rows(query) if isinstance(query, Select) else query.all()
+    items = rows[:per_page]
+    has_next = len(rows) > per_page
+    seen = (page - 1) * per_page + len(items)
+    
+    if not has_next and (items or page == 1):
+        total, total_exact = seen, True
+    elif known_total is not None:
+        total, total_exact = known_total, True
+    else:
+        total, total_exact = count_rows(count_query if count_query is not None else query,
+                                        exact=exact, whole_table=whole_table)
+    if has_next and total <= seen:
+        # Estimates must stay consistent with the rows actually there
+        total, total_exact = seen + 1, False
+    
+    return items, {
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'total_exact': total_exact,
+        'pages': math.ceil(total / per_page) if per_page else 0,
+        'has_next': has_next,
+        'has_prev': page > 1
+    }
@@ -1,12 +1,195 @@
-from flask import Blueprint, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models import User, Patient, Appointment
+from app.models import (User, Patient, Appointment, DailyRegistrationRollup, DailyAppointmentRollup,
+                        DailyDoctorAppointmentRollup)
+from app.reminders import pending_notifications, encode_cursor
+from app.query_monitor import query_budget
+from app.cache import SnapshotCache
+from app.parallel import run_parallel, DeadlineExceeded
+from app.counters import read_counters, read_version, age_distribution
+from app.rollups import rollup_as_of
 from app import db
-from datetime import datetime, timedelta
-from sqlalchemy import func
+from app import events
+from datetime import datetime, date, timedelta
+from sqlalchemy import func, case
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
+# Statistics block of /dashboard, cached per user and keyed to the user's counter version
+statistics_cache = SnapshotCache('dashboard_statistics')
+
+def _invalidate_statistics(event_type, payload):
+    """Drop this worker's cached statistics for the user whose patients or appointments changed"""
+    if payload.get('user_id') is not None:
+        statistics_cache.invalidate(int(payload['user_id']))
+
+events.subscribe('patient_changed', _invalidate_statistics)
+events.subscribe('appointments_changed', _invalidate_statistics)
+
+def compute_dashboard_statistics(user_id):
+    """Compute the statistics block of the dashboard from the user's counters"""
+    # One primary-key range read on stat_counters, whatever the table sizes
+    stats = read_counters(user_id)
+    
+    # Monthly patient registration trend (last 6 months)
+    first_month = (datetime.now() - timedelta(days=180)).strftime('%Y-%m')
+    monthly_trend = {
+        month: count for month, count in sorted(stats.get('registration_month', {}).items())
+        if month >= first_month
+    }
+    
+    return {
+        'total_patients': stats.get('patients', {}).get('total', 0),
+        'total_appointments': stats.get('appointments', {}).get('total', 0),
+        'gender_distribution': stats.get('gender', {}),
+        'age_distribution': age_distribution(stats.get('birth_date', {})),
+        'blood_type_distribution': stats.get('blood_type', {}),
+        'appointment_status_distribution': stats.get('appointment_status', {}),
+        'monthly_registrations': monthly_trend
+    }
+
+GENDERS = ['Male', 'Female', 'Other']
+BLOOD_TYPES = ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']
+APPOINTMENT_STATUSES = ['scheduled', 'completed', 'cancelled', 'rescheduled']
+AGE_BANDS = [('0-17', 18), ('18-29', 30), ('30-49', 50), ('50-64', 65), ('65+', None)]
+
+def years_ago(today, years):
+    """Same calendar day `years` ago (Feb 29 falls back to Feb 28)"""
+    try:
+        return today.replace(year=today.year - years)
+    except ValueError:
+        return today.replace(year=today.year - years, day=28)
+
+def _count_when(condition):
+    return func.sum(case((condition, 1), else_=0))
+
+def _count_unknown(column, known):
+    """Count rows whose value is set but outside the known list"""
+    return _count_when(db.and_(column.isnot(None), column.notin_(known)))
+
+def _unknown_values(query, column, known):
+    """{value: count} for values outside the known list, by a grouped read"""
+    rows = query.filter(column.isnot(None), column.notin_(known)).group_by(column).all()
+    return {value: int(count) for value, count in rows}
+
+def aggregate_dashboard_statistics(user_id):
+    """Compute the statistics block with one statement using conditional aggregation.
+    
+    Patients and appointments are each scanned once; the two aggregate rows are
+    cross-joined so the whole block comes back in a single round-trip. Only portable
+    SQL is used, so this runs unchanged on MySQL and SQLite. Values outside the known
+    genders, blood types and statuses are counted too, and only when some exist is
+    a grouped query run to break them down.
+    """
+    today = date.today()
+    now = datetime.now()
+    
+    # Patient aggregate: totals, gender, blood type, age bands and monthly registrations
+    patient_columns = [func.count(Patient.id).label('total_patients')]
+    patient_columns += [_count_when(Patient.gender == gender).label(f'gender_{i}')
+                        for i, gender in enumerate(GENDERS)]
+    patient_columns += [_count_when(Patient.blood_type == blood_type).label(f'blood_{i}')
+                        for i, blood_type in enumerate(BLOOD_TYPES)]
+    patient_columns += [_count_unknown(Patient.gender, GENDERS).label('gender_unknown'),
+                        _count_unknown(Patient.blood_type, BLOOD_TYPES).label('blood_unknown')]
+    
+    # Age bands as date-of-birth ranges instead of a datediff per row
+    younger_than = None
+    for i, (band, upper_age) in enumerate(AGE_BANDS):
+        condition = Patient.date_of_birth.isnot(None)
+        if upper_age is not None:
+            condition = db.and_(condition, Patient.date_of_birth > years_ago(today, upper_age))
+        if younger_than is not None:
+            condition = db.and_(condition, Patient.date_of_birth <= younger_than)
+        patient_columns.append(_count_when(condition).label(f'age_{i}'))
+        if upper_age is not None:
+            younger_than = years_ago(today, upper_age)
+    
+    # Monthly registrations for the last 6 months (whole calendar months), as half-open created_at ranges
+    cutoff = now - timedelta(days=180)
+    months = []
+    month_start = datetime(cutoff.year, cutoff.month, 1)
+    while month_start <= now:
+        next_month = datetime(month_start.year + month_start.month // 12, month_start.month % 12 + 1, 1)
+        months.append((month_start.strftime('%Y-%m'), month_start, next_month))
+        month_start = next_month
+    patient_columns += [
+        _count_when(db.and_(Patient.created_at >= start, Patient.created_at < end)).label(f'month_{i}')
+        for i, (month, start, end) in enumerate(months)
+    ]
+    
+    patients = db.session.query(*patient_columns).filter(
+        Patient.user_id == user_id,
+        Patient.is_active == True
+    ).subquery()
+    
+    # Appointment aggregate: total and status distribution
+    appointment_columns = [func.count(Appointment.id).label('total_appointments')]
+    appointment_columns += [_count_when(Appointment.status == status).label(f'status_{i}')
+                            for i, status in enumerate(APPOINTMENT_STATUSES)]
+    appointment_columns.append(_count_unknown(Appointment.status, APPOINTMENT_STATUSES).label('status_unknown'))
+    appointments = db.session.query(*appointment_columns).join(
+        Patient, Appointment.patient_id == Patient.id
+    ).filter(
+        Patient.user_id == user_id,
+        Patient.is_active == True
+    ).subquery()
+    
+    row = db.session.query(patients, appointments).select_from(patients).join(
+        appointments, db.true()
+    ).one()._mapping
+    
+    def distribution(labels, prefix):
+        return {label: int(row[f'{prefix}_{i}'] or 0) for i, label in enumerate(labels)
+                if row[f'{prefix}_{i}']}
+    
+    statistics = {
+        'total_patients': int(row['total_patients'] or 0),
+        'total_appointments': int(row['total_appointments'] or 0),
+        'gender_distribution': distribution(GENDERS, 'gender'),
+        'age_distribution': distribution([band for band, upper_age in AGE_BANDS], 'age'),
+        'blood_type_distribution': distribution(BLOOD_TYPES, 'blood'),
+        'appointment_status_distribution': distribution(APPOINTMENT_STATUSES, 'status'),
+        'monthly_registrations': distribution([month for month, start, end in months], 'month')
+    }
+    
+    # Rare: legacy or free-form values (e.g. 'Scheduled') are broken down by a grouped read
+    active_patients = [Patient.user_id == user_id, Patient.is_active == True]
+    if row['gender_unknown']:
+        statistics['gender_distribution'].update(_unknown_values(
+            db.session.query(Patient.gender, func.count(Patient.id)).filter(*active_patients),
+            Patient.gender, GENDERS
+        ))
+    if row['blood_unknown']:
+        statistics['blood_type_distribution'].update(_unknown_values(
+            db.session.query(Patient.blood_type, func.count(Patient.id)).filter(*active_patients),
+            Patient.blood_type, BLOOD_TYPES
+        ))
+    if row['status_unknown']:
+        statistics['appointment_status_distribution'].update(_unknown_values(
+            db.session.query(Appointment.status, func.count(Appointment.id)).join(
+                Patient, Appointment.patient_id == Patient.id
+            ).filter(*active_patients),
+            Appointment.status, APPOINTMENT_STATUSES
+        ))
+    return statistics
+
+def get_dashboard_statistics(user_id):
+    """Return the user's dashboard statistics from the cache, recomputing when needed"""
+    user_id = int(user_id)
+    if current_app.config['DASHBOARD_STATS_SOURCE'] == 'aggregate':
+        compute = aggregate_dashboard_statistics
+    else:
+        compute = compute_dashboard_statistics
+    # Writes from any worker bump the version, so other workers' snapshots go stale at once
+    return statistics_cache.get(
+        user_id,
+        lambda: compute(user_id),
+        ttl=current_app.config['DASHBOARD_CACHE_TTL'],
+        max_stale=current_app.config['DASHBOARD_CACHE_MAX_STALE'],
+        version=read_version(user_id)
+    )
+
 @dashboard_bp.route('/dashboard', methods=['GET'])
 @jwt_required()
 def get_dashboard():
@@ -14,131 +197,67 @@ def get_dashboard():
     try:
         current_user_id = get_jwt_identity()
         
-        # Get user info
-        user = User.query.get(current_user_id)
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
-        # Get patient count
-        patient_count = Patient.query.filter_by(
-            user_id=current_user_id, 
-            is_active=True
-        ).count()
+        today = datetime.now().date()
+        week_from_now = today + timedelta(days=7)
         
-        # Get appointment count
-        appointment_count = Appointment.query.join(Patient).filter(
-            Patient.user_id == current_user_id,
-            Patient.is_active == True
-        ).count()
+        def load_user():
+            user = User.query.get(current_user_id)
+            return user.to_dict() if user else None
         
         # Get recent patients (last 5)
-        recent_patients = Patient.query.filter_by(
-            user_id=current_user_id, 
-            is_active=True
-        ).order_by(Patient.created_at.desc()).limit(5).all()
+        def load_recent_patients():
+            recent_patients = Patient.query.filter_by(
+                user_id=current_user_id, 
+                is_active=True
+            ).order_by(Patient.created_at.desc()).limit(5).all()
+            return [patient.to_dict() for patient in recent_patients]
         
         # Get upcoming appointments (next 7 days)
-        today = datetime.now().date()
-        week_from_now = today + timedelta(days=7)
-        
-        upcoming_appointments = Appointment.query.join(Patient).filter(
-            Patient.user_id == current_user_id,
-            Patient.is_active == True,
-            Appointment.appointment_date >= today,
-            Appointment.appointment_date <= week_from_now,
-            Appointment.status == 'scheduled'
-        ).order_by(Appointment.appointment_date).limit(5).all()
-        
-        # Get gender distribution
-        gender_stats = db.session.query(
-            Patient.gender, 
-            func.count(Patient.id)
-        ).filter_by(
-            user_id=current_user_id, 
-            is_active=True
-        ).group_by(Patient.gender).all()
-        
-        gender_distribution = {gender: count for gender, count in gender_stats}
-        
-        # Get age distribution
-        age_stats = db.session.query(
-            func.floor(func.datediff(func.curdate(), Patient.date_of_birth) / 365.25).label('age_group'),
-            func.count(Patient.id)
-        ).filter_by(
-            user_id=current_user_id, 
-            is_active=True
-        ).group_by('age_group').order_by('age_group').all()
-        
-        age_distribution = {}
-        for age_group, count in age_stats:
-            if age_group is not None:
-                if age_group < 18:
-                    age_range = '0-17'
-                elif age_group < 30:
-                    age_range = '18-29'
-                elif age_group < 50:
-                    age_range = '30-49'
-                elif age_group < 65:
-                    age_range = '50-64'
-                else:
-                    age_range = '65+'
-                
-                age_distribution[age_range] = age_distribution.get(age_range, 0) + count
-        
-        # Get blood type distribution
-        blood_type_stats = db.session.query(
-            Patient.blood_type, 
-            func.count(Patient.id)
-        ).filter_by(
-            user_id=current_user_id, 
-            is_active=True
-        ).filter(Patient.blood_type.isnot(None)).group_by(Patient.blood_type).all()
-        
-        blood_type_distribution = {blood_type: count for blood_type, count in blood_type_stats}
-        
-        # Get appointment status distribution
-        appointment_status_stats = db.session.query(
-            Appointment.status, 
-            func.count(Appointment.id)
-        ).join(Patient).filter(
-            Patient.user_id == current_user_id,
-            Patient.is_active == True
-        ).group_by(Appointment.status).all()
-        
-        appointment_status_distribution = {status: count for status, count in appointment_status_stats}
-        
-        # Get monthly patient registration trend (last 6 months)
-        six_months_ago = datetime.now() - timedelta(days=180)
-        monthly_registrations = db.session.query(
-            func.date_format(Patient.created_at, '%Y-%m').label('month'),
-            func.count(Patient.id)
-        ).filter(
-            Patient.user_id == current_user_id,
-            Patient.is_active == True,
-            Patient.created_at >= six_months_ago
-        ).group_by('month').order_by('month').all()
-        
-        monthly_trend = {month: count for month, count in monthly_registrations}
+        def load_upcoming_appointments():
+            upcoming_appointments = Appointment.query.join(Patient).filter(
+                Patient.user_id == current_user_id,
+                Patient.is_active == True,
+                Appointment.appointment_date >= today,
+                Appointment.appointment_date <= week_from_now,
+                Appointment.status == 'scheduled'
+            ).order_by(Appointment.appointment_date).limit(5).all()
+            return [appointment.to_dict() for appointment in upcoming_appointments]
         
-        return jsonify({
-            'user': user.to_dict(),
-            'statistics': {
-                'total_patients': patient_count,
-                'total_appointments': appointment_count,
-                'gender_distribution': gender_distribution,
-                'age_distribution': age_distribution,
-                'blood_type_distribution': blood_type_distribution,
-                'appointment_status_distribution': appointment_status_distribution,
-                'monthly_registrations': monthly_trend
-            },
-            'recent_patients': [patient.to_dict() for patient in recent_patients],
-            'upcoming_appointments': [appointment.to_dict() for appointment in upcoming_appointments]
-        }), 200
+        # The sections are independent, so run them concurrently
+        data = run_parallel({
+            'user': load_user,
+            'statistics': lambda: get_dashboard_statistics(current_user_id),
+            'recent_patients': load_recent_patients,
+            'upcoming_appointments': load_upcoming_appointments
+        })
+        if data['user'] is None:
+            return jsonify({'error': 'User not found'}), 404
         
+        return jsonify(data), 200
+    
+    except DeadlineExceeded as e:
+        current_app.logger.error(f"Dashboard timeout: {str(e)}")
+        return jsonify({'error': 'Dashboard data took too long to load'}), 504
+    
     except Exception as e:
         current_app.logger.error(f"Dashboard error: {str(e)}")
         return jsonify({'error': 'Failed to retrieve dashboard data'}), 500
 
+@dashboard_bp.route('/dashboard/cache-stats', methods=['GET'])
+@jwt_required()
+def get_cache_stats():
+    """Get dashboard cache hit rate and recompute timings (admin only)"""
+    try:
+        current_user = User.query.get(get_jwt_identity())
+        if not current_user or current_user.role != 'admin':
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        return jsonify({'cache': statistics_cache.stats()}), 200
+    
+    except Exception as e:
+        current_app.logger.error(f"Cache stats error: {str(e)}")
+        return jsonify({'error': 'Failed to retrieve cache stats'}), 500
+
 @dashboard_bp.route('/dashboard/quick-stats', methods=['GET'])
 @jwt_required()
 def get_quick_stats():
@@ -146,37 +265,42 @@ def get_quick_stats():
     try:
         current_user_id = get_jwt_identity()
         
-        # Get counts
-        patient_count = Patient.query.filter_by(
-            user_id=current_user_id, 
-            is_active=True
-        ).count()
-        
         today = datetime.now().date()
+        week_start = today - timedelta(days=today.weekday())
+        week_end = week_start + timedelta(days=6)
+        
+        # Patient totals come from the maintained counters
+        def load_counters():
+            return read_counters(current_user_id, ['patients', 'registration_month'])
         
-        # Today's appointments
-        today_appointments = Appointment.query.join(Patient).filter(
-            Patient.user_id == current_user_id,
-            Patient.is_active == True,
-            func.date(Appointment.appointment_date) == today
-        ).count()
+        # Today's appointments (half-open range so appointment_date stays indexable)
+        def count_today_appointments():
+            return Appointment.query.join(Patient).filter(
+                Patient.user_id == current_user_id,
+                Patient.is_active == True,
+                Appointment.appointment_date >= today,
+                Appointment.appointment_date < today + timedelta(days=1)
+            ).count()
         
         # This week's appointments
-        week_start = today - timedelta(days=today.weekday())
-        week_end = week_start + timedelta(days=6)
-        week_appointments = Appointment.query.join(Patient).filter(
-            Patient.user_id == current_user_id,
-            Patient.is_active == True,
-            func.date(Appointment.appointment_date).between(week_start, week_end)
-        ).count()
-        
-        # New patients this month
-        month_start = today.replace(day=1)
-        new_patients_month = Patient.query.filter(
-            Patient.user_id == current_user_id,
-            Patient.is_active == True,
-            Patient.created_at >= month_start
-        ).count()
+        def count_week_appointments():
+            return Appointment.query.join(Patient).filter(
+                Patient.user_id == current_user_id,
+                Patient.is_active == True,
+                Appointment.appointment_date >= week_start,
+                Appointment.appointment_date < week_end + timedelta(days=1)
+            ).count()
+        
+        results = run_parallel({
+            'counters': load_counters,
+            'today_appointments': count_today_appointments,
+            'week_appointments': count_week_appointments
+        })
+        stats = results['counters']
+        patient_count = stats.get('patients', {}).get('total', 0)
+        new_patients_month = stats.get('registration_month', {}).get(today.strftime('%Y-%m'), 0)
+        today_appointments = results['today_appointments']
+        week_appointments = results['week_appointments']
         
         return jsonify({
             'quick_stats': {
@@ -186,68 +310,119 @@ def get_quick_stats():
                 'new_patients_month': new_patients_month
             }
         }), 200
-        
+    
+    except DeadlineExceeded as e:
+        current_app.logger.error(f"Quick stats timeout: {str(e)}")
+        return jsonify({'error': 'Quick stats took too long to load'}), 504
+    
     except Exception as e:
         current_app.logger.error(f"Quick stats error: {str(e)}")
         return jsonify({'error': 'Failed to retrieve quick stats'}), 500
 
 @dashboard_bp.route('/dashboard/notifications', methods=['GET'])
+@query_budget(2)
 @jwt_required()
 def get_notifications():
     """Get notifications for the current user"""
     try:
         current_user_id = get_jwt_identity()
-        notifications = []
-        
-        # Check for upcoming appointments (next 24 hours)
-        tomorrow = datetime.now() + timedelta(days=1)
-        upcoming_appointments = Appointment.query.join(Patient).filter(
-            Patient.user_id == current_user_id,
-            Patient.is_active == True,
-            Appointment.appointment_date <= tomorrow,
-            Appointment.appointment_date >= datetime.now(),
-            Appointment.status == 'scheduled'
-        ).all()
+        cursor = request.args.get('cursor')
         
-        for appointment in upcoming_appointments:
-            notifications.append({
-                'type': 'appointment_reminder',
-                'message': f'Appointment with {appointment.doctor_name} for {appointment.patient.first_name} {appointment.patient.last_name}',
-                'date': appointment.appointment_date.isoformat(),
-                'priority': 'medium'
-            })
-        
-        # Check for patients with missing critical information
-        patients_missing_info = Patient.query.filter(
-            Patient.user_id == current_user_id,
-            Patient.is_active == True,
-            db.or_(
-                Patient.emergency_contact_name.is_(None),
-                Patient.emergency_contact_phone.is_(None),
-                Patient.allergies.is_(None)
-            )
-        ).limit(5).all()
-        
-        for patient in patients_missing_info:
-            missing_fields = []
-            if not patient.emergency_contact_name:
-                missing_fields.append('emergency contact')
-            if not patient.emergency_contact_phone:
-                missing_fields.append('emergency phone')
-            if not patient.allergies:
-                missing_fields.append('allergies')
-            
-            notifications.append({
-                'type': 'missing_info',
-                'message': f'Patient {patient.first_name} {patient.last_name} is missing: {", ".join(missing_fields)}',
-                'patient_id': patient.id,
-                'priority': 'low'
-            })
+        # Reminders are precomputed on the write paths, so this is a single indexed read
+        notifications = pending_notifications(current_user_id, cursor=cursor)
         
         return jsonify({
-            'notifications': notifications
+            'notifications': [notification.to_dict() for notification in notifications],
+            'cursor': encode_cursor(notifications[-1]) if notifications else cursor
         }), 200
-        
+    
     except Exception as e:
         current_app.logger.error(f"Notifications error: {str(e)}")
-        return jsonify({'error': 'Failed to retrieve notifications'}), 500 
\ No newline at end of file
+        return jsonify({'error': 'Failed to retrieve notifications'}), 500
+
+def _trend_series(rows, labels, label_for):
+    """Fold (day, status, count) rows into {status: [count per label]}, plus a total series"""
+    positions = {label: index for index, label in enumerate(labels)}
+    series = {'total': [0] * len(labels)}
+    for day, status, count in rows:
+        index = positions.get(label_for(day))
+        if index is None:
+            continue
+        series.setdefault(status, [0] * len(labels))[index] += count
+        series['total'][index] += count
+    return series
+
+@dashboard_bp.route('/dashboard/trends', methods=['GET'])
+@query_budget(5)
+@jwt_required()
+def get_trends():
+    """Get daily or monthly registration and appointment trends from the rollup tables"""
+    try:
+        current_user_id = get_jwt_identity()
+        current_user = User.query.get(current_user_id)
+        if not current_user:
+            return jsonify({'error': 'User not found'}), 404
+        
+        days = request.args.get('days', 90, type=int)
+        granularity = request.args.get('granularity', 'day')
+        if days < 1 or days > 366:
+            return jsonify({'error': 'days must be between 1 and 366'}), 400
+        if granularity not in ['day', 'month']:
+            return jsonify({'error': 'granularity must be day or month'}), 400
+        
+        today = date.today()
+        since = today - timedelta(days=days - 1)
+        if granularity == 'day':
+            labels = [(since + timedelta(days=offset)).isoformat() for offset in range(days)]
+            label_for = lambda day: day.isoformat()
+        else:
+            labels = sorted({(since + timedelta(days=offset)).strftime('%Y-%m') for offset in range(days)})
+            label_for = lambda day: day.strftime('%Y-%m')
+        
+        registrations = db.session.query(
+            DailyRegistrationRollup.day, db.literal('registrations'), DailyRegistrationRollup.count
+        ).filter(
+            DailyRegistrationRollup.user_id == current_user_id,
+            DailyRegistrationRollup.day >= since,
+            DailyRegistrationRollup.day <= today
+        ).all()
+        
+        appointments = db.session.query(
+            DailyAppointmentRollup.day, DailyAppointmentRollup.status, DailyAppointmentRollup.count
+        ).filter(
+            DailyAppointmentRollup.user_id == current_user_id,
+            DailyAppointmentRollup.day >= since,
+            DailyAppointmentRollup.day <= today
+        ).all()
+        
+        result = {
+            'granularity': granularity,
+            'labels': labels,
+            'registrations': _trend_series(registrations, labels, label_for)['total'],
+            'appointments': _trend_series(appointments, labels, label_for)
+        }
+        
+        # Doctors see their own schedule; admins may ask for any doctor's
+        if current_user.role in ['admin', 'doctor']:
+            doctor_id = current_user.id
+            if current_user.role == 'admin':
+                doctor_id = request.args.get('doctor_id', doctor_id, type=int)
+            doctor_rows = db.session.query(
+                DailyDoctorAppointmentRollup.day, DailyDoctorAppointmentRollup.status,
+                DailyDoctorAppointmentRollup.count
+            ).filter(
+                DailyDoctorAppointmentRollup.doctor_id == doctor_id,
+                DailyDoctorAppointmentRollup.day >= since,
+                DailyDoctorAppointmentRollup.day <= today
+            ).all()
+            result['doctor_id'] = doctor_id
+            result['doctor_appointments'] = _trend_series(doctor_rows, labels, label_for)
+        
+        as_of = rollup_as_of()
+        result['as_of'] = as_of.isoformat() if as_of else None
+        
+        return jsonify({'trends': result}), 200
+    
+    except Exception as e:
+        current_app.logger.error(f"Trends error: {str(e)}")
+        return jsonify({'error': 'Failed to retrieve trends'}), 500
@@ -0,0 +1,118 @@
+from app.models import Appointment, User
+from app import db
+from app.rollups import mark_days
+from datetime import datetime
+import re
+
+_TITLE_PREFIX = re.compile(r'^(dr\.?|doctor)\s+', re.IGNORECASE)
+_NON_WORD = re.compile(r'[^a-z ]+')
+
+def normalize_doctor_name(name):
+    """Normalize a free-text doctor name so spelling variants compare equal"""
+    if not name:
+        return ''
+    name = _TITLE_PREFIX.sub('', name.strip())
+    name = _NON_WORD.sub(' ', name.lower())
+    return ' '.join(name.split())
+
+def doctor_display_name(user):
+    """Display name stored in Appointment.doctor_name for a doctor user"""
+    return f"Dr. {user.first_name} {user.last_name}"
+
+def doctor_name_index():
+    """Map normalized doctor names ("first last", "last first", username) to user ids"""
+    index = {}
+    ambiguous = set()
+    doctors = db.session.query(User.id, User.username, User.first_name, User.last_name).filter(
+        User.role.in_(['doctor', 'admin'])
+    ).all()
+    
+    for user_id, username, first_name, last_name in doctors:
+        keys = {
+            normalize_doctor_name(f"{first_name} {last_name}"),
+            normalize_doctor_name(f"{last_name} {first_name}"),
+            normalize_doctor_name(username)
+        }
+        for key in keys:
+            if not key:
+                continue
+            if key in index and index[key] != user_id:
+                ambiguous.add(key)
+            index[key] = user_id
+    
+    # Never guess between two doctors sharing a name
+    for key in ambiguous:
+        index.pop(key, None)
+    return index
+
+def resolve_doctor_id(doctor_name, index=None):
+    """Return the user id for a free-text doctor name, or None if it can't be matched"""
+    if index is None:
+        index = doctor_name_index()
+    return index.get(normalize_doctor_name(doctor_name))
+
+def unbackfilled_names(doctor_ids, index=None):
+    """doctor_name spellings on rows still missing doctor_id that resolve to one of doctor_ids"""
+    if index is None:
+        index = doctor_name_index()
+    doctor_ids = set(doctor_ids)
+    names = db.session.query(Appointment.doctor_name).filter(Appointment.doctor_id.is_(None)).distinct()
+    return {name for (name,) in names if index.get(normalize_doctor_name(name)) in doctor_ids}
+
+def doctor_filter(doctor_ids, doctor_names=(), index=None):
+    """Filter matching a doctor's appointments, including rows not yet backfilled.
+    
+    Rows with doctor_id set match by id; rows still missing it match by any stored
+    spelling of the doctor's name (and by doctor_names, for doctors without a user).
+    """
+    names = unbackfilled_names(doctor_ids, index) | set(doctor_names)
+    return db.or_(
+        Appointment.doctor_id.in_(list(doctor_ids)),
+        db.and_(Appointment.doctor_id.is_(None), Appointment.doctor_name.in_(list(names)))
+    )
+
+def backfill_doctor_ids(chunk_size=1000):
+    """Fill Appointment.doctor_id from doctor_name in short keyset-paged transactions.
+    
+    Safe to run while the app is serving traffic and to re-run after it is interrupted.
+    Returns (updated, unmatched) where unmatched maps doctor names to row counts.
+    """
+    index = doctor_name_index()
+    updated = 0
+    unmatched = {}
+    last_id = 0
+    
+    while True:
+        rows = db.session.query(Appointment.id, Appointment.doctor_name, Appointment.appointment_date).filter(
+            Appointment.id > last_id,
+            Appointment.doctor_id.is_(None)
+        ).order_by(Appointment.id).limit(chunk_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        
+        by_doctor = {}
+        days = set()
+        for appointment_id, doctor_name, appointment_date in rows:
+            doctor_id = resolve_doctor_id(doctor_name, index)
+            if doctor_id is None:
+                unmatched[doctor_name] = unmatched.get(doctor_name, 0) + 1
+            else:
+                by_doctor.setdefault(doctor_id, []).append(appointment_id)
+                days.add(appointment_date)
+        
+        # Bump updated_at so incremental readers (rollups, the analytics snapshot) see
+        # the new doctor_id, and queue the days for the per-doctor rollups
+        now = datetime.utcnow()
+        for doctor_id, appointment_ids in by_doctor.items():
+            Appointment.query.filter(
+                Appointment.id.in_(appointment_ids),
+                Appointment.doctor_id.is_(None)
+            ).update({Appointment.doctor_id: doctor_id, Appointment.updated_at: now}, synchronize_session=False)
+            updated += len(appointment_ids)
+        mark_days(days)
+        
+        # Commit per chunk so row locks are held only briefly
+        db.session.commit()
+    
+    return updated, unmatched
@@ -0,0 +1,25 @@
+from collections import defaultdict
+from flask import current_app, has_app_context
+
+# event type -> list of callbacks; '*' receives every event
+_subscribers = defaultdict(list)
+
+def subscribe(event_type, callback):
+    """Register callback(event_type, payload) for an event type ('*' for all events)"""
+    if callback not in _subscribers[event_type]:
+        _subscribers[event_type].append(callback)
+
+def unsubscribe(event_type, callback):
+    """Remove a previously registered callback"""
+    if callback in _subscribers[event_type]:
+        _subscribers[event_type].remove(callback)
+
+def emit(event_type, **payload):
+    """Deliver a change event to subscribers. Call after the change is committed."""
+    for callback in list(_subscribers[event_type]) + list(_subscribers['*']):
+        try:
+            callback(event_type, payload)
+        except Exception as e:
+            # A failing subscriber must never break the write path that emitted the event
+            if has_app_context():
+                current_app.logger.error(f"Event subscriber error for {event_type}: {str(e)}")
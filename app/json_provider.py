@@ -0,0 +1,79 @@
+import dataclasses
+import decimal
+import time as clock
+import uuid
+from datetime import date, datetime, time
+from flask.json.provider import DefaultJSONProvider
+from app.telemetry import JSON_SECONDS, current_endpoint
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib encoder is used without it
+    orjson = None
+
+def _default(o):
+    """Types neither encoder handles natively; dates are ISO 8601 like the models' to_dict"""
+    if isinstance(o, (datetime, date, time)):
+        return o.isoformat()
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    if hasattr(o, 'tolist'):  # numpy arrays and scalars
+        return o.tolist()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider that encodes with orjson when it is installed.
+    
+    Dates and datetimes are written as ISO 8601 by both encoders, and keys keep their
+    insertion order. Payloads orjson rejects (e.g. integers wider than 64 bits) are
+    retried with the stdlib encoder.
+    """
+    
+    default = staticmethod(_default)
+    sort_keys = False
+    
+    @property
+    def backend(self):
+        return 'orjson' if orjson is not None else 'json'
+    
+    def _orjson_options(self, indent=False):
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+    
+    def dumps_bytes(self, obj, indent=False):
+        """Encode obj to UTF-8 JSON bytes"""
+        if orjson is not None:
+            try:
+                return orjson.dumps(obj, default=_default, option=self._orjson_options(indent))
+            except TypeError:
+                pass
+        return super().dumps(obj, indent=2 if indent else None).encode('utf-8')
+    
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        started = clock.perf_counter()
+        body = self.dumps_bytes(obj, indent=indent)
+        JSON_SECONDS.observe(clock.perf_counter() - started, current_endpoint())
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+def init_json(app):
+    """Install the fast provider unless JSON_PROVIDER is 'default' (Flask's stdlib provider)"""
+    if app.config.get('JSON_PROVIDER', 'fast') == 'fast':
+        app.json = FastJSONProvider(app)
@@ -0,0 +1,338 @@
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context, g, has_request_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.models import User, Notification, LiveEvent
+from app import db
+from app import events
+from app.replica import primary_only
+from collections import deque
+from datetime import datetime, timedelta
+from sqlalchemy import func
+import json
+import threading
+import time
+
+live_bp = Blueprint('live', __name__)
+
+# Re-read this many ids behind the newest relayed event, so rows committed out of id
+# order by concurrent writers are not skipped
+RELAY_OVERLAP = 50
+
+# How often each writing process deletes events older than LIVE_EVENT_RETENTION_SECONDS
+PRUNE_INTERVAL_SECONDS = 60
+
+class Subscriber:
+    """One open stream: a bounded queue of messages for a user"""
+    
+    def __init__(self, user_id, is_admin, max_pending):
+        self.user_id = user_id
+        self.is_admin = is_admin
+        self.max_pending = max_pending
+        self.pending = deque()
+        self.condition = threading.Condition()
+    
+    def wants(self, message):
+        return self.is_admin and not message['private'] or self.user_id in message['user_ids']
+    
+    def push(self, message):
+        with self.condition:
+            if len(self.pending) >= self.max_pending:
+                # A consumer this far behind is better off refetching everything
+                self.pending.clear()
+                message = {'id': message['id'], 'event': 'resync', 'data': {}}
+            self.pending.append(message)
+            self.condition.notify()
+    
+    def next(self, timeout):
+        """Return the next message, or None after `timeout` seconds without one"""
+        with self.condition:
+            if not self.pending:
+                self.condition.wait(timeout)
+            return self.pending.popleft() if self.pending else None
+
+class LiveHub:
+    """Fan-out of change events to this process's open streams, with a short replay history.
+    
+    Relayed events carry the id of their live_events row, so an id means the same on
+    every process and a client can resume on any of them with Last-Event-ID.
+    """
+    
+    def __init__(self, history=500, max_pending=100):
+        self.max_pending = max_pending
+        self._subscribers = set()
+        self._history = deque(maxlen=history)
+        self.last_id = 0
+        self._complete_after = 0  # history holds every relayed event with a larger id
+        self._lock = threading.Lock()
+    
+    def start(self, last_id):
+        """Begin the replay history after the given event id"""
+        with self._lock:
+            self.last_id = self._complete_after = last_id
+            self._history.clear()
+    
+    def publish(self, event, user_ids, data, private=False, event_id=None):
+        """Send an event to the given users (and to admins unless private).
+        
+        Relayed events pass their event_id and are kept for replay; events raised in
+        this process (due reminders) reuse the latest id and are not replayed.
+        """
+        with self._lock:
+            message = {'id': self.last_id if event_id is None else event_id, 'event': event,
+                       'data': data, 'user_ids': set(user_ids), 'private': private}
+            if event_id is not None:
+                if len(self._history) == self._history.maxlen:
+                    self._complete_after = max(self._complete_after, self._history[0]['id'])
+                self._history.append(message)
+                self.last_id = max(self.last_id, event_id)
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            if subscriber.wants(message):
+                subscriber.push(message)
+    
+    def subscribe(self, user_id, is_admin, last_event_id=None):
+        """Open a stream, replaying events missed since last_event_id when still in history"""
+        subscriber = Subscriber(user_id, is_admin, self.max_pending)
+        with self._lock:
+            # An id at or past ours was seen elsewhere moments ago: nothing to replay
+            if last_event_id is not None and last_event_id < self.last_id:
+                if last_event_id < self._complete_after:
+                    # Missed events fell out of history (or predate this process's relay)
+                    subscriber.push({'id': self.last_id, 'event': 'resync', 'data': {}})
+                else:
+                    for message in self._history:
+                        if message['id'] > last_event_id and subscriber.wants(message):
+                            subscriber.push(message)
+            self._subscribers.add(subscriber)
+        return subscriber
+    
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+    
+    def connection_count(self):
+        return len(self._subscribers)
+    
+    def connected_user_ids(self):
+        with self._lock:
+            return {subscriber.user_id for subscriber in self._subscribers}
+
+hub = LiveHub()
+
+_next_prune = 0.0
+
+def _insert_events(rows):
+    """Store events in live_events, where the relay of every live server picks them up.
+    
+    One executemany on its own connection and transaction, so the caller's session is
+    left alone. Writers also prune expired events (at most once a minute per process),
+    so the table stays bounded whether or not a live server is running.
+    """
+    global _next_prune
+    now = time.monotonic()
+    prune = now >= _next_prune
+    if prune:
+        _next_prune = now + PRUNE_INTERVAL_SECONDS
+    with db.engine.begin() as connection:
+        if prune:
+            retention = timedelta(seconds=current_app.config['LIVE_EVENT_RETENTION_SECONDS'])
+            connection.execute(LiveEvent.__table__.delete().where(
+                LiveEvent.created_at < datetime.utcnow() - retention
+            ))
+        connection.execute(LiveEvent.__table__.insert(), rows)
+
+def _queue(event, user_ids, data, private=False):
+    """Queue an event; within a request, all of its events are inserted together at teardown"""
+    row = {
+        'event': event,
+        'user_ids': json.dumps(list(user_ids)),
+        'private': private,
+        'data': json.dumps(data, default=str)
+    }
+    if has_request_context():
+        g.setdefault('live_events', []).append(row)
+    else:
+        _insert_events([row])
+
+@live_bp.teardown_app_request
+def _flush_live_events(exception=None):
+    rows = g.pop('live_events', None)
+    if not rows:
+        return
+    try:
+        _insert_events(rows)
+    except Exception as e:
+        current_app.logger.error(f"Live event insert error: {str(e)}")
+
+def _forward_event(event_type, payload):
+    """Translate write-path events into small deltas for the affected user's streams"""
+    user_id = payload.get('user_id')
+    if user_id is None:
+        return
+    if event_type == 'appointments_changed':
+        _queue('appointment', [int(user_id)], {
+            'action': payload.get('action'),
+            'patient_id': payload.get('patient_id'),
+            'appointment_ids': payload.get('appointment_ids', [])
+        })
+    elif event_type == 'patient_changed':
+        _queue('patient', [int(user_id)], {
+            'action': payload.get('action'),
+            'patient_id': payload.get('patient_id')
+        })
+    elif event_type == 'waitlist_offer':
+        _queue('waitlist_offer', [int(user_id)], {
+            'entry_id': payload.get('entry_id'),
+            'patient_id': payload.get('patient_id'),
+            'slot': payload.get('slot')
+        })
+
+events.subscribe('*', _forward_event)
+
+class LiveRelay(threading.Thread):
+    """Single background thread feeding this process's hub.
+    
+    Every LIVE_POLL_SECONDS it publishes the live_events rows written since the last
+    poll, by whichever process made the change. Every LIVE_REMINDER_INTERVAL_SECONDS
+    it announces notifications that became due, looking up only users with an open
+    stream.
+    """
+    
+    def __init__(self, app):
+        super().__init__(name='medora-live-relay', daemon=True)
+        self.app = app
+        self.recent = deque(maxlen=RELAY_OVERLAP * 10)  # relayed ids, oldest first
+        self.seen = set()
+        self._start_position()
+        self.last_check = datetime.now()
+        self.next_reminder_check = time.monotonic()
+    
+    @primary_only
+    def _start_position(self):
+        """Start after the newest event, remembering the ones inside the overlap as relayed"""
+        last_id = db.session.query(func.max(LiveEvent.id)).scalar() or 0
+        for (event_id,) in db.session.query(LiveEvent.id).filter(LiveEvent.id > last_id - RELAY_OVERLAP):
+            self._remember(event_id)
+        hub.start(last_id)
+    
+    def _remember(self, event_id):
+        if len(self.recent) == self.recent.maxlen:
+            self.seen.discard(self.recent[0])
+        self.recent.append(event_id)
+        self.seen.add(event_id)
+    
+    def relay(self):
+        rows = LiveEvent.query.filter(
+            LiveEvent.id > hub.last_id - RELAY_OVERLAP
+        ).order_by(LiveEvent.id).all()
+        for row in rows:
+            if row.id in self.seen:
+                continue
+            self._remember(row.id)
+            hub.publish(row.event, json.loads(row.user_ids), json.loads(row.data),
+                        private=bool(row.private), event_id=row.id)
+    
+    def announce_due(self):
+        user_ids = hub.connected_user_ids()
+        now = datetime.now()
+        if user_ids:
+            due = Notification.query.filter(
+                Notification.user_id.in_(user_ids),
+                Notification.due_at > self.last_check,
+                Notification.due_at <= now
+            ).order_by(Notification.due_at).all()
+            for notification in due:
+                hub.publish('notification_due', [notification.user_id], notification.to_dict(), private=True)
+        self.last_check = now
+    
+    def tick(self):
+        self.relay()
+        now = time.monotonic()
+        if now >= self.next_reminder_check:
+            self.next_reminder_check = now + self.app.config['LIVE_REMINDER_INTERVAL_SECONDS']
+            self.announce_due()
+    
+    def run(self):
+        while True:
+            time.sleep(self.app.config['LIVE_POLL_SECONDS'])
+            with self.app.app_context():
+                try:
+                    self.tick()
+                except Exception as e:
+                    db.session.rollback()
+                    self.app.logger.error(f"Live relay error: {str(e)}")
+                finally:
+                    db.session.remove()
+
+_relay = None
+_relay_lock = threading.Lock()
+
+def ensure_live_relay(app):
+    """Start the process's relay on first use (needs an app context)"""
+    global _relay
+    with _relay_lock:
+        if _relay is None or not _relay.is_alive():
+            _relay = LiveRelay(app)
+            _relay.start()
+
+def _format(message):
+    return f"id: {message['id']}\nevent: {message['event']}\ndata: {json.dumps(message['data'], default=str)}\n\n"
+
+def _stream(subscriber, heartbeat, lifetime):
+    """Yield SSE frames until the stream's lifetime ends or the client goes away"""
+    ends_at = time.monotonic() + lifetime
+    try:
+        # Browsers reconnect after this many ms, sending Last-Event-ID
+        yield "retry: 3000\n\n"
+        while time.monotonic() < ends_at:
+            message = subscriber.next(timeout=min(heartbeat, max(ends_at - time.monotonic(), 0)))
+            if message is None:
+                yield ": keepalive\n\n"
+            else:
+                yield _format(message)
+    finally:
+        hub.unsubscribe(subscriber)
+
+@live_bp.route('/live/stream', methods=['GET'])
+@jwt_required()
+def live_stream():
+    """Stream dashboard change events (the token goes in the Authorization header, never the URL)"""
+    try:
+        # The gthread workers turn streams away: they belong on the gevent live server
+        if not current_app.config['LIVE_STREAMS_ENABLED']:
+            return jsonify({'error': 'Live updates are served by the live server'}), 503
+        
+        current_user = User.query.get(get_jwt_identity())
+        if not current_user:
+            return jsonify({'error': 'User not found'}), 404
+        
+        # Cap open streams per process
+        if hub.connection_count() >= current_app.config['LIVE_MAX_STREAMS']:
+            response = jsonify({'error': 'Too many live connections, retry later'})
+            response.headers['Retry-After'] = '30'
+            return response, 503
+        
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            last_event_id = None
+        
+        ensure_live_relay(current_app._get_current_object())
+        subscriber = hub.subscribe(current_user.id, current_user.role == 'admin', last_event_id)
+        
+        # An idle stream must not pin a pooled database connection
+        db.session.remove()
+        
+        return Response(
+            stream_with_context(_stream(
+                subscriber,
+                current_app.config['LIVE_HEARTBEAT_SECONDS'],
+                current_app.config['LIVE_STREAM_LIFETIME_SECONDS']
+            )),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+    
+    except Exception as e:
+        current_app.logger.error(f"Live stream error: {str(e)}")
+        return jsonify({'error': 'Failed to open live stream'}), 500
@@ -0,0 +1,75 @@
+from flask import Blueprint, Response, jsonify, current_app, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.models import User
+from app.pooling import pool_metrics
+from app import telemetry
+import hmac
+import os
+
+metrics_bp = Blueprint('metrics', __name__)
+# Served at /metrics (no /api prefix) for Prometheus scrapers
+prometheus_bp = Blueprint('prometheus', __name__)
+
+POOL_CHECKED_OUT = telemetry.Gauge('medora_db_pool_checked_out', 'Connections currently checked out', ('pool',))
+POOL_OVERFLOW = telemetry.Gauge('medora_db_pool_overflow', 'Connections open beyond pool_size', ('pool',))
+POOL_WAIT_P95 = telemetry.Gauge('medora_db_pool_wait_p95_seconds', 'p95 time waiting for a pooled connection', ('pool',))
+POOL_TIMEOUTS = telemetry.Gauge('medora_db_pool_timeouts', 'Checkouts that timed out since the worker started', ('pool',))
+CACHE_HIT_RATE = telemetry.Gauge('medora_cache_hit_rate', 'Share of cache lookups served from the cache', ('cache',))
+LIVE_STREAMS = telemetry.Gauge('medora_live_streams', 'Open server-sent event streams')
+
+def collect_metrics():
+    """Runtime metrics of this worker process"""
+    from app.dashboard import statistics_cache
+    from app.live import hub
+    
+    return {
+        'pid': os.getpid(),
+        'database_pools': pool_metrics(),
+        'caches': [statistics_cache.stats()],
+        'live_streams': hub.connection_count()
+    }
+
+@metrics_bp.route('/metrics/runtime', methods=['GET'])
+@jwt_required()
+def get_runtime_metrics():
+    """Get connection pool, cache and stream metrics for this worker (admin only)"""
+    try:
+        current_user = User.query.get(get_jwt_identity())
+        if not current_user or current_user.role != 'admin':
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        return jsonify(collect_metrics()), 200
+    
+    except Exception as e:
+        current_app.logger.error(f"Runtime metrics error: {str(e)}")
+        return jsonify({'error': 'Failed to retrieve metrics'}), 500
+
+def runtime_gauges():
+    """collect_metrics() as Prometheus gauges labelled with this worker's pid"""
+    runtime = collect_metrics()
+    pid = str(runtime['pid'])
+    gauges = {}
+    
+    def put(gauge, labels, value):
+        if value is not None:
+            gauges.setdefault(gauge.name, {})[labels + (pid,)] = value
+    
+    for pool in runtime['database_pools']:
+        put(POOL_CHECKED_OUT, (pool['name'],), pool.get('checked_out'))
+        put(POOL_OVERFLOW, (pool['name'],), pool.get('overflow'))
+        put(POOL_WAIT_P95, (pool['name'],), pool['wait_p95_ms'] / 1000 if pool['wait_p95_ms'] is not None else None)
+        put(POOL_TIMEOUTS, (pool['name'],), pool['timeouts'])
+    for cache in runtime['caches']:
+        put(CACHE_HIT_RATE, (cache['name'],), cache['hit_rate'])
+    put(LIVE_STREAMS, (), runtime['live_streams'])
+    return gauges
+
+@prometheus_bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Request, SQL, serialization and pool metrics of all workers in Prometheus text format"""
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return jsonify({'error': 'Invalid metrics token'}), 401
+    
+    metrics, gauges = telemetry.collect(telemetry.metrics_directory(current_app), runtime_gauges())
+    return Response(telemetry.render(metrics, gauges), mimetype='text/plain; version=0.0.4')
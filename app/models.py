@@ -1,14 +1,24 @@
 from datetime import datetime
 import bcrypt
+import time
 from sqlalchemy.ext.hybrid import hybrid_property
 from flask_sqlalchemy import SQLAlchemy
+from app.replica import RoutingSession
+from app.serializers import ModelSerializer
+from app.telemetry import BCRYPT_SECONDS
 
 # Create a local db instance that will be initialized by the Flask app
-db = SQLAlchemy()
+# (its sessions send GET reads to the read replica when one is configured)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model):
     """User model for authentication and user management"""
     __tablename__ = 'users'
+    __table_args__ = (
+        db.Index('idx_users_role', 'role'),
+        db.Index('idx_users_is_active', 'is_active'),
+        db.Index('idx_users_created_at', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -41,8 +51,10 @@ class User(db.Model):
         if password:
             try:
                 # Generate salt and hash password
+                started = time.perf_counter()
                 salt = bcrypt.gensalt()
                 password_hash = bcrypt.hashpw(password.encode('utf-8'), salt)
+                BCRYPT_SECONDS.observe(time.perf_counter() - started, 'hash')
                 self.password_hash = password_hash.decode('utf-8')
                 print(f"DEBUG: Password hashed successfully for {self.username}")
             except Exception as e:
@@ -58,7 +70,10 @@ class User(db.Model):
         try:
             # Try bcrypt first
             if self.password_hash.startswith('$2b$'):
-                return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+                started = time.perf_counter()
+                matches = bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+                BCRYPT_SECONDS.observe(time.perf_counter() - started, 'check')
+                return matches
             else:
                 # Fallback to SHA256
                 import hashlib
@@ -67,27 +82,45 @@ class User(db.Model):
             print(f"DEBUG: Password check failed: {e}")
             return False
     
-    def to_dict(self):
+    def to_dict(self, fields=None):
         """Convert user to dictionary"""
-        return {
-            'id': self.id,
-            'username': self.username,
-            'email': self.email,
-            'first_name': self.first_name,
-            'last_name': self.last_name,
-            'phone': self.phone,
-            'role': self.role,
-            'is_active': self.is_active,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+        return user_serializer.one(self, fields)
     
     def __repr__(self):
         return f'<User {self.username}>'
 
+def compute_bmi(height, weight):
+    """BMI from height (cm) and weight (kg), or None when either is missing"""
+    if height and weight and height > 0:
+        height_m = height / 100  # Convert cm to meters
+        return round(weight / (height_m * height_m), 1)
+    return None
+
+def bmi_category_of(bmi):
+    """BMI category for a BMI value"""
+    if bmi is None:
+        return None
+    elif bmi < 18.5:
+        return 'Underweight'
+    elif bmi < 25:
+        return 'Normal weight'
+    elif bmi < 30:
+        return 'Overweight'
+    else:
+        return 'Obese'
+
 class Patient(db.Model):
     """Enhanced Patient model for storing comprehensive patient information"""
     __tablename__ = 'patients'
+    __table_args__ = (
+        # Per-user lists and dashboards: WHERE user_id = ? AND is_active ORDER BY created_at
+        db.Index('idx_patients_user_active_created', 'user_id', 'is_active', 'created_at'),
+        db.Index('idx_patients_name', 'first_name', 'last_name'),
+        db.Index('idx_patients_date_of_birth', 'date_of_birth'),
+        db.Index('idx_patients_gender', 'gender'),
+        db.Index('idx_patients_is_active', 'is_active'),
+        db.Index('idx_patients_created_at', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.String(20), unique=True, nullable=False)  # Custom patient ID
@@ -153,58 +186,16 @@ class Patient(db.Model):
     @hybrid_property
     def bmi(self):
         """Calculate BMI if height and weight are available"""
-        if self.height and self.weight and self.height > 0:
-            height_m = self.height / 100  # Convert cm to meters
-            return round(self.weight / (height_m * height_m), 1)
-        return None
+        return compute_bmi(self.height, self.weight)
     
     @hybrid_property
     def bmi_category(self):
         """Get BMI category"""
-        bmi = self.bmi
-        if bmi is None:
-            return None
-        elif bmi < 18.5:
-            return 'Underweight'
-        elif bmi < 25:
-            return 'Normal weight'
-        elif bmi < 30:
-            return 'Overweight'
-        else:
-            return 'Obese'
+        return bmi_category_of(self.bmi)
     
-    def to_dict(self):
+    def to_dict(self, fields=None):
         """Convert patient to dictionary"""
-        return {
-            'id': self.id,
-            'patient_id': self.patient_id,
-            'user_id': self.user_id,
-            'first_name': self.first_name,
-            'last_name': self.last_name,
-            'full_name': self.full_name,
-            'date_of_birth': self.date_of_birth.isoformat() if self.date_of_birth else None,
-            'age': self.age,
-            'gender': self.gender,
-            'phone': self.phone,
-            'email': self.email,
-            'address': self.address,
-            'medical_history': self.medical_history,
-            'current_medications': self.current_medications,
-            'allergies': self.allergies,
-            'blood_type': self.blood_type,
-            'height': self.height,
-            'weight': self.weight,
-            'bmi': self.bmi,
-            'bmi_category': self.bmi_category,
-            'emergency_contact_name': self.emergency_contact_name,
-            'emergency_contact_phone': self.emergency_contact_phone,
-            'emergency_contact_relationship': self.emergency_contact_relationship,
-            'insurance_provider': self.insurance_provider,
-            'insurance_number': self.insurance_number,
-            'is_active': self.is_active,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+        return patient_serializer.one(self, fields)
     
     def __repr__(self):
         return f'<Patient {self.patient_id} - {self.full_name}>'
@@ -212,10 +203,18 @@ class Patient(db.Model):
 class Appointment(db.Model):
     """Appointment model for scheduling doctor visits"""
     __tablename__ = 'appointments'
+    __table_args__ = (
+        db.Index('idx_appointments_doctor_date', 'doctor_id', 'appointment_date'),
+        db.Index('idx_appointments_patient_date', 'patient_id', 'appointment_date'),
+        db.Index('idx_appointments_date', 'appointment_date'),
+        db.Index('idx_appointments_doctor_name', 'doctor_name'),
+        db.Index('idx_appointments_status', 'status'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), nullable=False)
-    doctor_name = db.Column(db.String(100), nullable=False)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('users.id'))  # Backfilled from doctor_name
+    doctor_name = db.Column(db.String(100), nullable=False)  # Display name, kept for old rows
     appointment_date = db.Column(db.DateTime, nullable=False)
     appointment_type = db.Column(db.String(50))  # Checkup, Consultation, Emergency, etc.
     symptoms = db.Column(db.Text)
@@ -228,23 +227,189 @@ class Appointment(db.Model):
     
     # Relationships
     patient = db.relationship('Patient', backref='appointments')
+    doctor = db.relationship('User', foreign_keys=[doctor_id])
     
-    def to_dict(self):
+    def to_dict(self, fields=None):
         """Convert appointment to dictionary"""
+        return appointment_serializer.one(self, fields)
+    
+    def __repr__(self):
+        return f'<Appointment {self.id} - {self.patient_id} on {self.appointment_date}>' 
+
+# Field extractors behind to_dict, compiled once per field subset (see app/serializers.py)
+user_serializer = ModelSerializer(User, [
+    'id', 'username', 'email', 'first_name', 'last_name', 'phone', 'role', 'is_active',
+    'created_at', 'updated_at'
+])
+
+patient_serializer = ModelSerializer(Patient, [
+    'id', 'patient_id', 'user_id', 'first_name', 'last_name', 'full_name', 'date_of_birth', 'age',
+    'gender', 'phone', 'email', 'address', 'medical_history', 'current_medications', 'allergies',
+    'blood_type', 'height', 'weight', 'bmi', 'bmi_category', 'emergency_contact_name',
+    'emergency_contact_phone', 'emergency_contact_relationship', 'insurance_provider',
+    'insurance_number', 'is_active', 'created_at', 'updated_at'
+], derived={
+    'full_name': (lambda first_name, last_name: f"{first_name} {last_name}", ('first_name', 'last_name')),
+    'bmi': (compute_bmi, ('height', 'weight')),
+    'bmi_category': (bmi_category_of, ('bmi',)),
+})
+
+appointment_serializer = ModelSerializer(Appointment, [
+    'id', 'patient_id', 'doctor_id', 'doctor_name', 'appointment_date', 'appointment_type',
+    'symptoms', 'diagnosis', 'prescription', 'notes', 'status', 'created_at', 'updated_at'
+])
+
+class Notification(db.Model):
+    """Precomputed dashboard notification (appointment reminders, missing patient info)"""
+    __tablename__ = 'notifications'
+    __table_args__ = (
+        db.Index('idx_notifications_user_due', 'user_id', 'due_at'),
+        db.Index('idx_notifications_appointment', 'appointment_id'),
+        db.Index('idx_notifications_patient', 'patient_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'))
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointments.id'))
+    type = db.Column(db.String(30), nullable=False)  # appointment_reminder, missing_info
+    message = db.Column(db.String(255), nullable=False)
+    priority = db.Column(db.String(10), default='medium')
+    event_date = db.Column(db.DateTime)  # When the underlying event happens (appointment time)
+    due_at = db.Column(db.DateTime, nullable=False)  # When the notification becomes visible
+    expires_at = db.Column(db.DateTime)  # When it stops being relevant (None = until resolved)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        """Convert notification to dictionary"""
+        data = {
+            'id': self.id,
+            'type': self.type,
+            'message': self.message,
+            'priority': self.priority
+        }
+        if self.event_date:
+            data['date'] = self.event_date.isoformat()
+        if self.patient_id and self.type == 'missing_info':
+            data['patient_id'] = self.patient_id
+        return data
+    
+    def __repr__(self):
+        return f'<Notification {self.id} {self.type} for user {self.user_id}>'
+
+class WaitlistEntry(db.Model):
+    """Patient waiting for an earlier slot with a doctor inside a date window"""
+    __tablename__ = 'waitlist_entries'
+    __table_args__ = (
+        db.Index('idx_waitlist_doctor_status', 'doctor_id', 'status'),
+        db.Index('idx_waitlist_patient', 'patient_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), nullable=False)
+    window_start = db.Column(db.DateTime, nullable=False)
+    window_end = db.Column(db.DateTime, nullable=False)
+    priority = db.Column(db.Integer, default=0)  # Higher is served first
+    status = db.Column(db.String(20), default='waiting')  # waiting, offered, booked, cancelled
+    offered_slot = db.Column(db.DateTime)
+    offered_at = db.Column(db.DateTime)
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointments.id'))  # Set once booked
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        """Convert waitlist entry to dictionary"""
         return {
             'id': self.id,
+            'doctor_id': self.doctor_id,
             'patient_id': self.patient_id,
-            'doctor_name': self.doctor_name,
-            'appointment_date': self.appointment_date.isoformat() if self.appointment_date else None,
-            'appointment_type': self.appointment_type,
-            'symptoms': self.symptoms,
-            'diagnosis': self.diagnosis,
-            'prescription': self.prescription,
-            'notes': self.notes,
+            'window_start': self.window_start.isoformat() if self.window_start else None,
+            'window_end': self.window_end.isoformat() if self.window_end else None,
+            'priority': self.priority,
             'status': self.status,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'offered_slot': self.offered_slot.isoformat() if self.offered_slot else None,
+            'offered_at': self.offered_at.isoformat() if self.offered_at else None,
+            'appointment_id': self.appointment_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None
         }
     
     def __repr__(self):
-        return f'<Appointment {self.id} - {self.patient_id} on {self.appointment_date}>' 
\ No newline at end of file
+        return f'<WaitlistEntry {self.id} - patient {self.patient_id} for doctor {self.doctor_id}>'
+
+class StatCounter(db.Model):
+    """Incrementally maintained dashboard counter, keyed by (user_id, dimension, bucket)"""
+    __tablename__ = 'stat_counters'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    dimension = db.Column(db.String(30), primary_key=True)  # patients, gender, blood_type, birth_date, ...
+    bucket = db.Column(db.String(30), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<StatCounter {self.user_id} {self.dimension}/{self.bucket}={self.count}>'
+
+class DailyRegistrationRollup(db.Model):
+    """Active patients registered per user and day, maintained by the rollup job"""
+    __tablename__ = 'daily_registrations'
+    __table_args__ = (
+        db.Index('idx_daily_registrations_day', 'day'),
+    )
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class DailyAppointmentRollup(db.Model):
+    """Appointments of a user's active patients per day and status"""
+    __tablename__ = 'daily_appointments'
+    __table_args__ = (
+        db.Index('idx_daily_appointments_day', 'day'),
+    )
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class DailyDoctorAppointmentRollup(db.Model):
+    """Appointments per doctor, day and status"""
+    __tablename__ = 'daily_doctor_appointments'
+    __table_args__ = (
+        db.Index('idx_daily_doctor_appointments_day', 'day'),
+    )
+    
+    doctor_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class RollupWatermark(db.Model):
+    """Latest updated_at the rollup job has processed for a source table"""
+    __tablename__ = 'rollup_watermarks'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    watermark = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class RollupDirtyDay(db.Model):
+    """Day whose rollups must be recomputed because an appointment moved away from it"""
+    __tablename__ = 'rollup_dirty_days'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class LiveEvent(db.Model):
+    """Change event queued for the live update streams, read by every serving process"""
+    __tablename__ = 'live_events'
+    __table_args__ = (
+        db.Index('idx_live_events_created_at', 'created_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)  # Also the SSE event id clients resume from
+    event = db.Column(db.String(30), nullable=False)  # appointment, patient, waitlist_offer
+    user_ids = db.Column(db.Text, nullable=False)  # JSON list of recipients
+    private = db.Column(db.Boolean, default=False)  # Hidden from admins who are not recipients
+    data = db.Column(db.Text, nullable=False)  # JSON payload
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
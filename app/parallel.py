@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+from flask import current_app, g, has_app_context
+from sqlalchemy.pool import StaticPool
+from app.query_monitor import QueryStats, current_query_stats
+from app.replica import current_route
+from app import db
+
+class DeadlineExceeded(Exception):
+    """Raised when parallel queries do not finish before the request deadline"""
+    pass
+
+_executor = None
+_executor_pid = None
+_slots = None
+_executor_lock = threading.Lock()
+
+def _get_executor(app):
+    """Return the process-wide pool, recreating it after a fork"""
+    global _executor, _executor_pid, _slots
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            workers = app.config['PARALLEL_QUERY_WORKERS']
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='medora-query')
+            _slots = threading.BoundedSemaphore(workers)
+            _executor_pid = os.getpid()
+        return _executor, _slots
+
+def request_deadline():
+    """Monotonic time by which the current request should have finished, or None"""
+    return g.get('request_deadline') if has_app_context() else None
+
+def _can_parallelize(app):
+    if not app.config['PARALLEL_QUERY_WORKERS'] or g.get('parallel_worker'):
+        return False
+    # A StaticPool (in-memory SQLite) shares one connection, which can't be used concurrently
+    return not isinstance(db.engine.pool, StaticPool)
+
+def _run_task(app, fn, deadline, monitored, route):
+    """Run fn in its own app context, and so its own session and pooled connection"""
+    with app.app_context():
+        g.parallel_worker = True
+        g.request_deadline = deadline
+        # Read from the same database (primary or replica) the request would have
+        g.db_route = route
+        stats = g.query_stats = QueryStats() if monitored else None
+        return fn(), stats
+
+def run_parallel(tasks):
+    """Run independent read-only callables concurrently and return {name: result}.
+    
+    `tasks` maps names to zero-argument callables. Each runs in its own app context,
+    so it gets its own session: it must not rely on uncommitted changes in the caller's
+    session and should return plain data rather than ORM objects. Tasks run inline when
+    the pool is saturated (or parallelism is disabled), and DeadlineExceeded is raised
+    if they are not all done before the request deadline.
+    """
+    app = current_app._get_current_object()
+    if len(tasks) < 2 or not _can_parallelize(app):
+        return {name: fn() for name, fn in tasks.items()}
+    
+    executor, slots = _get_executor(app)
+    deadline = request_deadline()
+    parent_stats = current_query_stats()
+    route = current_route(db.session)
+    futures = {}
+    inline = []
+    
+    for name, fn in tasks.items():
+        if not slots.acquire(blocking=False):
+            # Pool saturated by other requests: don't queue behind them
+            inline.append((name, fn))
+            continue
+        future = executor.submit(_run_task, app, fn, deadline, parent_stats is not None, route)
+        future.add_done_callback(lambda _, slots=slots: slots.release())
+        futures[future] = name
+    
+    results = {}
+    try:
+        for name, fn in inline:
+            results[name] = fn()
+    finally:
+        timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+        done, pending = wait(futures, timeout=timeout, return_when=FIRST_EXCEPTION)
+        for future in pending:
+            future.cancel()
+    
+    for future in done:
+        value, stats = future.result()
+        results[futures[future]] = value
+        if parent_stats is not None and stats is not None:
+            parent_stats.merge(stats)
+    if pending:
+        names = ', '.join(sorted(futures[future] for future in pending))
+        raise DeadlineExceeded(f"Queries still running at the request deadline: {names}")
+    return results
+
+def init_parallel(app):
+    """Configure the shared query pool and stamp each request with its deadline"""
+    app.config.setdefault('PARALLEL_QUERY_WORKERS', 4)
+    app.config.setdefault('REQUEST_DEADLINE_SECONDS', 10.0)
+    
+    @app.before_request
+    def set_request_deadline():
+        if app.config['REQUEST_DEADLINE_SECONDS']:
+            g.request_deadline = time.monotonic() + app.config['REQUEST_DEADLINE_SECONDS']
@@ -1,8 +1,14 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models import Patient, User, Appointment
+from app.models import Patient, User, Appointment, patient_serializer
 from app.middleware import validate_patient_data, handle_validation_errors, handle_database_error
 from app import db
+from app import reminders
+from app import events
+from app import counters
+from app.counting import paginate_query
+from app.readpath import select_for, serialize_rows, read_dicts, export_response
+from app.serializers import requested_fields
 import uuid
 from datetime import datetime, date
 import re
@@ -148,8 +154,13 @@ def create_patient():
                 pass  # Age will be calculated from DOB if invalid
         
         db.session.add(patient)
+        db.session.flush()
+        reminders.sync_patient(patient)
+        counters.record_patient_change(patient.id, None, counters.patient_state(patient))
         db.session.commit()
         
+        events.emit('patient_changed', action='create', patient_id=patient.id, user_id=patient.user_id)
+        
         current_app.logger.info(f"Patient created: {patient.patient_id} by user {current_user_id}")
         
         return jsonify({
@@ -169,13 +180,14 @@ def get_patients():
     try:
         current_user_id = get_jwt_identity()
         
-        # Get patients with optional filters
-        query = Patient.query.filter_by(user_id=current_user_id, is_active=True)
+        # Read-only path: plain rows from a Core select, no ORM instances
+        query = select_for(patient_serializer).where(Patient.user_id == current_user_id, Patient.is_active == True)
+        filtered = bool(request.args.get('search') or request.args.get('gender'))
         
         # Apply filters
         if request.args.get('search'):
             search_term = request.args.get('search')
-            query = query.filter(
+            query = query.where(
                 db.or_(
                     Patient.first_name.ilike(f'%{search_term}%'),
                     Patient.last_name.ilike(f'%{search_term}%'),
@@ -186,26 +198,25 @@ def get_patients():
             )
         
         if request.args.get('gender'):
-            query = query.filter_by(gender=request.args.get('gender'))
+            query = query.where(Patient.gender == request.args.get('gender'))
         
         # Pagination
         page = request.args.get('page', 1, type=int)
         per_page = min(request.args.get('per_page', 10, type=int), 100)
         
-        patients = query.paginate(
-            page=page, per_page=per_page, error_out=False
+        # The unfiltered total is maintained in the counters; filtered totals may be estimated
+        known_total = None
+        if not filtered:
+            known_total = counters.read_counters(current_user_id, ['patients']).get('patients', {}).get('total', 0)
+        
+        rows, pagination = paginate_query(
+            query.order_by(Patient.created_at.desc(), Patient.id.desc()), page, per_page,
+            known_total=known_total
         )
         
         return jsonify({
-            'patients': [patient.to_dict() for patient in patients.items],
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': patients.total,
-                'pages': patients.pages,
-                'has_next': patients.has_next,
-                'has_prev': patients.has_prev
-            }
+            'patients': serialize_rows(patient_serializer, query, rows),
+            'pagination': pagination
         }), 200
         
     except Exception as e:
@@ -279,6 +290,8 @@ def update_patient(patient_id):
         if not patient:
             return jsonify({'error': 'Patient not found'}), 404
         
+        counted_before = counters.patient_state(patient)
+        
         # Validate data if updating required fields
         if any(field in data for field in ['first_name', 'last_name', 'date_of_birth', 'gender']):
             validation_errors = validate_patient_form_data(data)
@@ -307,8 +320,12 @@ def update_patient(patient_id):
                     setattr(patient, field, data[field].strip() if isinstance(data[field], str) else data[field])
         
         patient.updated_at = datetime.utcnow()
+        reminders.sync_patient(patient)
+        counters.record_patient_change(patient.id, counted_before, counters.patient_state(patient))
         db.session.commit()
         
+        events.emit('patient_changed', action='update', patient_id=patient.id, user_id=patient.user_id)
+        
         return jsonify({
             'message': 'Patient updated successfully',
             'patient': patient.to_dict()
@@ -334,10 +351,15 @@ def delete_patient(patient_id):
             return jsonify({'error': 'Patient not found'}), 404
         
         # Soft delete
+        counted_before = counters.patient_state(patient)
         patient.is_active = False
         patient.updated_at = datetime.utcnow()
+        reminders.sync_patient(patient)
+        counters.record_patient_change(patient.id, counted_before, None)
         db.session.commit()
         
+        events.emit('patient_changed', action='delete', patient_id=patient.id, user_id=patient.user_id)
+        
         return jsonify({
             'message': 'Patient deleted successfully'
         }), 200
@@ -387,7 +409,7 @@ def search_patients():
             return jsonify({'error': 'Search term is required'}), 400
         
         # Search in multiple fields
-        patients = Patient.query.filter(
+        patients = read_dicts(patient_serializer, select_for(patient_serializer).where(
             db.and_(
                 Patient.user_id == current_user_id,
                 Patient.is_active == True,
@@ -400,16 +422,38 @@ def search_patients():
                     Patient.emergency_contact_name.ilike(f'%{search_term}%')
                 )
             )
-        ).limit(20).all()
+        ).limit(20))
         
         return jsonify({
-            'patients': [patient.to_dict() for patient in patients]
+            'patients': patients
         }), 200
         
     except Exception as e:
         current_app.logger.error(f"Search patients error: {str(e)}")
         return jsonify({'error': 'Search failed'}), 500
 
+@patients_bp.route('/patients/export', methods=['GET'])
+@jwt_required()
+def export_patients():
+    """Export all of the current user's patients as JSON or CSV (?format=csv, ?fields=a,b)"""
+    try:
+        current_user_id = get_jwt_identity()
+        
+        try:
+            fields = requested_fields(patient_serializer, request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        query = select_for(patient_serializer, fields).where(
+            Patient.user_id == current_user_id,
+            Patient.is_active == True
+        ).order_by(Patient.id)
+        return export_response('patients', patient_serializer, query, fields, request.args.get('format', 'json'))
+        
+    except Exception as e:
+        current_app.logger.error(f"Export patients error: {str(e)}")
+        return jsonify({'error': 'Export failed'}), 500
+
 @patients_bp.route('/patients/validate-id/<patient_id>', methods=['GET'])
 @jwt_required()
 def validate_patient_id(patient_id):
@@ -0,0 +1,152 @@
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from collections import deque
+import threading
+import time
+
+class PoolStats:
+    """Checkout wait, hold times and connection churn for one engine's pool"""
+    
+    def __init__(self, name, samples=1024):
+        self.name = name
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.hold_total = 0.0
+        self.hold_max = 0.0
+        self.holds = 0
+        self._waits = deque(maxlen=samples)
+        self._lock = threading.Lock()
+    
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self._waits.append(seconds)
+            if timed_out:
+                self.timeouts += 1
+    
+    def record_hold(self, seconds):
+        with self._lock:
+            self.holds += 1
+            self.hold_total += seconds
+            self.hold_max = max(self.hold_max, seconds)
+    
+    def snapshot(self, pool=None):
+        with self._lock:
+            waits = sorted(self._waits)
+        
+        def percentile(fraction):
+            return round(waits[min(len(waits) - 1, int(len(waits) * fraction))] * 1000, 3) if waits else None
+        
+        data = {
+            'name': self.name,
+            'checkouts': self.checkouts,
+            'connects': self.connects,
+            'invalidations': self.invalidations,
+            'timeouts': self.timeouts,
+            'wait_avg_ms': round(sum(waits) / len(waits) * 1000, 3) if waits else None,
+            'wait_p50_ms': percentile(0.5),
+            'wait_p95_ms': percentile(0.95),
+            'wait_p99_ms': percentile(0.99),
+            'wait_max_ms': round(self.wait_max * 1000, 3),
+            'hold_avg_ms': round(self.hold_total / self.holds * 1000, 3) if self.holds else None,
+            'hold_max_ms': round(self.hold_max * 1000, 3)
+        }
+        if isinstance(pool, QueuePool):
+            data.update({
+                'pool_size': pool.size(),
+                'checked_out': pool.checkedout(),
+                'checked_in': pool.checkedin(),
+                'overflow': max(pool.overflow(), 0)
+            })
+        return data
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that measures how long each checkout waits for a connection"""
+    
+    stats = None
+    
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            timed_out = True
+            raise
+        finally:
+            if self.stats is not None:
+                self.stats.record_wait(time.perf_counter() - started, timed_out)
+    
+    def recreate(self):
+        # dispose() swaps in a new pool; keep accumulating into the same stats
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS built from the DB_POOL_* / DB_ISOLATION_LEVEL settings"""
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    if uri.startswith('sqlite') and (':memory:' in uri or uri.rstrip('/') == 'sqlite:'):
+        # Flask-SQLAlchemy gives in-memory SQLite one shared connection; nothing to size
+        return {}
+    
+    options = {
+        'poolclass': TimedQueuePool,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+    if config.get('DB_ISOLATION_LEVEL'):
+        options['isolation_level'] = config['DB_ISOLATION_LEVEL']
+    return options
+
+# bind name -> (engine, PoolStats)
+_registry = {}
+
+def instrument_engine(name, engine):
+    """Attach pool event listeners and checkout timing to an engine"""
+    if name in _registry and _registry[name][0] is engine:
+        return _registry[name][1]
+    stats = PoolStats(name)
+    _registry[name] = (engine, stats)
+    if isinstance(engine.pool, TimedQueuePool):
+        engine.pool.stats = stats
+    
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        stats.connects += 1
+    
+    @event.listens_for(engine, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        stats.checkouts += 1
+        connection_record.info['checked_out_at'] = time.perf_counter()
+    
+    @event.listens_for(engine, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        started = connection_record.info.pop('checked_out_at', None)
+        if started is not None:
+            stats.record_hold(time.perf_counter() - started)
+    
+    @event.listens_for(engine, 'invalidate')
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        stats.invalidations += 1
+    
+    return stats
+
+def init_pool_metrics(app, db):
+    """Instrument every engine (default and binds) of the app"""
+    with app.app_context():
+        for bind, engine in db.engines.items():
+            instrument_engine(bind or 'default', engine)
+
+def pool_metrics():
+    """Current statistics of every instrumented pool"""
+    return [stats.snapshot(engine.pool) for engine, stats in _registry.values()]
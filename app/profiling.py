@@ -0,0 +1,238 @@
+from flask import Blueprint, jsonify, current_app, g, request, send_file
+from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
+from app.models import User
+from datetime import datetime
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+
+profiling_bp = Blueprint('profiling', __name__)
+
+# Admins send this header (with their usual bearer token) to profile one request
+PROFILE_HEADER = 'X-Profile'
+PROFILE_ID = re.compile(r'^\d{8}T\d{6}-\d+-[0-9a-f]{8}$')
+
+# One profiler per process at a time: profiling is costly, and from Python 3.12
+# only one cProfile can be active per interpreter anyway.
+_profiler_lock = threading.Lock()
+
+def _requested_by_admin():
+    if request.headers.get(PROFILE_HEADER, '').lower() not in ('1', 'true', 'yes'):
+        return False
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        return False
+    user = User.query.get(identity) if identity is not None else None
+    return bool(user and user.role == 'admin')
+
+def _should_profile(app):
+    if not app.config['PROFILING_ENABLED'] or request.endpoint is None:
+        return None
+    if request.endpoint.startswith('profiling.'):
+        return None
+    if request.headers.get(PROFILE_HEADER) and _requested_by_admin():
+        return 'header'
+    rate = app.config['PROFILE_SAMPLE_RATE']
+    if rate and random.random() < rate:
+        return 'sampled'
+    return None
+
+def _top_functions(profiler, limit):
+    """The most expensive functions by cumulative time, as plain data"""
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (filename, line, function), (calls, primitive_calls, total, cumulative, callers) in stats.stats.items():
+        rows.append({
+            'function': f"{filename}:{line}({function})",
+            'calls': calls,
+            'primitive_calls': primitive_calls,
+            'total_ms': round(total * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3)
+        })
+    rows.sort(key=lambda row: row['cumulative_ms'], reverse=True)
+    return rows[:limit]
+
+def _trim_ring(directory, keep):
+    """Delete the oldest profiles so at most `keep` remain"""
+    reports = sorted(
+        (entry for entry in os.scandir(directory) if entry.name.endswith('.json')),
+        key=lambda entry: entry.stat().st_mtime
+    )
+    for entry in reports[:max(len(reports) - keep, 0)]:
+        for path in (entry.path, entry.path[:-len('.json')] + '.prof'):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # another worker trimmed it first
+
+def save_profile(app, profiler, response, reason, stats):
+    """Write one request's profile (pstats dump + JSON report) into the on-disk ring"""
+    directory = app.config['PROFILE_DIR']
+    os.makedirs(directory, exist_ok=True)
+    started = g.profile_started
+    profile_id = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    
+    report = {
+        'id': profile_id,
+        'created_at': datetime.utcnow().isoformat(),
+        'reason': reason,
+        'pid': os.getpid(),
+        'method': request.method,
+        'path': request.full_path.rstrip('?'),
+        'endpoint': request.endpoint,
+        'status': response.status_code,
+        'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+        'sql': {
+            'count': stats.count if stats else None,
+            'total_ms': round(stats.total_time * 1000, 3) if stats else None,
+            # (offset from request start, duration, statement) in the order they ran
+            'timeline': [
+                {'offset_ms': round(offset * 1000, 3), 'duration_ms': round(duration * 1000, 3), 'statement': statement}
+                for offset, duration, statement in (stats.timeline if stats else [])
+            ]
+        },
+        'functions': _top_functions(profiler, app.config['PROFILE_TOP_FUNCTIONS'])
+    }
+    
+    profiler.dump_stats(os.path.join(directory, f"{profile_id}.prof"))
+    path = os.path.join(directory, f"{profile_id}.json")
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump(report, f)
+    os.replace(f"{path}.tmp", path)
+    _trim_ring(directory, app.config['PROFILE_RING_SIZE'])
+    return profile_id
+
+def init_profiling(app):
+    """Profile requests chosen by the admin header or by sampling, when PROFILING_ENABLED"""
+    app.config.setdefault('PROFILING_ENABLED', False)
+    app.config.setdefault('PROFILE_SAMPLE_RATE', 0.0)
+    app.config.setdefault('PROFILE_RING_SIZE', 50)
+    app.config.setdefault('PROFILE_TOP_FUNCTIONS', 50)
+    
+    @app.before_request
+    def start_profiler():
+        reason = _should_profile(app)
+        if reason is None or not _profiler_lock.acquire(blocking=False):
+            return
+        g.profile_reason = reason
+        g.profile_started = time.perf_counter()
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+    
+    @app.after_request
+    def finish_profiler(response):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return response
+        try:
+            profiler.disable()
+            profile_id = save_profile(app, profiler, response, g.profile_reason, g.get('query_stats'))
+            response.headers['X-Profile-Id'] = profile_id
+        except Exception as e:
+            app.logger.error(f"Saving profile failed: {str(e)}")
+        finally:
+            _profiler_lock.release()
+        return response
+    
+    @app.teardown_request
+    def abandon_profiler(exception=None):
+        # The request failed before after_request ran
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            _profiler_lock.release()
+
+def _admin_required():
+    current_user = User.query.get(get_jwt_identity())
+    if not current_user or current_user.role != 'admin':
+        return jsonify({'error': 'Admin access required'}), 403
+    return None
+
+def _report_path(profile_id, extension):
+    if not PROFILE_ID.match(profile_id):
+        return None
+    path = os.path.join(current_app.config['PROFILE_DIR'], f"{profile_id}.{extension}")
+    return path if os.path.exists(path) else None
+
+@profiling_bp.route('/profiles', methods=['GET'])
+@jwt_required()
+def list_profiles():
+    """List the saved request profiles, newest first (admin only)"""
+    try:
+        denied = _admin_required()
+        if denied:
+            return denied
+        
+        directory = current_app.config['PROFILE_DIR']
+        profiles = []
+        if os.path.isdir(directory):
+            for entry in os.scandir(directory):
+                if not entry.name.endswith('.json'):
+                    continue
+                try:
+                    with open(entry.path) as f:
+                        report = json.load(f)
+                except (OSError, ValueError):
+                    continue  # trimmed or still being written
+                summary = {key: report[key] for key in (
+                    'id', 'created_at', 'reason', 'method', 'path', 'endpoint', 'status', 'duration_ms'
+                )}
+                summary['sql_count'] = report['sql']['count']
+                profiles.append(summary)
+        profiles.sort(key=lambda profile: profile['created_at'], reverse=True)
+        
+        return jsonify({
+            'profiles': profiles,
+            'enabled': current_app.config['PROFILING_ENABLED'],
+            'sample_rate': current_app.config['PROFILE_SAMPLE_RATE']
+        }), 200
+    
+    except Exception as e:
+        current_app.logger.error(f"List profiles error: {str(e)}")
+        return jsonify({'error': 'Failed to list profiles'}), 500
+
+@profiling_bp.route('/profiles/<profile_id>', methods=['GET'])
+@jwt_required()
+def get_profile_report(profile_id):
+    """Get one profile: timings, SQL timeline and top functions (admin only)"""
+    try:
+        denied = _admin_required()
+        if denied:
+            return denied
+        
+        path = _report_path(profile_id, 'json')
+        if not path:
+            return jsonify({'error': 'Profile not found'}), 404
+        return send_file(path, mimetype='application/json')
+    
+    except Exception as e:
+        current_app.logger.error(f"Get profile error: {str(e)}")
+        return jsonify({'error': 'Failed to retrieve profile'}), 500
+
+@profiling_bp.route('/profiles/<profile_id>/pstats', methods=['GET'])
+@jwt_required()
+def download_profile_stats(profile_id):
+    """Download the raw cProfile stats for pstats/snakeviz (admin only)"""
+    try:
+        denied = _admin_required()
+        if denied:
+            return denied
+        
+        path = _report_path(profile_id, 'prof')
+        if not path:
+            return jsonify({'error': 'Profile not found'}), 404
+        return send_file(path, mimetype='application/octet-stream', as_attachment=True,
+                         download_name=f"{profile_id}.prof")
+    
+    except Exception as e:
+        current_app.logger.error(f"Download profile error: {str(e)}")
+        return jsonify({'error': 'Failed to download profile'}), 500
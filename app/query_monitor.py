@@ -0,0 +1,156 @@
+import re
+import time
+from collections import Counter
+from flask import g, request, current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import joinedload, selectinload
+
+class QueryBudgetExceeded(Exception):
+    """Raised in testing mode when an endpoint runs more SQL statements than allowed"""
+    pass
+
+# Literal and placeholder patterns collapsed when computing a statement's shape
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+|\d+|\'[^\']*\')\s*,?)+\)', re.IGNORECASE)
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_WHITESPACE = re.compile(r'\s+')
+
+def statement_shape(statement):
+    """Normalize a SQL statement so repeated executions with different values compare equal"""
+    shape = _IN_LIST.sub('IN (?)', statement)
+    shape = _STRING_LITERAL.sub('?', shape)
+    shape = _NUMBER_LITERAL.sub('?', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+class QueryStats:
+    """SQL statements executed while handling a single request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.count = 0
+        self.total_time = 0.0
+        self.shapes = Counter()
+        self.timeline = []  # (offset seconds, duration seconds, statement)
+
+    def record(self, statement, started, duration):
+        self.count += 1
+        self.total_time += duration
+        self.shapes[statement_shape(statement)] += 1
+        self.timeline.append((started - self.started, duration, statement))
+
+    def merge(self, other):
+        """Fold in the statements of a parallel task started during this request"""
+        shift = other.started - self.started
+        self.count += other.count
+        self.total_time += other.total_time
+        self.shapes.update(other.shapes)
+        self.timeline.extend((offset + shift, duration, statement) for offset, duration, statement in other.timeline)
+        self.timeline.sort(key=lambda item: item[0])
+
+    def repeated_shapes(self, threshold):
+        """Statement shapes executed at least `threshold` times (likely N+1 loops)"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+def current_query_stats():
+    """Return the QueryStats for the active request (or parallel task), None when unmonitored"""
+    if not has_app_context():
+        return None
+    return g.get('query_stats')
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_query_stats() is not None:
+        conn.info.setdefault('query_monitor_start', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_query_stats()
+    starts = conn.info.get('query_monitor_start')
+    if stats is None or not starts:
+        return
+    started = starts.pop()
+    stats.record(statement, started, time.perf_counter() - started)
+
+def _handle_error(exception_context):
+    # A failed execute never reaches after_cursor_execute: drop its start time
+    connection = exception_context.connection
+    starts = connection.info.get('query_monitor_start') if connection is not None else None
+    if starts:
+        starts.pop()
+
+def query_budget(max_queries):
+    """Declare the maximum number of SQL statements a view may run per request.
+
+    Place it directly under the route decorator so it tags the registered view.
+    """
+    def decorator(fn):
+        fn.query_budget = max_queries
+        return fn
+    return decorator
+
+def _endpoint_budget(app):
+    """Resolve the query budget for the current endpoint (config overrides decorators)"""
+    budgets = app.config.get('QUERY_BUDGETS') or {}
+    if request.endpoint in budgets:
+        return budgets[request.endpoint]
+    view = app.view_functions.get(request.endpoint)
+    return getattr(view, 'query_budget', app.config.get('QUERY_BUDGET_DEFAULT'))
+
+def init_query_monitor(app):
+    """Count SQL statements per request, flag repeated shapes and enforce query budgets"""
+    app.config.setdefault('QUERY_MONITOR_ENABLED', True)
+    app.config.setdefault('QUERY_BUDGET_DEFAULT', 50)
+    app.config.setdefault('QUERY_BUDGETS', {})
+    app.config.setdefault('QUERY_REPEAT_THRESHOLD', 5)
+    # None means "raise when app.testing is set, log otherwise"
+    app.config.setdefault('QUERY_BUDGET_RAISE', None)
+
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+
+    @app.before_request
+    def start_query_monitor():
+        if app.config['QUERY_MONITOR_ENABLED']:
+            g.query_stats = QueryStats()
+
+    @app.after_request
+    def check_query_monitor(response):
+        stats = g.pop('query_stats', None)
+        if stats is None or request.endpoint is None:
+            return response
+
+        if app.debug:
+            response.headers['X-Query-Count'] = str(stats.count)
+
+        for shape, count in stats.repeated_shapes(app.config['QUERY_REPEAT_THRESHOLD']):
+            app.logger.warning(
+                f"Possible N+1 in {request.endpoint}: statement ran {count} times: {shape[:200]}"
+            )
+
+        budget = _endpoint_budget(app)
+        if budget is not None and stats.count > budget:
+            message = (f"{request.endpoint} ran {stats.count} SQL statements "
+                       f"(budget {budget}, {stats.total_time * 1000:.1f} ms)")
+            should_raise = app.config['QUERY_BUDGET_RAISE']
+            if should_raise is None:
+                should_raise = app.testing
+            if should_raise:
+                raise QueryBudgetExceeded(message)
+            app.logger.warning(f"Query budget exceeded: {message}")
+
+        return response
+
+# Named eager-loading profiles endpoints can select instead of lazy loading in loops
+LOAD_PROFILES = {
+    'appointment_patient': lambda models: [joinedload(models.Appointment.patient)],
+    'patient_appointments': lambda models: [selectinload(models.Patient.appointments)],
+}
+
+def apply_load_profile(query, name):
+    """Apply the named eager-loading profile to a query"""
+    from app import models
+
+    if name not in LOAD_PROFILES:
+        raise KeyError(f"Unknown load profile: {name}")
+    return query.options(*LOAD_PROFILES[name](models))
@@ -0,0 +1,59 @@
+import csv
+import io
+from datetime import datetime
+from flask import Response, jsonify, stream_with_context
+from sqlalchemy import select
+from app import db
+
+# Rows fetched from the cursor at a time while streaming an export
+EXPORT_CHUNK_SIZE = 1000
+
+def select_for(serializer, fields=None):
+    """Core select of exactly the columns `serializer` needs for `fields`"""
+    table = serializer.model.__table__
+    return select(*[table.c[name] for name in serializer.source_columns(fields)])
+
+def fetch_rows(statement):
+    """Execute a select and return plain Row tuples.
+    
+    No ORM instances are built, so nothing enters the identity map, nothing is
+    tracked for changes or expired on commit, and autoflush is skipped.
+    """
+    with db.session.no_autoflush:
+        return db.session.execute(statement).all()
+
+def serialize_rows(serializer, statement, rows, fields=None):
+    """Dicts for rows fetched with `statement` (as built by select_for)"""
+    return serializer.rows(rows, list(statement.selected_columns.keys()), fields)
+
+def read_dicts(serializer, statement, fields=None):
+    """fetch_rows + serialize_rows"""
+    return serialize_rows(serializer, statement, fetch_rows(statement), fields)
+
+def _csv_chunks(serializer, statement, fields):
+    columns = list(statement.selected_columns.keys())
+    names = list(fields or serializer.fields)
+    serialize = serializer.compiled(fields, columns)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    with db.session.no_autoflush:
+        result = db.session.execute(statement.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+        for partition in result.partitions():
+            writer.writerows([record[name] for name in names] for record in map(serialize, partition))
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def export_response(name, serializer, statement, fields=None, format='json'):
+    """Every row of `statement` as a JSON document or a streamed CSV attachment"""
+    if format == 'csv':
+        filename = f"{name}-{datetime.now().strftime('%Y%m%d')}.csv"
+        return Response(
+            stream_with_context(_csv_chunks(serializer, statement, fields)),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
+    records = read_dicts(serializer, statement, fields)
+    return jsonify({name: records, 'count': len(records)})
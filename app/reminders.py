@@ -0,0 +1,167 @@
+from app.models import Notification, Appointment, Patient
+from app import db
+from datetime import datetime, timedelta
+
+# How long before an appointment its reminder becomes visible
+REMINDER_LEAD_TIME = timedelta(hours=24)
+
+# Upper bound on notifications returned per poll
+MAX_NOTIFICATIONS = 50
+
+def _missing_info_fields(patient):
+    """Return the list of missing critical fields for a patient (empty if complete)"""
+    # Same selection rule as the old on-the-fly scan: flag only when a field is NULL
+    if (patient.emergency_contact_name is not None and
+            patient.emergency_contact_phone is not None and
+            patient.allergies is not None):
+        return []
+
+    missing_fields = []
+    if not patient.emergency_contact_name:
+        missing_fields.append('emergency contact')
+    if not patient.emergency_contact_phone:
+        missing_fields.append('emergency phone')
+    if not patient.allergies:
+        missing_fields.append('allergies')
+    return missing_fields
+
+def _build_reminder(appointment, patient):
+    """Build the reminder row for a scheduled appointment"""
+    # Never due before it exists: read cursors are (due_at, id), so a row inserted with
+    # a due_at behind cursors already handed out (appointments booked under 24h ahead)
+    # would never reach clients polling with them
+    due_at = max(appointment.appointment_date - REMINDER_LEAD_TIME, datetime.now())
+    return Notification(
+        user_id=patient.user_id,
+        patient_id=patient.id,
+        appointment_id=appointment.id,
+        type='appointment_reminder',
+        message=f'Appointment with {appointment.doctor_name} for {patient.first_name} {patient.last_name}'[:255],
+        priority='medium',
+        event_date=appointment.appointment_date,
+        due_at=due_at,
+        expires_at=appointment.appointment_date
+    )
+
+def clear_appointments(appointment_ids):
+    """Remove the reminders for the given appointments (no commit)"""
+    if not appointment_ids:
+        return
+    Notification.query.filter(
+        Notification.appointment_id.in_(list(appointment_ids))
+    ).delete(synchronize_session=False)
+
+def sync_appointments(appointment_ids):
+    """Rebuild the reminders for the given appointments in the current transaction"""
+    appointment_ids = list(appointment_ids)
+    if not appointment_ids:
+        return
+
+    clear_appointments(appointment_ids)
+
+    # One joined read for the whole batch instead of touching appointment.patient per row
+    rows = db.session.query(Appointment, Patient).join(
+        Patient, Appointment.patient_id == Patient.id
+    ).filter(
+        Appointment.id.in_(appointment_ids),
+        Appointment.status == 'scheduled',
+        Patient.is_active == True
+    ).all()
+
+    db.session.add_all([_build_reminder(appointment, patient) for appointment, patient in rows])
+
+def sync_appointment(appointment):
+    """Rebuild the reminder for a single appointment (appointment must be flushed)"""
+    sync_appointments([appointment.id])
+
+def sync_patient(patient):
+    """Rebuild a patient's missing-info notice and appointment reminders (no commit)"""
+    Notification.query.filter(
+        Notification.patient_id == patient.id,
+        Notification.type == 'missing_info'
+    ).delete(synchronize_session=False)
+
+    if patient.is_active:
+        missing_fields = _missing_info_fields(patient)
+        if missing_fields:
+            db.session.add(Notification(
+                user_id=patient.user_id,
+                patient_id=patient.id,
+                type='missing_info',
+                message=f'Patient {patient.first_name} {patient.last_name} is missing: {", ".join(missing_fields)}'[:255],
+                priority='low',
+                due_at=datetime.now()
+            ))
+
+    # Names and active state are baked into reminder messages, so refresh those too
+    appointment_ids = [
+        appointment_id for (appointment_id,) in
+        db.session.query(Appointment.id).filter(Appointment.patient_id == patient.id).all()
+    ]
+    sync_appointments(appointment_ids)
+
+def rebuild_reminders():
+    """Rebuild the whole notifications table from appointments and patients (no commit)"""
+    Notification.query.delete(synchronize_session=False)
+
+    now = datetime.now()
+    rows = db.session.query(Appointment, Patient).join(
+        Patient, Appointment.patient_id == Patient.id
+    ).filter(
+        Appointment.status == 'scheduled',
+        Appointment.appointment_date >= now,
+        Patient.is_active == True
+    ).all()
+    notifications = [_build_reminder(appointment, patient) for appointment, patient in rows]
+
+    patients = Patient.query.filter(
+        Patient.is_active == True,
+        db.or_(
+            Patient.emergency_contact_name.is_(None),
+            Patient.emergency_contact_phone.is_(None),
+            Patient.allergies.is_(None)
+        )
+    ).all()
+    for patient in patients:
+        notifications.append(Notification(
+            user_id=patient.user_id,
+            patient_id=patient.id,
+            type='missing_info',
+            message=f'Patient {patient.first_name} {patient.last_name} is missing: {", ".join(_missing_info_fields(patient))}'[:255],
+            priority='low',
+            due_at=now
+        ))
+
+    db.session.add_all(notifications)
+    return len(notifications)
+
+def encode_cursor(notification):
+    """Encode the read position after a notification"""
+    return f"{notification.due_at.isoformat()}|{notification.id}"
+
+def decode_cursor(cursor):
+    """Decode a read cursor, returning (due_at, id) or None if invalid"""
+    try:
+        due_at, notification_id = cursor.rsplit('|', 1)
+        return datetime.fromisoformat(due_at), int(notification_id)
+    except (ValueError, AttributeError):
+        return None
+
+def pending_notifications(user_id, cursor=None, limit=MAX_NOTIFICATIONS):
+    """Read the user's due, unexpired notifications after the given cursor"""
+    now = datetime.now()
+    query = Notification.query.filter(
+        Notification.user_id == user_id,
+        Notification.due_at <= now,
+        db.or_(Notification.expires_at.is_(None), Notification.expires_at >= now)
+    )
+
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        due_at, notification_id = position
+        query = query.filter(db.or_(
+            Notification.due_at > due_at,
+            db.and_(Notification.due_at == due_at, Notification.id > notification_id)
+        ))
+
+    return query.order_by(Notification.due_at, Notification.id).limit(limit).all()
@@ -0,0 +1,157 @@
+import threading
+import time
+from functools import wraps
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql.dml import UpdateBase
+
+# SQLALCHEMY_BINDS key of the read-only replica
+REPLICA_BIND = 'replica'
+# Set on responses to requests that wrote, so the browser's next reads (on any worker) stay on the primary
+LAST_WRITE_COOKIE = 'medora_last_write'
+
+# JWT identity -> time.time() of that user's last committed write, for this process
+_last_writes = {}
+_last_writes_lock = threading.Lock()
+
+def record_write(identity, at=None):
+    """Remember that a user just wrote, so their reads stay on the primary for a while"""
+    with _last_writes_lock:
+        _last_writes[str(identity)] = at or time.time()
+        if len(_last_writes) > 10000:
+            cutoff = time.time() - current_app.config['REPLICA_READ_YOUR_WRITES_SECONDS']
+            for key in [key for key, value in _last_writes.items() if value < cutoff]:
+                del _last_writes[key]
+
+def _current_identity():
+    try:
+        from flask_jwt_extended import get_jwt_identity
+        return get_jwt_identity()
+    except Exception:
+        # No verified token in this request
+        return None
+
+def wrote_recently():
+    """True when the current user (or browser) wrote within REPLICA_READ_YOUR_WRITES_SECONDS"""
+    window = current_app.config['REPLICA_READ_YOUR_WRITES_SECONDS']
+    if not window:
+        return False
+    now = time.time()
+    try:
+        if now - float(request.cookies.get(LAST_WRITE_COOKIE, 0)) < window:
+            return True
+    except ValueError:
+        pass
+    identity = _current_identity()
+    if identity is None:
+        return False
+    with _last_writes_lock:
+        written = _last_writes.get(str(identity))
+    return written is not None and now - written < window
+
+def replica_allowed():
+    """Whether reads made now may go to the replica.
+    
+    Functions marked with read_only / primary_only decide for themselves; otherwise
+    only GET and HEAD requests read from the replica, and not while the user's own
+    recent writes may still be replicating.
+    """
+    if not has_app_context():
+        return False
+    route = g.get('db_route')
+    if route is not None:
+        return route == REPLICA_BIND
+    if not has_request_context() or request.method not in ('GET', 'HEAD'):
+        return False
+    return not wrote_recently()
+
+def current_route(session):
+    """'replica' or 'primary' for work done on behalf of the current request (e.g. in worker threads)"""
+    if session.info.get('wrote') or not replica_allowed():
+        return 'primary'
+    return REPLICA_BIND
+
+def _routed(route):
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            previous = g.get('db_route')
+            g.db_route = route
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                g.db_route = previous
+        return wrapper
+    return decorator
+
+# Reads made inside the function may be served by the replica, whatever the request method
+read_only = _routed(REPLICA_BIND)
+# Reads made inside the function always see the primary, e.g. when they must observe their own writes
+primary_only = _routed('primary')
+
+class RoutingSession(Session):
+    """Session that sends reads to the replica bind when replica_allowed() says so.
+    
+    Flushes, INSERT/UPDATE/DELETE statements and everything after the session's first
+    write use the primary, so a request that writes then reads sees its own changes.
+    """
+    
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        primary = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or self._flushing:
+            return primary
+        if isinstance(clause, UpdateBase):
+            self.info['wrote'] = True
+            return primary
+        if self.info.get('wrote') or not has_app_context():
+            return primary
+        engines = self._db.engines
+        replica = engines.get(REPLICA_BIND)
+        if replica is None or primary is not engines.get(None) or not replica_allowed():
+            return primary
+        return replica
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_write(session, flush_context):
+    session.info['wrote'] = True
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _record_committed_write(session):
+    if not session.info.get('wrote') or not has_app_context():
+        return
+    now = time.time()
+    g.replica_write_at = now
+    if has_request_context():
+        identity = _current_identity()
+        if identity is not None:
+            record_write(identity, now)
+
+def sync_sqlite_replica():
+    """Copy the primary database into the replica when both are SQLite files.
+    
+    Local stand-in for replication: run it (or schedule it) to let the replica catch
+    up; until then it lags behind exactly like a real one would. Returns the number
+    of pages copied.
+    """
+    engines = current_app.extensions['sqlalchemy'].engines
+    source, target = engines[None], engines[REPLICA_BIND]
+    if source.dialect.name != 'sqlite' or target.dialect.name != 'sqlite':
+        raise RuntimeError('sync_sqlite_replica only copies SQLite databases')
+    target.dispose()
+    with source.raw_connection() as source_connection, target.raw_connection() as target_connection:
+        source_connection.driver_connection.backup(target_connection.driver_connection)
+        return source_connection.driver_connection.execute('PRAGMA page_count').fetchone()[0]
+
+def init_replica(app):
+    """Keep browsers that just wrote on the primary across workers"""
+    app.config.setdefault('REPLICA_READ_YOUR_WRITES_SECONDS', 5)
+    
+    @app.after_request
+    def set_last_write_cookie(response):
+        written = g.get('replica_write_at')
+        window = app.config['REPLICA_READ_YOUR_WRITES_SECONDS']
+        if written and window and REPLICA_BIND in app.config.get('SQLALCHEMY_BINDS', {}):
+            response.set_cookie(LAST_WRITE_COOKIE, f"{written:.3f}", max_age=int(window) + 1,
+                                httponly=True, samesite='Lax')
+        return response
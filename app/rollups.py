@@ -0,0 +1,180 @@
+from app.models import (Patient, Appointment, DailyRegistrationRollup, DailyAppointmentRollup,
+                        DailyDoctorAppointmentRollup, RollupWatermark, RollupDirtyDay)
+from app import db
+from datetime import datetime, date, timedelta
+from sqlalchemy import event, func, inspect
+from app.replica import RoutingSession
+
+# Re-read this much history behind each watermark so rows committed by transactions
+# that started before the previous run are not missed
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+# Days recomputed per statement batch
+DAY_CHUNK = 31
+
+ROLLUP_MODELS = [DailyRegistrationRollup, DailyAppointmentRollup, DailyDoctorAppointmentRollup]
+
+def _as_date(value):
+    """Normalize DATE() results (a string on SQLite) to a date"""
+    if value is None or isinstance(value, date) and not isinstance(value, datetime):
+        return value
+    if isinstance(value, datetime):
+        return value.date()
+    return date.fromisoformat(str(value)[:10])
+
+def mark_days(values):
+    """Queue days for recomputation (e.g. the old dates of rescheduled appointments)"""
+    days = {_as_date(value) for value in values if value is not None}
+    if days:
+        db.session.execute(RollupDirtyDay.__table__.insert(), [{'day': day} for day in days])
+
+@event.listens_for(RoutingSession, 'before_flush')
+def _mark_moved_appointments(session, flush_context, instances):
+    """An appointment updated through the ORM leaves its old day behind; queue that day"""
+    days = set()
+    for obj in session.dirty:
+        if isinstance(obj, Appointment):
+            history = inspect(obj).attrs.appointment_date.history
+            days.update(_as_date(value) for value in history.deleted if value is not None)
+    session.add_all([RollupDirtyDay(day=day) for day in days])
+
+def _day_ranges(days):
+    """Collapse sorted days into half-open [start, end) datetime ranges"""
+    ranges = []
+    for day in sorted(days):
+        start = datetime.combine(day, datetime.min.time())
+        if ranges and ranges[-1][1] == start:
+            ranges[-1][1] = start + timedelta(days=1)
+        else:
+            ranges.append([start, start + timedelta(days=1)])
+    return ranges
+
+def _in_days(column, days):
+    """Sargable filter matching rows whose datetime column falls on one of the days"""
+    return db.or_(*[db.and_(column >= start, column < end) for start, end in _day_ranges(days)])
+
+def _recompute(days=None):
+    """Replace the rollup rows for the given days (every day when None). Returns rows written."""
+    registration_day = func.date(Patient.created_at)
+    appointment_day = func.date(Appointment.appointment_date)
+    patient_filter = [Patient.is_active == True]
+    appointment_filter = [Patient.is_active == True]
+    if days is not None:
+        patient_filter.append(_in_days(Patient.created_at, days))
+        appointment_filter.append(_in_days(Appointment.appointment_date, days))
+    
+    for model in ROLLUP_MODELS:
+        delete = model.__table__.delete()
+        if days is not None:
+            delete = delete.where(model.__table__.c.day.in_(sorted(days)))
+        db.session.execute(delete)
+    
+    registrations = db.session.query(Patient.user_id, registration_day, func.count(Patient.id)).filter(
+        *patient_filter
+    ).group_by(Patient.user_id, registration_day).all()
+    
+    appointments = db.session.query(
+        Patient.user_id, Appointment.doctor_id, appointment_day, Appointment.status, func.count(Appointment.id)
+    ).join(Patient, Appointment.patient_id == Patient.id).filter(
+        *appointment_filter
+    ).group_by(Patient.user_id, Appointment.doctor_id, appointment_day, Appointment.status).all()
+    
+    by_user = {}
+    by_doctor = {}
+    for user_id, doctor_id, day, status, count in appointments:
+        key = (user_id, _as_date(day), status or 'scheduled')
+        by_user[key] = by_user.get(key, 0) + count
+        if doctor_id is not None:
+            key = (doctor_id, _as_date(day), status or 'scheduled')
+            by_doctor[key] = by_doctor.get(key, 0) + count
+    
+    inserts = [
+        (DailyRegistrationRollup, [{'user_id': user_id, 'day': _as_date(day), 'count': count}
+                                   for user_id, day, count in registrations]),
+        (DailyAppointmentRollup, [{'user_id': user_id, 'day': day, 'status': status, 'count': count}
+                                  for (user_id, day, status), count in by_user.items()]),
+        (DailyDoctorAppointmentRollup, [{'doctor_id': doctor_id, 'day': day, 'status': status, 'count': count}
+                                        for (doctor_id, day, status), count in by_doctor.items()]),
+    ]
+    written = 0
+    for model, rows in inserts:
+        if rows:
+            db.session.execute(model.__table__.insert(), rows)
+            written += len(rows)
+    return written
+
+def _get_watermark(name):
+    watermark = RollupWatermark.query.get(name)
+    if watermark is None:
+        watermark = RollupWatermark(name=name)
+        db.session.add(watermark)
+    return watermark
+
+def _touched_days(patient_mark, appointment_mark):
+    """Days affected by rows changed since the watermarks, plus queued dirty days"""
+    days = set()
+    
+    dirty = db.session.query(RollupDirtyDay.id, RollupDirtyDay.day).all()
+    days.update(_as_date(day) for dirty_id, day in dirty)
+    
+    patients = db.session.query(Patient.id, Patient.created_at, Patient.updated_at).filter(
+        Patient.updated_at >= patient_mark - WATERMARK_OVERLAP
+    ).all()
+    days.update(_as_date(created_at) for patient_id, created_at, updated_at in patients if created_at)
+    
+    # A patient's activation state decides whether its appointments are counted at all
+    patient_ids = [patient_id for patient_id, created_at, updated_at in patients]
+    for start in range(0, len(patient_ids), 500):
+        rows = db.session.query(Appointment.appointment_date).filter(
+            Appointment.patient_id.in_(patient_ids[start:start + 500])
+        ).all()
+        days.update(_as_date(appointment_date) for appointment_date, in rows if appointment_date)
+    
+    appointments = db.session.query(Appointment.appointment_date, Appointment.updated_at).filter(
+        Appointment.updated_at >= appointment_mark - WATERMARK_OVERLAP
+    ).all()
+    days.update(_as_date(appointment_date) for appointment_date, updated_at in appointments if appointment_date)
+    
+    latest_patient = max((updated_at for _, _, updated_at in patients if updated_at), default=patient_mark)
+    latest_appointment = max((updated_at for _, updated_at in appointments if updated_at), default=appointment_mark)
+    return days, [dirty_id for dirty_id, day in dirty], latest_patient, latest_appointment
+
+def run_rollups(full=False):
+    """Bring the daily rollups up to date and commit.
+    
+    Only days touched since the last run are recomputed; the first run (or full=True)
+    rebuilds everything. Run it from one scheduler at a time.
+    Returns (days_recomputed, rows_written); days is None for a full rebuild.
+    """
+    patient_watermark = _get_watermark('patients')
+    appointment_watermark = _get_watermark('appointments')
+    
+    if full or patient_watermark.watermark is None or appointment_watermark.watermark is None:
+        dirty_ids = [dirty_id for dirty_id, in db.session.query(RollupDirtyDay.id).all()]
+        latest_patient = db.session.query(func.max(Patient.updated_at)).scalar()
+        latest_appointment = db.session.query(func.max(Appointment.updated_at)).scalar()
+        written = _recompute()
+        days = None
+    else:
+        days, dirty_ids, latest_patient, latest_appointment = _touched_days(
+            patient_watermark.watermark, appointment_watermark.watermark
+        )
+        ordered = sorted(days)
+        written = 0
+        for start in range(0, len(ordered), DAY_CHUNK):
+            written += _recompute(ordered[start:start + DAY_CHUNK])
+    
+    if dirty_ids:
+        RollupDirtyDay.query.filter(RollupDirtyDay.id.in_(dirty_ids)).delete(synchronize_session=False)
+    # An empty table still gets a watermark so the next run is incremental
+    now = datetime.utcnow()
+    patient_watermark.watermark = latest_patient or now
+    appointment_watermark.watermark = latest_appointment or now
+    patient_watermark.updated_at = appointment_watermark.updated_at = now
+    db.session.commit()
+    
+    return (len(days) if days is not None else None), written
+
+def rollup_as_of():
+    """When the rollup job last completed (UTC), or None if it never ran"""
+    return db.session.query(func.min(RollupWatermark.updated_at)).scalar()
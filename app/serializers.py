@@ -0,0 +1,122 @@
+import threading
+from sqlalchemy import Date, DateTime
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+class ModelSerializer:
+    """Turns model instances (or plain row tuples) into dicts with precompiled extractors.
+    
+    `fields` lists the output keys in order: column names, or names in `derived`,
+    which maps a name to (function, dependency names) and is computed once per row
+    even when several fields use it. Date and DateTime columns are emitted as ISO
+    8601 strings, like the hand-written to_dict methods did.
+    
+    For every field subset (and tuple layout) a small function is generated with
+    one dict literal, so serializing a row costs no per-field loop or getattr().
+    """
+    
+    def __init__(self, model, fields, derived=None):
+        self.model = model
+        self.fields = tuple(fields)
+        self.derived = dict(derived or {})
+        self._compiled = {}
+        self._all_fields = None
+        self._lock = threading.Lock()
+    
+    def _date_columns(self):
+        columns = self.model.__table__.columns
+        return {
+            column.key for column in columns
+            if isinstance(column.type, (Date, DateTime))
+        }
+    
+    def _resolve(self, fields):
+        """Sources and derived values the requested fields need, in dependency order"""
+        unknown = [name for name in fields if name not in self.fields]
+        if unknown:
+            raise ValueError(f"Unknown {self.model.__name__} fields: {', '.join(unknown)}")
+        
+        order = []
+        
+        def need(name):
+            if name in order:
+                return
+            for dependency in self.derived.get(name, (None, ()))[1]:
+                need(dependency)
+            order.append(name)
+        
+        for name in fields:
+            need(name)
+        return order
+    
+    def source_columns(self, fields=None):
+        """Column names that must be selected to serialize `fields` from row tuples"""
+        return [name for name in self._resolve(tuple(fields or self.fields)) if name not in self.derived]
+    
+    def _compile(self, fields, columns):
+        order = self._resolve(fields)
+        namespace = {'_iso': _iso}
+        lines = ['def serialize(o):']
+        for index, name in enumerate(order):
+            if name in self.derived:
+                function, dependencies = self.derived[name]
+                namespace[f'_f{index}'] = function
+                arguments = ', '.join(f'v_{dependency}' for dependency in dependencies)
+                lines.append(f'    v_{name} = _f{index}({arguments})')
+            elif columns is None:
+                lines.append(f'    v_{name} = o.{name}')
+            else:
+                if name not in columns:
+                    raise ValueError(f"Row layout has no column {name!r} needed for {self.model.__name__}")
+                lines.append(f'    v_{name} = o[{columns.index(name)}]')
+        
+        date_columns = self._date_columns()
+        items = ', '.join(
+            f"'{name}': _iso(v_{name})" if name in date_columns else f"'{name}': v_{name}"
+            for name in fields
+        )
+        lines.append(f'    return {{{items}}}')
+        exec('\n'.join(lines), namespace)
+        return namespace['serialize']
+    
+    def compiled(self, fields=None, columns=None):
+        """The serializing function for a field subset (and row tuple layout, if given)"""
+        if not fields and not columns:
+            # to_dict() path: skip building and hashing the key
+            function = self._all_fields
+            if function is None:
+                function = self._all_fields = self.compiled(self.fields, ())
+            return function
+        key = (tuple(fields or self.fields), tuple(columns) if columns else None)
+        function = self._compiled.get(key)
+        if function is None:
+            with self._lock:
+                function = self._compiled.get(key)
+                if function is None:
+                    function = self._compiled[key] = self._compile(*key)
+        return function
+    
+    def one(self, obj, fields=None):
+        """Serialize one instance"""
+        return self.compiled(fields)(obj)
+    
+    def many(self, objs, fields=None):
+        """Serialize a sequence of instances"""
+        serialize = self.compiled(fields)
+        return [serialize(obj) for obj in objs]
+    
+    def rows(self, rows, columns, fields=None):
+        """Serialize plain tuples whose positions are named by `columns`"""
+        serialize = self.compiled(fields, columns)
+        return [serialize(row) for row in rows]
+
+def requested_fields(serializer, value):
+    """Parse a comma-separated ?fields= value into a field subset (None for all fields)"""
+    if not value:
+        return None
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in serializer.fields]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
@@ -0,0 +1,132 @@
+// Live dashboard updates from the server-sent event stream at /api/live/stream.
+// The stream is read with fetch rather than EventSource so the token travels in the
+// Authorization header instead of the URL (where access logs would record it).
+const MedoraLive = (() => {
+    let controller = null;
+    let retryTimer = null;
+    let lastEventId = null;
+    let changeBanner = null;
+    
+    // getToken() returns the current access token; onEvent(type, data) gets each event
+    function connect(getToken, onEvent) {
+        const token = getToken();
+        if (controller || !token || !window.ReadableStream || !window.AbortController) {
+            return;
+        }
+        clearTimeout(retryTimer);
+        
+        const current = controller = new AbortController();
+        const headers = { 'Authorization': `Bearer ${token}` };
+        if (lastEventId) {
+            headers['Last-Event-ID'] = lastEventId;
+        }
+        let retryDelay = 3000;
+        
+        fetch('/api/live/stream', { headers, signal: current.signal })
+            .then(async (response) => {
+                if (!response.ok || !response.body) {
+                    // Refused: retry only when the server says when (too many streams), else give up
+                    const retryAfter = parseInt(response.headers.get('Retry-After'), 10);
+                    return retryAfter > 0 ? retryAfter * 1000 : null;
+                }
+                await read(response.body, onEvent, (delay) => { retryDelay = delay; });
+                // The server ends streams after a while; pick up where this one stopped
+                return retryDelay;
+            })
+            .catch(() => retryDelay)
+            .then((delay) => {
+                if (controller !== current) {
+                    return;  // Disconnected meanwhile
+                }
+                controller = null;
+                if (delay !== null) {
+                    retryTimer = setTimeout(() => connect(getToken, onEvent), delay);
+                }
+            });
+    }
+    
+    function disconnect() {
+        if (controller) {
+            controller.abort();
+            controller = null;
+        }
+        clearTimeout(retryTimer);
+        lastEventId = null;
+    }
+    
+    async function read(body, onEvent, setRetryDelay) {
+        const reader = body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) {
+                return;
+            }
+            buffer += decoder.decode(value, { stream: true });
+            
+            let end;
+            while ((end = buffer.indexOf('\n\n')) !== -1) {
+                const frame = buffer.slice(0, end);
+                buffer = buffer.slice(end + 2);
+                
+                const message = { event: 'message', data: '' };
+                frame.split('\n').forEach(line => {
+                    const colon = line.indexOf(':');
+                    if (colon <= 0) {
+                        return;  // Comment (keepalive) or malformed line
+                    }
+                    message[line.slice(0, colon)] = line.slice(colon + 1).replace(/^ /, '');
+                });
+                
+                if (message.retry) {
+                    setRetryDelay(parseInt(message.retry, 10) || 3000);
+                }
+                if (message.id) {
+                    lastEventId = message.id;
+                }
+                if (message.data) {
+                    onEvent(message.event, JSON.parse(message.data));
+                }
+            }
+        }
+    }
+    
+    // Default handling for pages without their own: a small banner per event
+    function notify(text, action) {
+        const banner = document.createElement('div');
+        banner.className = 'fixed bottom-4 right-4 z-50 bg-white border-l-4 border-blue-500 shadow-lg rounded-md px-4 py-3 text-sm text-gray-800';
+        banner.textContent = text;
+        if (action) {
+            const button = document.createElement('button');
+            button.className = 'ml-3 text-blue-600 font-medium hover:underline';
+            button.textContent = action.label;
+            button.addEventListener('click', action.run);
+            banner.appendChild(button);
+        } else {
+            setTimeout(() => banner.remove(), 8000);
+        }
+        document.body.appendChild(banner);
+        return banner;
+    }
+    
+    function announce(type, data) {
+        if (type === 'notification_due') {
+            notify(data.message);
+        } else if (type === 'waitlist_offer') {
+            notify('A waitlisted patient has been offered a freed slot');
+        } else if (['appointment', 'patient', 'resync'].includes(type) && !changeBanner) {
+            // One banner for any number of changes until the page is reloaded
+            changeBanner = notify('Patients or appointments have changed.', {
+                label: 'Reload', run: () => window.location.reload()
+            });
+        }
+    }
+    
+    function storedToken() {
+        return localStorage.getItem('medora_token') || localStorage.getItem('access_token');
+    }
+    
+    return { connect, disconnect, announce, storedToken };
+})();
@@ -389,6 +389,7 @@ async function fetchUserProfile() {
 }
 
 function handleLogout() {
+    disconnectLiveUpdates();
     currentToken = null;
     currentUser = null;
     localStorage.removeItem('medora_token');
@@ -504,6 +505,7 @@ async function loadDashboard() {
         if (response.ok) {
             const data = await response.json();
             updateDashboard(data);
+            connectLiveUpdates();
         } else {
             showToast('Failed to load dashboard', 'error');
         }
@@ -514,6 +516,60 @@ async function loadDashboard() {
     }
 }
 
+// Live updates: the server pushes small change events instead of us re-polling
+// (the stream client is live.js, which must be loaded before this file)
+let liveRefreshTimer = null;
+
+function connectLiveUpdates() {
+    if (!window.MedoraLive) {
+        return;
+    }
+    MedoraLive.connect(() => currentToken, handleLiveEvent);
+}
+
+function handleLiveEvent(type, data) {
+    if (['appointment', 'patient', 'resync'].includes(type)) {
+        scheduleDashboardRefresh();
+    } else if (type === 'notification_due') {
+        showToast(data.message, data.priority === 'high' ? 'warning' : 'info');
+    } else if (type === 'waitlist_offer') {
+        showToast('A waitlisted patient has been offered a freed slot', 'info');
+    }
+}
+
+function disconnectLiveUpdates() {
+    if (window.MedoraLive) {
+        MedoraLive.disconnect();
+    }
+    clearTimeout(liveRefreshTimer);
+}
+
+function scheduleDashboardRefresh() {
+    // Coalesce bursts (e.g. bulk reschedules) into a single refresh
+    clearTimeout(liveRefreshTimer);
+    liveRefreshTimer = setTimeout(refreshDashboardQuietly, 1000);
+}
+
+async function refreshDashboardQuietly() {
+    const dashboardPage = document.getElementById('dashboardPage');
+    if (!currentToken || (dashboardPage && dashboardPage.classList.contains('hidden'))) {
+        return;
+    }
+    
+    try {
+        const response = await fetch(`${API_BASE}/dashboard`, {
+            headers: {
+                'Authorization': `Bearer ${currentToken}`
+            }
+        });
+        if (response.ok) {
+            updateDashboard(await response.json());
+        }
+    } catch (error) {
+        // Next event or manual navigation will retry
+    }
+}
+
 function updateDashboard(data) {
     // Update stats
     document.getElementById('totalPatients').textContent = data.statistics.total_patients;
@@ -1352,8 +1408,8 @@ function displayAppointments(appointments) {
             </td>
             <td class="px-6 py-4 whitespace-nowrap">
                 <span class="inline-flex px-2 py-1 text-xs font-semibold rounded-full ${
-                    appointment.status === 'Scheduled' ? 'bg-blue-100 text-blue-800' :
-                    appointment.status === 'Completed' ? 'bg-green-100 text-green-800' :
+                    (appointment.status || '').toLowerCase() === 'scheduled' ? 'bg-blue-100 text-blue-800' :
+                    (appointment.status || '').toLowerCase() === 'completed' ? 'bg-green-100 text-green-800' :
                     'bg-red-100 text-red-800'
                 }">
                     ${appointment.status}
@@ -0,0 +1,274 @@
+import bisect
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+from flask import g, has_request_context, request
+
+# name -> metric, in registration order (the order /metrics lists them)
+REGISTRY = {}
+
+# Every thread records into its own shard, so observing never takes a lock;
+# scrapes and flushes copy the shards (dict copies are atomic under the GIL).
+_local = threading.local()
+_shards = []
+_shards_pid = os.getpid()
+_shards_lock = threading.Lock()
+
+def _shard():
+    global _shards, _shards_pid
+    shard = getattr(_local, 'shard', None)
+    if shard is None or _local.pid != os.getpid():
+        shard = _local.shard = {}
+        _local.pid = os.getpid()
+        with _shards_lock:
+            if _shards_pid != os.getpid():
+                # Forked: the parent's observations belong to the parent
+                _shards, _shards_pid = [], os.getpid()
+            _shards.append(shard)
+    return shard
+
+class Counter:
+    """Monotonic total, summed across threads and workers"""
+    kind = 'counter'
+    
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        REGISTRY[name] = self
+    
+    def inc(self, *labels, amount=1):
+        shard = _shard()
+        key = (self.name, labels)
+        shard[key] = shard.get(key, 0) + amount
+    
+    @staticmethod
+    def merge(total, value):
+        return value if total is None else total + value
+
+class Histogram:
+    """Bucketed observations; each value is [count per bucket..., count above last bucket, sum]"""
+    kind = 'histogram'
+    
+    def __init__(self, name, documentation, labelnames=(), buckets=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        REGISTRY[name] = self
+    
+    def observe(self, value, *labels):
+        shard = _shard()
+        key = (self.name, labels)
+        entry = shard.get(key)
+        if entry is None:
+            entry = shard[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        entry[bisect.bisect_left(self.buckets, value)] += 1
+        entry[-1] += value
+    
+    @staticmethod
+    def merge(total, value):
+        return list(value) if total is None else [a + b for a, b in zip(total, value)]
+
+class Gauge:
+    """Point-in-time value reported per worker (pid label); produced by a collector at scrape time"""
+    kind = 'gauge'
+    
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames) + ('pid',)
+        REGISTRY[name] = self
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+FAST_TIME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+REQUEST_SECONDS = Histogram('medora_http_request_duration_seconds', 'Time spent handling a request',
+                            ('endpoint', 'method', 'status'), TIME_BUCKETS)
+RESPONSE_BYTES = Histogram('medora_http_response_size_bytes', 'Response body size (streamed responses excluded)',
+                           ('endpoint',), SIZE_BUCKETS)
+SQL_STATEMENTS = Histogram('medora_sql_statements_per_request', 'SQL statements run while handling a request',
+                           ('endpoint',), STATEMENT_BUCKETS)
+SQL_SECONDS = Histogram('medora_sql_duration_seconds_per_request', 'Time spent in SQL while handling a request',
+                        ('endpoint',), TIME_BUCKETS)
+JSON_SECONDS = Histogram('medora_json_encode_seconds', 'Time spent encoding JSON responses',
+                         ('endpoint',), FAST_TIME_BUCKETS)
+BCRYPT_SECONDS = Histogram('medora_bcrypt_seconds', 'Time spent hashing or checking passwords',
+                           ('operation',), TIME_BUCKETS)
+
+def current_endpoint():
+    """Label for the endpoint being served ('none' outside requests, 'unmatched' for 404s)"""
+    if not has_request_context():
+        return 'none'
+    return request.endpoint or 'unmatched'
+
+def process_snapshot():
+    """{metric name: {labels: value}} of everything observed in this process"""
+    with _shards_lock:
+        shards = list(_shards) if _shards_pid == os.getpid() else []
+    merged = {}
+    for shard in shards:
+        for (name, labels), value in dict(shard).items():
+            values = merged.setdefault(name, {})
+            values[labels] = REGISTRY[name].merge(values.get(labels), value)
+    return merged
+
+def merge_snapshots(snapshots):
+    merged = {}
+    for snapshot in snapshots:
+        for name, values in snapshot.items():
+            metric = REGISTRY.get(name)
+            if metric is None or metric.kind == 'gauge':
+                continue
+            target = merged.setdefault(name, {})
+            for labels, value in values.items():
+                target[labels] = metric.merge(target.get(labels), value)
+    return merged
+
+def _dump(snapshot, gauges=None):
+    return {
+        'metrics': {name: [[list(labels), value] for labels, value in values.items()] for name, values in snapshot.items()},
+        'gauges': {name: [[list(labels), value] for labels, value in values.items()] for name, values in (gauges or {}).items()}
+    }
+
+def _load(path):
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}, {}
+    
+    def unpack(section):
+        return {name: {tuple(labels): value for labels, value in values} for name, values in data.get(section, {}).items()}
+    return unpack('metrics'), unpack('gauges')
+
+def _write(path, data):
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, 'w') as f:
+        json.dump(data, f)
+    os.replace(temporary, path)
+
+def _worker_path(directory, pid):
+    return os.path.join(directory, f"worker-{pid}.json")
+
+def flush(directory, gauges=None):
+    """Write this worker's totals (and current gauges) where the other workers can merge them"""
+    _write(_worker_path(directory, os.getpid()), _dump(process_snapshot(), gauges))
+
+def retire_worker(directory, pid):
+    """Fold an exited worker's totals into the archive so counters never go backwards"""
+    path = _worker_path(directory, pid)
+    if not os.path.exists(path):
+        return
+    with open(os.path.join(directory, 'archive.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        archive = os.path.join(directory, 'archive.json')
+        metrics, _ = _load(path)
+        archived, _ = _load(archive)
+        _write(archive, _dump(merge_snapshots([archived, metrics])))
+        os.remove(path)
+
+def reset_directory(directory):
+    """Forget totals from a previous server run"""
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        os.remove(path)
+
+def collect(directory=None, gauges=None):
+    """(metrics, gauges) merged across this process and, with a directory, every other worker"""
+    snapshots = [process_snapshot()]
+    all_gauges = [gauges or {}]
+    if directory:
+        own = _worker_path(directory, os.getpid())
+        for path in glob.glob(os.path.join(directory, '*.json')):
+            if path == own:
+                continue
+            metrics, worker_gauges = _load(path)
+            snapshots.append(metrics)
+            all_gauges.append(worker_gauges)
+    merged_gauges = {}
+    for worker_gauges in all_gauges:
+        for name, values in worker_gauges.items():
+            merged_gauges.setdefault(name, {}).update(values)
+    return merge_snapshots(snapshots), merged_gauges
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render(metrics, gauges):
+    """Prometheus text exposition format (version 0.0.4)"""
+    lines = []
+    for name, metric in REGISTRY.items():
+        values = gauges.get(name) if metric.kind == 'gauge' else metrics.get(name)
+        if not values:
+            continue
+        lines.append(f"# HELP {name} {metric.documentation}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for labels, value in sorted(values.items()):
+            if metric.kind != 'histogram':
+                lines.append(f"{name}{_labels(metric.labelnames, labels)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets + (float('inf'),), value[:-1]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(metric.labelnames, labels, ('le', _number(bound)))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(metric.labelnames, labels)} {_number(value[-1])}")
+            lines.append(f"{name}_count{_labels(metric.labelnames, labels)} {cumulative}")
+    return '\n'.join(lines) + '\n'
+
+def metrics_directory(app):
+    """METRICS_DIR from config, else from the environment.
+    
+    Read at use time: gunicorn.conf.py may export a directory after the app was
+    created (flask serve builds the app before loading the server config).
+    """
+    return app.config.get('METRICS_DIR') or os.environ.get('METRICS_DIR')
+
+def init_telemetry(app, gauge_collector=None):
+    """Time every request and record its SQL work; flush per-worker totals to METRICS_DIR"""
+    app.config.setdefault('METRICS_DIR', None)
+    app.config.setdefault('METRICS_FLUSH_SECONDS', 5)
+    state = {'flushed': 0.0}
+    
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+    
+    @app.after_request
+    def record_request(response):
+        started = g.get('request_started')
+        if started is None:
+            return response
+        endpoint = current_endpoint()
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint, request.method, str(response.status_code))
+        if not response.is_streamed:
+            RESPONSE_BYTES.observe(response.calculate_content_length() or 0, endpoint)
+        stats = g.get('query_stats')
+        if stats is not None:
+            SQL_STATEMENTS.observe(stats.count, endpoint)
+            SQL_SECONDS.observe(stats.total_time, endpoint)
+        
+        directory = metrics_directory(app)
+        now = time.monotonic()
+        if directory and now - state['flushed'] >= app.config['METRICS_FLUSH_SECONDS']:
+            state['flushed'] = now
+            try:
+                flush(directory, gauge_collector() if gauge_collector else None)
+            except OSError as e:
+                app.logger.warning(f"Could not flush metrics: {str(e)}")
+        return response
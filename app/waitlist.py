@@ -0,0 +1,492 @@
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.models import WaitlistEntry, Patient, User, Appointment, Notification
+from app import db
+from app import events, reminders, counters
+from app.doctors import doctor_display_name
+from datetime import date, datetime, time as dt_time, timedelta
+import heapq
+import itertools
+import threading
+import time
+
+waitlist_bp = Blueprint('waitlist', __name__)
+
+# Seconds before a worker reloads a doctor's heap to pick up entries added by other workers
+WAITLIST_RELOAD_SECONDS = 60
+
+class DoctorWaitlist:
+    """In-memory index of one doctor's waiting entries, mirrored from waitlist_entries.
+    
+    Entries are bucketed by the days their window covers. Each day has two heaps of
+    (-priority, created_at, entry_id, version, window_start, window_end): entries
+    waiting the whole day, and entries whose window starts or ends during it. The
+    highest priority, longest-waiting entry is on top of both.
+    """
+    
+    def __init__(self, doctor_id):
+        self.doctor_id = doctor_id
+        self.loaded_at = None
+        self._days = {}  # date -> (whole-day heap, partial-day heap)
+        self._live = {}  # entry_id -> version of its current heap items
+        self._versions = itertools.count()
+        self._lock = threading.Lock()
+    
+    def _index(self, days, entry_id, priority, created_at, window_start, window_end):
+        """Add one heap item per remaining day of the window (caller heapifies or holds the lock)"""
+        version = next(self._versions)
+        self._live[entry_id] = version
+        item = (-(priority or 0), created_at or datetime.min, entry_id, version, window_start, window_end)
+        day = max(window_start.date(), date.today())
+        while day <= window_end.date():
+            whole_day = (window_start <= datetime.combine(day, dt_time.min)
+                         and window_end >= datetime.combine(day, dt_time.max))
+            days.setdefault(day, ([], []))[0 if whole_day else 1].append(item)
+            day += timedelta(days=1)
+        return item
+    
+    def load(self):
+        """Rebuild the index from the doctor's waiting rows (idx_waitlist_doctor_status)"""
+        rows = db.session.query(
+            WaitlistEntry.id, WaitlistEntry.priority, WaitlistEntry.created_at,
+            WaitlistEntry.window_start, WaitlistEntry.window_end
+        ).filter(
+            WaitlistEntry.doctor_id == self.doctor_id,
+            WaitlistEntry.status == 'waiting'
+        ).all()
+        
+        with self._lock:
+            self._live = {}
+            days = {}
+            for row in rows:
+                self._index(days, *row)
+            for heaps in days.values():
+                for heap in heaps:
+                    heapq.heapify(heap)
+            self._days = days
+            self.loaded_at = time.monotonic()
+    
+    def is_stale(self):
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > WAITLIST_RELOAD_SECONDS
+    
+    def push(self, entry):
+        """Add a waiting entry: O(d log n) for a window covering d days"""
+        self._push(entry.id, entry.priority, entry.created_at, entry.window_start, entry.window_end)
+    
+    def restore(self, item):
+        """Put back an item returned by pop_eligible whose offer was rolled back"""
+        priority, created_at, entry_id, version, window_start, window_end = item
+        self._push(entry_id, -priority, created_at, window_start, window_end)
+    
+    def _push(self, entry_id, priority, created_at, window_start, window_end):
+        with self._lock:
+            added = {}
+            self._index(added, entry_id, priority, created_at, window_start, window_end)
+            for day, (whole, partial) in added.items():
+                heaps = self._days.setdefault(day, ([], []))
+                for item in whole:
+                    heapq.heappush(heaps[0], item)
+                for item in partial:
+                    heapq.heappush(heaps[1], item)
+    
+    def discard(self, entry_id):
+        """Lazily remove an entry; its heap items are dropped when they reach the top"""
+        with self._lock:
+            self._live.pop(entry_id, None)
+    
+    def _best(self, heap, slot, exclude):
+        """Pop the best live item containing the slot; items set aside are pushed back"""
+        skipped = []
+        found = None
+        while heap:
+            item = heapq.heappop(heap)
+            entry_id, version, window_start, window_end = item[2:]
+            if self._live.get(entry_id) != version:
+                continue  # discarded, already offered, or re-indexed by a later push
+            if entry_id in exclude or not (window_start <= slot <= window_end):
+                skipped.append(item)
+                continue
+            found = item
+            break
+        for item in skipped:
+            heapq.heappush(heap, item)
+        return found
+    
+    def pop_eligible(self, slot, exclude=()):
+        """Pop the heap item of the best entry whose window contains the slot, or return None.
+        
+        Only the slot's day is looked at. Whole-day entries always contain the slot,
+        so that heap costs O(log n) plus any excluded entries. The partial-day heap
+        only holds entries whose window starts or ends that day; those not covering
+        the slot's time are set aside and pushed back. Stale items are popped once
+        each, amortised O(log n).
+        """
+        with self._lock:
+            heaps = self._days.get(slot.date())
+            if heaps is None:
+                return None
+            whole, partial = heaps
+            candidates = [(item, heap) for item, heap in (
+                (self._best(whole, slot, exclude), whole),
+                (self._best(partial, slot, exclude), partial)
+            ) if item is not None]
+            if not candidates:
+                return None
+            candidates.sort(key=lambda candidate: candidate[0])
+            found = candidates[0][0]
+            for item, heap in candidates[1:]:
+                heapq.heappush(heap, item)
+            del self._live[found[2]]
+        return found
+    
+    def __len__(self):
+        return len(self._live)
+
+_waitlists = {}
+_registry_lock = threading.Lock()
+
+def get_waitlist(doctor_id):
+    """Return the doctor's heap, loading it from the table on first use or when stale"""
+    with _registry_lock:
+        waitlist = _waitlists.get(doctor_id)
+        if waitlist is None:
+            waitlist = _waitlists[doctor_id] = DoctorWaitlist(doctor_id)
+    if waitlist.is_stale():
+        waitlist.load()
+        expire_offers(waitlist)
+    return waitlist
+
+def _offer_cutoff():
+    """offered_at (UTC) before which an unanswered offer has expired"""
+    return datetime.utcnow() - timedelta(seconds=current_app.config['WAITLIST_OFFER_SECONDS'])
+
+def expire_offers(waitlist):
+    """Put the doctor's expired or past offers back to waiting and pass open slots on. Commits."""
+    try:
+        now = datetime.now()
+        expired = WaitlistEntry.query.filter(
+            WaitlistEntry.doctor_id == waitlist.doctor_id,
+            WaitlistEntry.status == 'offered',
+            db.or_(WaitlistEntry.offered_slot <= now, WaitlistEntry.offered_at <= _offer_cutoff())
+        ).all()
+        
+        released = []
+        for entry in expired:
+            # Conditional so an offer answered meanwhile, or expired by another worker, is left alone
+            reverted = WaitlistEntry.query.filter_by(
+                id=entry.id, status='offered', offered_slot=entry.offered_slot
+            ).update({
+                WaitlistEntry.status: 'waiting',
+                WaitlistEntry.offered_slot: None,
+                WaitlistEntry.offered_at: None
+            }, synchronize_session=False)
+            if reverted:
+                _clear_offer_notification(entry)
+                released.append((entry, entry.offered_slot))
+        db.session.commit()
+        
+        for entry, slot in released:
+            waitlist.push(entry)
+        for entry, slot in released:
+            offer_slot(waitlist.doctor_id, slot, exclude={entry.id})
+        return len(released)
+    
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Waitlist offer expiry error for doctor {waitlist.doctor_id}: {str(e)}")
+        return 0
+
+def offer_slot(doctor_id, slot, exclude=()):
+    """Offer a freed slot to the best eligible waiting patient. Commits; returns the entry or None."""
+    if doctor_id is None or slot is None or slot <= datetime.now():
+        return None
+    
+    waitlist = None
+    popped = None
+    try:
+        waitlist = get_waitlist(doctor_id)
+        while True:
+            popped = waitlist.pop_eligible(slot, exclude)
+            if popped is None:
+                return None
+            entry_id = popped[2]
+            
+            # Conditional claim so two workers never offer the same entry
+            claimed = WaitlistEntry.query.filter_by(id=entry_id, status='waiting').update({
+                WaitlistEntry.status: 'offered',
+                WaitlistEntry.offered_slot: slot,
+                WaitlistEntry.offered_at: datetime.utcnow()
+            }, synchronize_session=False)
+            if claimed:
+                break
+            popped = None  # no longer waiting, so it stays out of the heap
+        
+        entry = WaitlistEntry.query.get(entry_id)
+        patient = Patient.query.get(entry.patient_id)
+        doctor = User.query.get(doctor_id)
+        
+        db.session.add(Notification(
+            user_id=patient.user_id,
+            patient_id=patient.id,
+            type='waitlist_offer',
+            message=f'{doctor_display_name(doctor)} has an opening on {slot.strftime("%Y-%m-%d %H:%M")} for {patient.first_name} {patient.last_name}'[:255],
+            priority='high',
+            event_date=slot,
+            due_at=datetime.now(),
+            expires_at=min(slot, datetime.now() + timedelta(seconds=current_app.config['WAITLIST_OFFER_SECONDS']))
+        ))
+        db.session.commit()
+        
+        events.emit('waitlist_offer', entry_id=entry.id, doctor_id=doctor_id, patient_id=patient.id,
+                    user_id=patient.user_id, slot=slot.isoformat())
+        return entry
+    
+    except Exception as e:
+        db.session.rollback()
+        # The claim was rolled back, so the entry is still waiting
+        if popped is not None:
+            waitlist.restore(popped)
+        current_app.logger.error(f"Waitlist offer error for doctor {doctor_id}: {str(e)}")
+        return None
+
+def _clear_offer_notification(entry):
+    """Remove the offer notification once the offer is answered"""
+    Notification.query.filter(
+        Notification.patient_id == entry.patient_id,
+        Notification.type == 'waitlist_offer',
+        Notification.event_date == entry.offered_slot
+    ).delete(synchronize_session=False)
+
+def _parse_window_bound(value, end=False):
+    """Parse YYYY-MM-DD (whole day) or an ISO datetime (converted to naive local time)"""
+    if not isinstance(value, str):
+        raise ValueError(f'Invalid window bound: {value!r}')
+    if len(value) == 10:
+        day = datetime.strptime(value, '%Y-%m-%d').date()
+        return datetime.combine(day, dt_time.max if end else dt_time.min)
+    bound = datetime.fromisoformat(value)
+    if bound.tzinfo is not None:
+        bound = bound.astimezone().replace(tzinfo=None)
+    return bound
+
+def _can_manage(current_user, patient):
+    """Doctors and admins manage any entry; users only their own patients' entries"""
+    return current_user.role in ['admin', 'doctor'] or patient.user_id == current_user.id
+
+@waitlist_bp.route('/waitlist', methods=['POST'])
+@jwt_required()
+def join_waitlist():
+    """Queue a patient for an earlier slot with a doctor"""
+    try:
+        current_user_id = get_jwt_identity()
+        current_user = User.query.get(current_user_id)
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+        
+        for field in ['patient_id', 'doctor_id', 'window_start', 'window_end']:
+            if not data.get(field):
+                return jsonify({'error': f'{field.replace("_", " ").title()} is required'}), 400
+        
+        patient = Patient.query.get(data['patient_id'])
+        if not patient or not patient.is_active:
+            return jsonify({'error': 'Patient not found'}), 404
+        if not _can_manage(current_user, patient):
+            return jsonify({'error': 'Access denied'}), 403
+        
+        doctor = User.query.get(data['doctor_id'])
+        if not doctor or doctor.role not in ['doctor', 'admin']:
+            return jsonify({'error': 'Doctor not found'}), 404
+        
+        try:
+            window_start = _parse_window_bound(data['window_start'])
+            window_end = _parse_window_bound(data['window_end'], end=True)
+        except ValueError:
+            return jsonify({'error': 'Invalid window format. Use YYYY-MM-DD or an ISO datetime'}), 400
+        if window_end < window_start:
+            return jsonify({'error': 'Window end must be after window start'}), 400
+        
+        try:
+            priority = int(data.get('priority') or 0)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Priority must be an integer'}), 400
+        
+        entry = WaitlistEntry(
+            doctor_id=doctor.id,
+            patient_id=patient.id,
+            window_start=window_start,
+            window_end=window_end,
+            priority=priority
+        )
+        db.session.add(entry)
+        db.session.commit()
+        
+        get_waitlist(doctor.id).push(entry)
+        
+        return jsonify({
+            'message': 'Added to waitlist',
+            'entry': entry.to_dict()
+        }), 201
+    
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Join waitlist error: {str(e)}")
+        return jsonify({'error': 'Failed to join waitlist'}), 500
+
+@waitlist_bp.route('/waitlist', methods=['GET'])
+@jwt_required()
+def get_waitlist_entries():
+    """List a doctor's waiting and offered entries in serving order (admin/doctor only)"""
+    try:
+        current_user_id = get_jwt_identity()
+        current_user = User.query.get(current_user_id)
+        
+        if not current_user or current_user.role not in ['admin', 'doctor']:
+            return jsonify({'error': 'Access denied'}), 403
+        
+        doctor_id = request.args.get('doctor_id', current_user_id, type=int)
+        entries = WaitlistEntry.query.filter(
+            WaitlistEntry.doctor_id == doctor_id,
+            WaitlistEntry.status.in_(['waiting', 'offered'])
+        ).order_by(WaitlistEntry.priority.desc(), WaitlistEntry.created_at, WaitlistEntry.id).all()
+        
+        return jsonify({
+            'doctor_id': doctor_id,
+            'entries': [entry.to_dict() for entry in entries]
+        }), 200
+    
+    except Exception as e:
+        current_app.logger.error(f"Get waitlist error: {str(e)}")
+        return jsonify({'error': 'Failed to retrieve waitlist'}), 500
+
+@waitlist_bp.route('/waitlist/<int:entry_id>', methods=['DELETE'])
+@jwt_required()
+def leave_waitlist(entry_id):
+    """Remove a patient from the waitlist"""
+    try:
+        current_user_id = get_jwt_identity()
+        current_user = User.query.get(current_user_id)
+        
+        entry = WaitlistEntry.query.get(entry_id)
+        if not entry or entry.status not in ['waiting', 'offered']:
+            return jsonify({'error': 'Waitlist entry not found'}), 404
+        if not _can_manage(current_user, Patient.query.get(entry.patient_id)):
+            return jsonify({'error': 'Access denied'}), 403
+        
+        was_offered = entry.status == 'offered'
+        offered_slot = entry.offered_slot
+        if was_offered:
+            _clear_offer_notification(entry)
+        entry.status = 'cancelled'
+        db.session.commit()
+        
+        get_waitlist(entry.doctor_id).discard(entry.id)
+        if was_offered:
+            offer_slot(entry.doctor_id, offered_slot, exclude={entry.id})
+        
+        return jsonify({'message': 'Removed from waitlist'}), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Leave waitlist error: {str(e)}")
+        return jsonify({'error': 'Failed to leave waitlist'}), 500
+
+@waitlist_bp.route('/waitlist/<int:entry_id>/accept', methods=['POST'])
+@jwt_required()
+def accept_waitlist_offer(entry_id):
+    """Book the slot offered to a waitlist entry"""
+    try:
+        current_user_id = get_jwt_identity()
+        current_user = User.query.get(current_user_id)
+        
+        entry = WaitlistEntry.query.get(entry_id)
+        if not entry or entry.status != 'offered':
+            return jsonify({'error': 'No open offer for this entry'}), 404
+        if not _can_manage(current_user, Patient.query.get(entry.patient_id)):
+            return jsonify({'error': 'Access denied'}), 403
+        
+        slot_taken = db.session.query(Appointment.id).filter(
+            Appointment.doctor_id == entry.doctor_id,
+            Appointment.appointment_date == entry.offered_slot,
+            Appointment.status != 'cancelled'
+        ).first()
+        if slot_taken or entry.offered_slot <= datetime.now() or entry.offered_at <= _offer_cutoff():
+            slot = entry.offered_slot
+            _clear_offer_notification(entry)
+            entry.status = 'waiting'
+            entry.offered_slot = None
+            entry.offered_at = None
+            db.session.commit()
+            get_waitlist(entry.doctor_id).push(entry)
+            # An offer that simply expired leaves the slot open for the next entry
+            if not slot_taken:
+                offer_slot(entry.doctor_id, slot, exclude={entry.id})
+            return jsonify({'error': 'The offered slot is no longer available'}), 409
+        
+        doctor = User.query.get(entry.doctor_id)
+        appointment = Appointment(
+            patient_id=entry.patient_id,
+            doctor_id=doctor.id,
+            doctor_name=doctor_display_name(doctor),
+            appointment_date=entry.offered_slot,
+            appointment_type='Consultation',
+            status='scheduled'
+        )
+        db.session.add(appointment)
+        db.session.flush()
+        
+        _clear_offer_notification(entry)
+        entry.status = 'booked'
+        entry.appointment_id = appointment.id
+        patient = Patient.query.get(entry.patient_id)
+        reminders.sync_appointment(appointment)
+        counters.record_appointment_changes([(None, counters.appointment_state(appointment, patient))])
+        db.session.commit()
+        
+        events.emit('appointments_changed', action='create', patient_id=patient.id,
+                    user_id=patient.user_id, appointment_ids=[appointment.id])
+        
+        return jsonify({
+            'message': 'Appointment booked from waitlist',
+            'appointment': appointment.to_dict()
+        }), 201
+    
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Accept waitlist offer error: {str(e)}")
+        return jsonify({'error': 'Failed to accept offer'}), 500
+
+@waitlist_bp.route('/waitlist/<int:entry_id>/decline', methods=['POST'])
+@jwt_required()
+def decline_waitlist_offer(entry_id):
+    """Decline an offer, keep waiting, and pass the slot to the next candidate"""
+    try:
+        current_user_id = get_jwt_identity()
+        current_user = User.query.get(current_user_id)
+        
+        entry = WaitlistEntry.query.get(entry_id)
+        if not entry or entry.status != 'offered':
+            return jsonify({'error': 'No open offer for this entry'}), 404
+        if not _can_manage(current_user, Patient.query.get(entry.patient_id)):
+            return jsonify({'error': 'Access denied'}), 403
+        
+        slot = entry.offered_slot
+        _clear_offer_notification(entry)
+        entry.status = 'waiting'
+        entry.offered_slot = None
+        entry.offered_at = None
+        db.session.commit()
+        
+        get_waitlist(entry.doctor_id).push(entry)
+        next_entry = offer_slot(entry.doctor_id, slot, exclude={entry.id})
+        
+        return jsonify({
+            'message': 'Offer declined',
+            'offered_to': next_entry.id if next_entry else None
+        }), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Decline waitlist offer error: {str(e)}")
+        return jsonify({'error': 'Failed to decline offer'}), 500
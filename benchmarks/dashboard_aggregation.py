@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Dashboard aggregation benchmark for Medora.
+
+Compares the ways the /api/dashboard statistics block can be computed, on a
+throwaway SQLite database, at several patient-per-user sizes:
+
+  separate   - one grouped query per statistic (the original shape)
+  aggregate  - the single-statement conditional aggregation path
+  counters   - the stat_counters primary-key range read
+
+It also checks that the aggregate path issues exactly one SQL statement.
+
+Usage: python benchmarks/dashboard_aggregation.py [--sizes 100,1000,10000] [--repeat 20]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, date, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+def separate_queries(db, user_id):
+    """One grouped query per statistic, like the original get_dashboard"""
+    from sqlalchemy import func
+    from app.models import Patient, Appointment
+    
+    base = [Patient.user_id == user_id, Patient.is_active == True]
+    db.session.query(func.count(Patient.id)).filter(*base).scalar()
+    db.session.query(func.count(Appointment.id)).join(Patient).filter(*base).scalar()
+    db.session.query(Patient.gender, func.count(Patient.id)).filter(*base).group_by(Patient.gender).all()
+    db.session.query(Patient.date_of_birth, func.count(Patient.id)).filter(*base).group_by(Patient.date_of_birth).all()
+    db.session.query(Patient.blood_type, func.count(Patient.id)).filter(*base).group_by(Patient.blood_type).all()
+    db.session.query(Appointment.status, func.count(Appointment.id)).join(Patient).filter(*base).group_by(Appointment.status).all()
+    db.session.query(func.strftime('%Y-%m', Patient.created_at), func.count(Patient.id)).filter(
+        *base, Patient.created_at >= datetime.now() - timedelta(days=180)
+    ).group_by(func.strftime('%Y-%m', Patient.created_at)).all()
+
+def seed(db, patients_per_user):
+    """Create one user with the requested number of patients and ~2 appointments each"""
+    from app.models import User, Patient, Appointment
+    from app.counters import rebuild_counters
+    
+    db.drop_all()
+    db.create_all()
+    rng = random.Random(42)
+    now = datetime.now()
+    
+    db.session.execute(User.__table__.insert(), [{
+        'username': 'bench', 'email': 'bench@medora.local', 'password_hash': 'x',
+        'first_name': 'Bench', 'last_name': 'User', 'role': 'doctor', 'is_active': True,
+        'created_at': now, 'updated_at': now
+    }])
+    db.session.execute(Patient.__table__.insert(), [{
+        'patient_id': f'BENCH{i:08d}', 'user_id': 1, 'first_name': f'First{i}', 'last_name': f'Last{i}',
+        'date_of_birth': date(1930, 1, 1) + timedelta(days=rng.randrange(32000)),
+        'gender': rng.choice(['Male', 'Female', 'Other']),
+        'blood_type': rng.choice(['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-', None]),
+        'is_active': rng.random() > 0.05,
+        'created_at': now - timedelta(days=rng.randrange(400)), 'updated_at': now
+    } for i in range(patients_per_user)])
+    db.session.execute(Appointment.__table__.insert(), [{
+        'patient_id': rng.randrange(patients_per_user) + 1, 'doctor_id': 1, 'doctor_name': 'Dr. Bench User',
+        'appointment_date': now + timedelta(hours=rng.randrange(-2000, 2000)),
+        'status': rng.choice(['scheduled', 'completed', 'cancelled']),
+        'created_at': now, 'updated_at': now
+    } for i in range(patients_per_user * 2)])
+    rebuild_counters()
+    db.session.commit()
+
+def time_path(fn, repeat):
+    """Return (median ms, p95 ms) of calling fn repeatedly"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark dashboard statistics paths')
+    parser.add_argument('--sizes', default='100,1000,10000', help='Comma-separated patients per user')
+    parser.add_argument('--repeat', type=int, default=20, help='Timed runs per path and size')
+    args = parser.parse_args()
+    
+    workdir = tempfile.mkdtemp(prefix='medora-bench-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    
+    from flask import g
+    from app import create_app, db
+    from app.dashboard import aggregate_dashboard_statistics, compute_dashboard_statistics
+    from app.query_monitor import QueryStats
+    
+    app = create_app()
+    with app.app_context():
+        print(f"{'patients':>10} {'path':>10} {'median ms':>10} {'p95 ms':>10} {'statements':>11}")
+        for size in [int(value) for value in args.sizes.split(',')]:
+            seed(db, size)
+            
+            paths = [
+                ('separate', lambda: separate_queries(db, 1)),
+                ('aggregate', lambda: aggregate_dashboard_statistics(1)),
+                ('counters', lambda: compute_dashboard_statistics(1)),
+            ]
+            for name, fn in paths:
+                with app.test_request_context():
+                    g.query_stats = QueryStats()
+                    fn()
+                    statements = g.query_stats.count
+                if name == 'aggregate':
+                    assert statements == 1, f"aggregate path ran {statements} statements, expected 1"
+                median, p95 = time_path(fn, args.repeat)
+                print(f"{size:>10} {name:>10} {median:>10.2f} {p95:>10.2f} {statements:>11}")
+            
+            assert aggregate_dashboard_statistics(1) == compute_dashboard_statistics(1), \
+                "aggregate and counters paths disagree"
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+JSON serialization benchmark for Medora.
+
+Encodes pages of patients (Patient.to_dict, as GET /api/patients returns them) on a
+throwaway SQLite database and compares:
+
+  stdlib    - Flask's default provider (json module, sorted keys)
+  fast      - FastJSONProvider (orjson when installed)
+  fast-raw  - FastJSONProvider on rows holding date/datetime objects, so no
+              .isoformat() calls happen in Python
+
+It checks that both providers produce the same document for the to_dict page.
+
+Usage: python benchmarks/json_serialization.py [--page-size 1000] [--repeat 50]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dashboard_aggregation import seed, time_path
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark JSON response encoding')
+    parser.add_argument('--page-size', type=int, default=1000, help='Patients per encoded page')
+    parser.add_argument('--repeat', type=int, default=50, help='Timed runs per provider')
+    args = parser.parse_args()
+    
+    workdir = tempfile.mkdtemp(prefix='medora-bench-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    
+    from flask.json.provider import DefaultJSONProvider
+    from app import create_app, db
+    from app.json_provider import FastJSONProvider
+    from app.models import Patient
+    
+    app = create_app()
+    with app.app_context():
+        seed(db, args.page_size)
+        patients = Patient.query.order_by(Patient.id).limit(args.page_size).all()
+        page = {
+            'patients': [patient.to_dict() for patient in patients],
+            'pagination': {'page': 1, 'per_page': args.page_size, 'total': len(patients)}
+        }
+        columns = Patient.__table__.columns.keys()
+        raw_page = {
+            'patients': [{name: getattr(patient, name) for name in columns} for patient in patients],
+            'pagination': page['pagination']
+        }
+        
+        stdlib = DefaultJSONProvider(app)
+        fast = FastJSONProvider(app)
+        assert json.loads(stdlib.response(page).get_data()) == json.loads(fast.response(page).get_data()), \
+            "providers encode the page differently"
+        
+        print(f"fast provider backend: {fast.backend}")
+        print(f"{'provider':>10} {'median ms':>10} {'p95 ms':>10} {'bytes':>10}")
+        for name, provider, payload in [
+            ('stdlib', stdlib, page),
+            ('fast', fast, page),
+            ('fast-raw', fast, raw_page),
+        ]:
+            with app.test_request_context():
+                size = len(provider.response(payload).get_data())
+                median, p95 = time_path(lambda: provider.response(payload), args.repeat)
+            print(f"{name:>10} {median:>10.2f} {p95:>10.2f} {size:>10}")
+
+if __name__ == '__main__':
+    main()
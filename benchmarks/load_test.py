@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Load benchmark for Medora.
+
+Seeds a database at a configurable scale (doctors, patients per doctor,
+appointments per patient), then drives the real blueprints through the WSGI app
+with concurrent clients, one scenario at a time:
+
+  login                 - POST /api/login (bcrypt check + token issue)
+  patients_list         - GET /api/patients, random page
+  patients_search       - GET /api/patients/search?q=...
+  patient_detail        - GET /api/patients/<id>
+  dashboard             - GET /api/dashboard
+  quick_stats           - GET /api/dashboard/quick-stats
+  notifications         - GET /api/dashboard/notifications
+  appointments_search   - GET /api/appointments/search by name, status and date range
+
+and reports p50/p95/p99 latency and throughput per scenario. Results are written
+as JSON; pass an earlier results file with --compare to print the change.
+
+The default database is a throwaway SQLite file. --database-url points it at
+another database (e.g. mysql+pymysql://...); its tables are DROPPED and reseeded
+unless --no-seed is given.
+
+Usage: python benchmarks/load_test.py [--users 10] [--patients-per-user 500]
+           [--appointments-per-patient 4] [--clients 8] [--requests 400]
+           [--output results.json] [--compare previous.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+PASSWORD = 'bench-password'
+STATUSES = ['scheduled', 'completed', 'cancelled']
+# Every INACTIVE_EVERY-th patient is soft-deleted (and never requested by patient_detail)
+INACTIVE_EVERY = 20
+
+def seed(db, users, patients_per_user, appointments_per_patient, rng):
+    """Create `users` doctors, each with their own patients and appointments"""
+    import bcrypt
+    from app.models import User, Patient, Appointment
+    from app.counters import rebuild_counters
+    from app.reminders import rebuild_reminders
+    from app.rollups import run_rollups
+    
+    db.drop_all()
+    db.create_all()
+    now = datetime.now()
+    # One real bcrypt hash shared by every user, so logins cost what they do in production
+    password_hash = bcrypt.hashpw(PASSWORD.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    
+    db.session.execute(User.__table__.insert(), [{
+        'username': f'doctor{u}', 'email': f'doctor{u}@medora.local', 'password_hash': password_hash,
+        'first_name': 'Doctor', 'last_name': f'Number{u}', 'role': 'doctor', 'is_active': True,
+        'created_at': now, 'updated_at': now
+    } for u in range(1, users + 1)])
+    
+    patients = []
+    for u in range(1, users + 1):
+        for i in range(patients_per_user):
+            complete = rng.random() > 0.1
+            patients.append({
+                'patient_id': f'LOAD{u:04d}{i:07d}', 'user_id': u,
+                'first_name': f'First{i}', 'last_name': f'Last{i}',
+                'date_of_birth': date(1930, 1, 1) + timedelta(days=rng.randrange(32000)),
+                'gender': rng.choice(['Male', 'Female', 'Other']),
+                'phone': f'555{rng.randrange(10 ** 7):07d}', 'email': f'patient{u}.{i}@example.com',
+                'blood_type': rng.choice(['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-', None]),
+                'allergies': 'None' if complete else None,
+                'emergency_contact_name': f'Contact{i}' if complete else None,
+                'emergency_contact_phone': f'555{rng.randrange(10 ** 7):07d}' if complete else None,
+                'is_active': i % INACTIVE_EVERY != INACTIVE_EVERY - 1,
+                'created_at': now - timedelta(days=rng.randrange(400)), 'updated_at': now
+            })
+    db.session.execute(Patient.__table__.insert(), patients)
+    
+    appointments = []
+    for patient_id in range(1, len(patients) + 1):
+        doctor_id = (patient_id - 1) // patients_per_user + 1
+        for _ in range(appointments_per_patient):
+            appointment_date = now + timedelta(hours=rng.randrange(-2000, 2000))
+            appointments.append({
+                'patient_id': patient_id, 'doctor_id': doctor_id, 'doctor_name': f'Dr. Doctor Number{doctor_id}',
+                'appointment_date': appointment_date, 'appointment_type': 'consultation',
+                'status': 'scheduled' if appointment_date > now else rng.choice(STATUSES[1:]),
+                'created_at': now, 'updated_at': now
+            })
+    db.session.execute(Appointment.__table__.insert(), appointments)
+    
+    # The read paths rely on the maintained counters, reminders and rollups
+    rebuild_counters()
+    rebuild_reminders()
+    db.session.commit()
+    run_rollups(full=True)
+
+def scenarios(args):
+    """name -> (method, function(rng, user) returning (path, json body))"""
+    per_user = args.patients_per_user
+    
+    def patient_id(rng, user):
+        index = rng.randrange(per_user)
+        if index % INACTIVE_EVERY == INACTIVE_EVERY - 1:
+            index -= 1
+        return (user - 1) * per_user + index + 1
+    
+    def appointment_search(rng, user):
+        day = date.today() + timedelta(days=rng.randrange(-60, 60))
+        return (f'/api/appointments/search?patient_name=First{rng.randrange(per_user)}'
+                f'&status={rng.choice(STATUSES)}&date_from={day}&date_to={day + timedelta(days=30)}'), None
+    
+    return {
+        'login': ('POST', lambda rng, user: ('/api/login', {'username': f'doctor{user}', 'password': PASSWORD})),
+        'patients_list': ('GET', lambda rng, user: (
+            f'/api/patients?page={rng.randrange(max(per_user // 20, 1)) + 1}&per_page=20', None)),
+        'patients_search': ('GET', lambda rng, user: (f'/api/patients/search?q=Last{rng.randrange(per_user)}', None)),
+        'patient_detail': ('GET', lambda rng, user: (f'/api/patients/{patient_id(rng, user)}', None)),
+        'dashboard': ('GET', lambda rng, user: ('/api/dashboard', None)),
+        'quick_stats': ('GET', lambda rng, user: ('/api/dashboard/quick-stats', None)),
+        'notifications': ('GET', lambda rng, user: ('/api/dashboard/notifications', None)),
+        'appointments_search': ('GET', appointment_search),
+    }
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of sorted samples"""
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+def run_scenario(app, tokens, method, build, requests, warmup, clients, rng_seed):
+    """Spread `requests` calls over `clients` threads; return the scenario summary"""
+    lock = threading.Lock()
+    latencies = []
+    errors = {}
+    
+    def drive(total, record):
+        remaining = [total]
+        
+        def client(index):
+            rng = random.Random(rng_seed + index)
+            user = index % len(tokens) + 1
+            headers = {'Authorization': f'Bearer {tokens[user - 1]}'}
+            test_client = app.test_client()
+            while True:
+                with lock:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+                path, body = build(rng, user)
+                started = time.perf_counter()
+                response = test_client.open(path, method=method, headers=headers, json=body)
+                response.get_data()
+                elapsed = time.perf_counter() - started
+                if record:
+                    with lock:
+                        latencies.append(elapsed)
+                        if response.status_code >= 400:
+                            errors[response.status_code] = errors.get(response.status_code, 0) + 1
+        
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            list(pool.map(client, range(clients)))
+    
+    drive(warmup, record=False)
+    started = time.perf_counter()
+    drive(requests, record=True)
+    wall = time.perf_counter() - started
+    
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': {str(status): count for status, count in sorted(errors.items())},
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+        'max_ms': round(latencies[-1] * 1000, 3),
+        'throughput_rps': round(len(latencies) / wall, 1)
+    }
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_results(results, baseline=None):
+    print(f"{'scenario':>20} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8} {'errors':>7}"
+          + (f" {'p95 Δ':>8} {'req/s Δ':>8}" if baseline else ''))
+    for name, result in results['scenarios'].items():
+        line = (f"{name:>20} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+                f"{result['throughput_rps']:>8.1f} {sum(result['errors'].values()):>7}")
+        before = (baseline or {}).get('scenarios', {}).get(name)
+        if before:
+            line += (f" {(result['p95_ms'] / before['p95_ms'] - 1) * 100:>+7.1f}%"
+                     f" {(result['throughput_rps'] / before['throughput_rps'] - 1) * 100:>+7.1f}%")
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the Medora API against a seeded database')
+    parser.add_argument('--users', type=int, default=10, help='Doctors to seed (one client logs in as each, round robin)')
+    parser.add_argument('--patients-per-user', type=int, default=500, help='Patients seeded per doctor')
+    parser.add_argument('--appointments-per-patient', type=int, default=4, help='Appointments seeded per patient')
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent clients per scenario')
+    parser.add_argument('--requests', type=int, default=400, help='Timed requests per scenario')
+    parser.add_argument('--warmup', type=int, default=20, help='Untimed requests per scenario before timing')
+    parser.add_argument('--scenarios', help='Comma-separated subset of scenarios to run (default: all)')
+    parser.add_argument('--database-url', help='Database to seed and test against (default: a temporary SQLite file)')
+    parser.add_argument('--no-seed', action='store_true', help='Reuse an already seeded --database-url')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for data and request parameters')
+    parser.add_argument('--output', help='Write results JSON here (default: load-<timestamp>.json in the temp dir)')
+    parser.add_argument('--compare', help='Earlier results JSON to compare against')
+    args = parser.parse_args()
+    
+    if args.no_seed and not args.database_url:
+        parser.error('--no-seed needs --database-url')
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='medora-bench-'), 'load.db')}"
+    os.environ['DATABASE_URL'] = database_url
+    
+    from app import create_app, db
+    
+    app = create_app()
+    available = scenarios(args)
+    selected = args.scenarios.split(',') if args.scenarios else list(available)
+    unknown = [name for name in selected if name not in available]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)} (choose from {', '.join(available)})")
+    
+    with app.app_context():
+        if not args.no_seed:
+            started = time.perf_counter()
+            seed(db, args.users, args.patients_per_user, args.appointments_per_patient, random.Random(args.seed))
+            print(f"Seeded {args.users} users, {args.users * args.patients_per_user} patients, "
+                  f"{args.users * args.patients_per_user * args.appointments_per_patient} appointments "
+                  f"in {time.perf_counter() - started:.1f}s")
+        dialect = db.engine.dialect.name
+    
+    test_client = app.test_client()
+    tokens = []
+    for user in range(1, args.users + 1):
+        response = test_client.post('/api/login', json={'username': f'doctor{user}', 'password': PASSWORD})
+        assert response.status_code == 200, f"login as doctor{user} failed: {response.status_code}"
+        tokens.append(response.get_json()['access_token'])
+    
+    results = {
+        'created_at': datetime.now().isoformat(),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'database': dialect,
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'scenarios': {}
+    }
+    for index, name in enumerate(selected):
+        method, build = available[name]
+        results['scenarios'][name] = run_scenario(
+            app, tokens, method, build, args.requests, args.warmup, args.clients, args.seed * 1000 + index * 100
+        )
+    
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    
+    output = args.output or os.path.join(tempfile.gettempdir(), f"load-{datetime.now().strftime('%Y%m%dT%H%M%S')}.json")
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+if __name__ == '__main__':
+    main()
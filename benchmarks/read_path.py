@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Read path benchmark for Medora.
+
+Fetches and serializes the patients list two ways on a throwaway SQLite database:
+
+  orm   - Patient.query ... .all() then to_dict() on each instance (the old path)
+  core  - Core select of the serializer's columns, plain Row tuples, serializer.rows()
+
+and reports CPU time and peak traced memory per row. Both paths must return the
+same dicts.
+
+Usage: python benchmarks/read_path.py [--sizes 1000,10000] [--repeat 20]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dashboard_aggregation import seed, time_path
+
+def peak_memory(fn):
+    """Peak bytes allocated while fn runs"""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark ORM vs Core read paths')
+    parser.add_argument('--sizes', default='1000,10000', help='Comma-separated patient counts')
+    parser.add_argument('--repeat', type=int, default=20, help='Timed runs per path and size')
+    args = parser.parse_args()
+    
+    workdir = tempfile.mkdtemp(prefix='medora-bench-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    
+    from app import create_app, db
+    from app.models import Patient, patient_serializer
+    from app.readpath import select_for, read_dicts
+    
+    app = create_app()
+    with app.app_context():
+        print(f"{'rows':>8} {'path':>6} {'median ms':>10} {'us/row':>8} {'peak KiB':>10} {'bytes/row':>10}")
+        for size in [int(value) for value in args.sizes.split(',')]:
+            seed(db, size)
+            
+            def orm():
+                patients = Patient.query.filter_by(user_id=1).order_by(Patient.id).all()
+                result = [patient.to_dict() for patient in patients]
+                # Drop the instances from the identity map like the end of a request would
+                db.session.remove()
+                return result
+            
+            def core():
+                return read_dicts(patient_serializer, select_for(patient_serializer).where(
+                    Patient.user_id == 1
+                ).order_by(Patient.id))
+            
+            assert orm() == core(), "ORM and Core paths return different dicts"
+            for name, fn in [('orm', orm), ('core', core)]:
+                median, _ = time_path(fn, args.repeat)
+                peak = peak_memory(fn)
+                print(f"{size:>8} {name:>6} {median:>10.2f} {median * 1000 / size:>8.2f} "
+                      f"{peak / 1024:>10.0f} {peak / size:>10.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Model serializer benchmark for Medora.
+
+Serializes pages of patients and appointments on a throwaway SQLite database and
+compares:
+
+  legacy    - the hand-written to_dict bodies the models used to have
+  to_dict   - Model.to_dict(), now backed by the compiled serializers
+  many      - serializer.many() on the same ORM instances
+  rows      - serializer.rows() on plain tuples from a Core select (no ORM objects)
+
+It checks that every path produces exactly the legacy dicts.
+
+Usage: python benchmarks/serializers.py [--size 1000] [--repeat 50]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dashboard_aggregation import seed, time_path
+
+def legacy_patient_dict(self):
+    """Patient.to_dict as it was written before the serializer layer"""
+    return {
+        'id': self.id,
+        'patient_id': self.patient_id,
+        'user_id': self.user_id,
+        'first_name': self.first_name,
+        'last_name': self.last_name,
+        'full_name': self.full_name,
+        'date_of_birth': self.date_of_birth.isoformat() if self.date_of_birth else None,
+        'age': self.age,
+        'gender': self.gender,
+        'phone': self.phone,
+        'email': self.email,
+        'address': self.address,
+        'medical_history': self.medical_history,
+        'current_medications': self.current_medications,
+        'allergies': self.allergies,
+        'blood_type': self.blood_type,
+        'height': self.height,
+        'weight': self.weight,
+        'bmi': self.bmi,
+        'bmi_category': self.bmi_category,
+        'emergency_contact_name': self.emergency_contact_name,
+        'emergency_contact_phone': self.emergency_contact_phone,
+        'emergency_contact_relationship': self.emergency_contact_relationship,
+        'insurance_provider': self.insurance_provider,
+        'insurance_number': self.insurance_number,
+        'is_active': self.is_active,
+        'created_at': self.created_at.isoformat() if self.created_at else None,
+        'updated_at': self.updated_at.isoformat() if self.updated_at else None
+    }
+
+def legacy_appointment_dict(self):
+    """Appointment.to_dict as it was written before the serializer layer"""
+    return {
+        'id': self.id,
+        'patient_id': self.patient_id,
+        'doctor_id': self.doctor_id,
+        'doctor_name': self.doctor_name,
+        'appointment_date': self.appointment_date.isoformat() if self.appointment_date else None,
+        'appointment_type': self.appointment_type,
+        'symptoms': self.symptoms,
+        'diagnosis': self.diagnosis,
+        'prescription': self.prescription,
+        'notes': self.notes,
+        'status': self.status,
+        'created_at': self.created_at.isoformat() if self.created_at else None,
+        'updated_at': self.updated_at.isoformat() if self.updated_at else None
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark model serializers')
+    parser.add_argument('--size', type=int, default=1000, help='Patients in the page (appointments are twice as many)')
+    parser.add_argument('--repeat', type=int, default=50, help='Timed runs per path')
+    args = parser.parse_args()
+    
+    workdir = tempfile.mkdtemp(prefix='medora-bench-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    
+    from sqlalchemy import select
+    from app import create_app, db
+    from app.models import Patient, Appointment, patient_serializer, appointment_serializer
+    
+    app = create_app()
+    with app.app_context():
+        seed(db, args.size)
+        # Give some patients a BMI so the derived fields do real work
+        db.session.execute(Patient.__table__.update().where(Patient.id % 2 == 0).values(height=172.0, weight=70.5))
+        db.session.commit()
+        
+        print(f"{'model':>12} {'path':>10} {'median ms':>10} {'p95 ms':>10}")
+        for name, model, serializer, legacy in [
+            ('patient', Patient, patient_serializer, legacy_patient_dict),
+            ('appointment', Appointment, appointment_serializer, legacy_appointment_dict),
+        ]:
+            instances = model.query.order_by(model.id).all()
+            columns = [column.key for column in model.__table__.columns]
+            rows = [tuple(row) for row in db.session.execute(
+                select(*model.__table__.columns).order_by(model.id)
+            )]
+            expected = [legacy(instance) for instance in instances]
+            
+            paths = [
+                ('legacy', lambda: [legacy(instance) for instance in instances]),
+                ('to_dict', lambda: [instance.to_dict() for instance in instances]),
+                ('many', lambda: serializer.many(instances)),
+                ('rows', lambda: serializer.rows(rows, columns)),
+            ]
+            for path, fn in paths:
+                assert fn() == expected, f"{name} {path} output differs from the legacy to_dict"
+                median, p95 = time_path(fn, args.repeat)
+                print(f"{name:>12} {path:>10} {median:>10.2f} {p95:>10.2f}")
+
+if __name__ == '__main__':
+    main()
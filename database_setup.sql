@@ -65,6 +65,7 @@ CREATE TABLE IF NOT EXISTS patients (
 CREATE TABLE IF NOT EXISTS appointments (
     id INT AUTO_INCREMENT PRIMARY KEY,
     patient_id INT NOT NULL,
+    doctor_id INT,
     doctor_name VARCHAR(100) NOT NULL,
     appointment_date DATETIME NOT NULL,
     appointment_type VARCHAR(50),
@@ -77,12 +78,58 @@ CREATE TABLE IF NOT EXISTS appointments (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     
     FOREIGN KEY (patient_id) REFERENCES patients(id) ON DELETE CASCADE,
+    FOREIGN KEY (doctor_id) REFERENCES users(id),
     INDEX idx_patient_id (patient_id),
+    INDEX idx_appointments_doctor_date (doctor_id, appointment_date),
     INDEX idx_appointment_date (appointment_date),
     INDEX idx_doctor_name (doctor_name),
     INDEX idx_status (status)
 );
 
+-- Create notifications table (precomputed reminders and missing-info notices)
+CREATE TABLE IF NOT EXISTS notifications (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    patient_id INT,
+    appointment_id INT,
+    type VARCHAR(30) NOT NULL,
+    message VARCHAR(255) NOT NULL,
+    priority VARCHAR(10) DEFAULT 'medium',
+    event_date DATETIME,
+    due_at DATETIME NOT NULL,
+    expires_at DATETIME,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (patient_id) REFERENCES patients(id) ON DELETE CASCADE,
+    FOREIGN KEY (appointment_id) REFERENCES appointments(id) ON DELETE CASCADE,
+    INDEX idx_notifications_user_due (user_id, due_at),
+    INDEX idx_notifications_appointment (appointment_id),
+    INDEX idx_notifications_patient (patient_id)
+);
+
+-- Create waitlist table (patients waiting for an earlier slot with a doctor)
+CREATE TABLE IF NOT EXISTS waitlist_entries (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    doctor_id INT NOT NULL,
+    patient_id INT NOT NULL,
+    window_start DATETIME NOT NULL,
+    window_end DATETIME NOT NULL,
+    priority INT DEFAULT 0,
+    status VARCHAR(20) DEFAULT 'waiting',
+    offered_slot DATETIME,
+    offered_at DATETIME,
+    appointment_id INT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    
+    FOREIGN KEY (doctor_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (patient_id) REFERENCES patients(id) ON DELETE CASCADE,
+    FOREIGN KEY (appointment_id) REFERENCES appointments(id) ON DELETE SET NULL,
+    INDEX idx_waitlist_doctor_status (doctor_id, status),
+    INDEX idx_waitlist_patient (patient_id)
+);
+
 -- Insert default admin user (password: Admin123!)
 -- Note: In production, this should be changed immediately
 INSERT INTO users (username, email, password_hash, first_name, last_name, role) VALUES 
@@ -91,36 +138,90 @@ ON DUPLICATE KEY UPDATE updated_at = CURRENT_TIMESTAMP;
 
 -- Create indexes for better performance
 CREATE INDEX idx_patients_created_at ON patients(created_at);
+CREATE INDEX idx_patients_user_active_created ON patients(user_id, is_active, created_at);
 CREATE INDEX idx_appointments_patient_date ON appointments(patient_id, appointment_date);
 CREATE INDEX idx_users_created_at ON users(created_at);
 
--- Create view for patient statistics
-CREATE OR REPLACE VIEW patient_stats AS
-SELECT 
-    p.user_id,
-    COUNT(p.id) as total_patients,
-    COUNT(CASE WHEN p.created_at >= DATE_SUB(CURDATE(), INTERVAL 30 DAY) THEN 1 END) as new_patients_month,
-    COUNT(CASE WHEN p.gender = 'Male' THEN 1 END) as male_count,
-    COUNT(CASE WHEN p.gender = 'Female' THEN 1 END) as female_count,
-    COUNT(CASE WHEN p.gender = 'Other' THEN 1 END) as other_count
-FROM patients p
-WHERE p.is_active = TRUE
-GROUP BY p.user_id;
-
--- Create view for appointment statistics
-CREATE OR REPLACE VIEW appointment_stats AS
-SELECT 
-    p.user_id,
-    COUNT(a.id) as total_appointments,
-    COUNT(CASE WHEN a.status = 'scheduled' THEN 1 END) as scheduled_count,
-    COUNT(CASE WHEN a.status = 'completed' THEN 1 END) as completed_count,
-    COUNT(CASE WHEN a.status = 'cancelled' THEN 1 END) as cancelled_count,
-    COUNT(CASE WHEN DATE(a.appointment_date) = CURDATE() THEN 1 END) as today_count,
-    COUNT(CASE WHEN a.appointment_date BETWEEN CURDATE() AND DATE_ADD(CURDATE(), INTERVAL 7 DAY) THEN 1 END) as week_count
-FROM patients p
-LEFT JOIN appointments a ON p.id = a.patient_id
-WHERE p.is_active = TRUE
-GROUP BY p.user_id;
+-- Existing databases created before doctor_id was added:
+-- ALTER TABLE appointments ADD COLUMN doctor_id INT NULL AFTER patient_id,
+--     ADD CONSTRAINT fk_appointments_doctor FOREIGN KEY (doctor_id) REFERENCES users(id),
+--     ADD INDEX idx_appointments_doctor_date (doctor_id, appointment_date), ALGORITHM=INPLACE, LOCK=NONE;
+-- then populate it online with: flask backfill-doctor-ids
+-- (or run `flask db upgrade`, which adds the column and any missing index)
+
+-- Create statistics counters table (replaces the patient_stats and appointment_stats views).
+-- Maintained transactionally by the application on every patient/appointment write;
+-- rebuild from scratch with: flask reconcile-counters
+DROP VIEW IF EXISTS patient_stats;
+DROP VIEW IF EXISTS appointment_stats;
+
+CREATE TABLE IF NOT EXISTS stat_counters (
+    user_id INT NOT NULL,
+    dimension VARCHAR(30) NOT NULL,
+    bucket VARCHAR(30) NOT NULL,
+    count INT NOT NULL DEFAULT 0,
+    
+    PRIMARY KEY (user_id, dimension, bucket),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- Daily rollups for trend charts (maintained by `flask run-rollups`)
+CREATE TABLE IF NOT EXISTS daily_registrations (
+    user_id INT NOT NULL,
+    day DATE NOT NULL,
+    count INT NOT NULL DEFAULT 0,
+    
+    PRIMARY KEY (user_id, day),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    INDEX idx_daily_registrations_day (day)
+);
+
+CREATE TABLE IF NOT EXISTS daily_appointments (
+    user_id INT NOT NULL,
+    day DATE NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    count INT NOT NULL DEFAULT 0,
+    
+    PRIMARY KEY (user_id, day, status),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    INDEX idx_daily_appointments_day (day)
+);
+
+CREATE TABLE IF NOT EXISTS daily_doctor_appointments (
+    doctor_id INT NOT NULL,
+    day DATE NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    count INT NOT NULL DEFAULT 0,
+    
+    PRIMARY KEY (doctor_id, day, status),
+    FOREIGN KEY (doctor_id) REFERENCES users(id) ON DELETE CASCADE,
+    INDEX idx_daily_doctor_appointments_day (day)
+);
+
+CREATE TABLE IF NOT EXISTS rollup_watermarks (
+    name VARCHAR(50) PRIMARY KEY,
+    watermark DATETIME,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS rollup_dirty_days (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    day DATE NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Change events for the live update server (written by every process, relayed to
+-- open streams and pruned after LIVE_EVENT_RETENTION_SECONDS)
+CREATE TABLE IF NOT EXISTS live_events (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    event VARCHAR(30) NOT NULL,
+    user_ids TEXT NOT NULL,
+    private BOOLEAN DEFAULT FALSE,
+    data TEXT NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    
+    INDEX idx_live_events_created_at (created_at)
+);
 
 -- Grant permissions (adjust as needed for your MySQL setup)
 -- GRANT ALL PRIVILEGES ON medora_db.* TO 'your_username'@'localhost';
@@ -132,4 +233,10 @@ SHOW TABLES;
 -- Show table structure
 DESCRIBE users;
 DESCRIBE patients;
-DESCRIBE appointments; 
\ No newline at end of file
+DESCRIBE appointments;
+DESCRIBE notifications;
+DESCRIBE waitlist_entries;
+DESCRIBE stat_counters;
+DESCRIBE daily_registrations;
+DESCRIBE daily_appointments;
+DESCRIBE daily_doctor_appointments; 
\ No newline at end of file
@@ -0,0 +1,76 @@
+"""
+Gunicorn settings for Medora (also read by `flask serve`).
+
+Every value can be overridden from the environment. Live update streams are not
+served by these workers; run gunicorn.live.conf.py next to this server for them.
+"""
+
+import multiprocessing
+import os
+import tempfile
+
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+
+# Pre-forked workers, each serving requests on a small thread pool
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('WORKER_THREADS', 4))
+worker_class = 'gthread'
+
+# Load the app once in the master so workers fork with it already imported
+preload_app = True
+
+# Graceful recycling: a worker finishes in-flight requests and is replaced after
+# max_requests (jittered so workers don't all restart together). SIGHUP reloads all.
+max_requests = int(os.environ.get('MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('MAX_REQUESTS_JITTER', 100))
+graceful_timeout = int(os.environ.get('GRACEFUL_TIMEOUT', 30))
+timeout = int(os.environ.get('WORKER_TIMEOUT', 60))
+keepalive = 5
+
+accesslog = os.environ.get('ACCESS_LOG', '-')
+errorlog = '-'
+
+# Workers write their metric totals here so any of them can serve the merged /metrics
+if not os.environ.get('METRICS_DIR'):
+    os.environ['METRICS_DIR'] = tempfile.mkdtemp(prefix='medora-metrics-')
+
+def on_starting(server):
+    """Apply migrations and create the admin user once, in the master, before any worker starts"""
+    from app.telemetry import reset_directory
+    
+    reset_directory(os.environ['METRICS_DIR'])
+    if os.environ.get('BOOTSTRAP_ON_START', '1') != '1':
+        return
+    from app import db
+    from app.bootstrap import bootstrap_database
+    
+    app = server.app.wsgi()
+    with app.app_context():
+        if bootstrap_database():
+            server.log.info("Created default admin user")
+        server.log.info("Database schema is up to date")
+        # Don't hand the master's pooled connections down to forked workers
+        db.engine.dispose()
+
+def post_fork(server, worker):
+    """Start each worker with a fresh connection pool, and without live streams"""
+    from app import db
+    
+    app = server.app.wsgi()
+    with app.app_context():
+        db.engine.dispose(close=False)
+    # A stream would hold one of the worker's few threads for minutes; the gevent
+    # live server (gunicorn.live.conf.py) serves them instead
+    app.config['LIVE_STREAMS_ENABLED'] = False
+
+def worker_exit(server, worker):
+    """Write the worker's final metric totals before it exits"""
+    from app.telemetry import flush
+    
+    flush(os.environ['METRICS_DIR'])
+
+def child_exit(server, worker):
+    """Fold an exited worker's metrics into the archive (runs in the master)"""
+    from app.telemetry import retire_worker
+    
+    retire_worker(os.environ['METRICS_DIR'], worker.pid)
@@ -0,0 +1,47 @@
+"""
+Gunicorn settings for Medora's live update server (server-sent event streams).
+
+    gunicorn -c gunicorn.live.conf.py wsgi:app
+
+Streams are long-lived and mostly idle, so they get their own server whose gevent
+workers hold one greenlet per stream, instead of tying up the gthread workers of
+gunicorn.conf.py (which turn /api/live/stream away). Route /api/live/ to this
+server at the reverse proxy. Change events reach it through the live_events table,
+whichever worker made the change, so it needs the same DATABASE_URL and JWT_SECRET_KEY.
+
+Every value can be overridden from the environment.
+"""
+
+import os
+
+bind = os.environ.get('LIVE_BIND', '0.0.0.0:8001')
+
+workers = int(os.environ.get('LIVE_WORKERS', 1))
+worker_class = 'gevent'
+# Concurrent connections per worker; LIVE_MAX_STREAMS caps the streams among them
+worker_connections = int(os.environ.get('LIVE_WORKER_CONNECTIONS', 1000))
+
+# gevent patches the standard library as each worker starts, so the app must be
+# imported after that, in the worker
+preload_app = False
+
+graceful_timeout = int(os.environ.get('GRACEFUL_TIMEOUT', 30))
+timeout = int(os.environ.get('WORKER_TIMEOUT', 60))
+keepalive = 5
+
+accesslog = os.environ.get('ACCESS_LOG', '-')
+errorlog = '-'
+
+def worker_exit(server, worker):
+    """Write the worker's final metric totals before it exits (when metrics are shared)"""
+    from app.telemetry import flush
+    
+    if os.environ.get('METRICS_DIR'):
+        flush(os.environ['METRICS_DIR'])
+
+def child_exit(server, worker):
+    """Fold an exited worker's metrics into the archive (runs in the master)"""
+    from app.telemetry import retire_worker
+    
+    if os.environ.get('METRICS_DIR'):
+        retire_worker(os.environ['METRICS_DIR'], worker.pid)
@@ -0,0 +1,252 @@
+"""declare index set and bring existing databases up to the models
+
+Idempotent baseline: databases created by database_setup.sql, setup_database.py
+or db.create_all() are inspected and only what is missing gets created (tables,
+appointments.doctor_id and indexes). An index is considered present when one with
+the same name or the same column list already exists.
+
+The schema is spelled out here as it stood at this revision, so later model edits
+need their own revisions.
+
+Revision ID: 3f2a9c1d7b64
+Revises:
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c1d7b64'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _timestamps():
+    return [sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True)]
+
+
+# Tables in dependency order: name -> function creating it
+TABLES = {
+    'users': lambda: op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(length=80), nullable=False),
+        sa.Column('email', sa.String(length=120), nullable=False),
+        sa.Column('password_hash', sa.String(length=255), nullable=False),
+        sa.Column('first_name', sa.String(length=50), nullable=False),
+        sa.Column('last_name', sa.String(length=50), nullable=False),
+        sa.Column('phone', sa.String(length=20), nullable=True),
+        sa.Column('role', sa.String(length=20), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        *_timestamps(),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('username'),
+        sa.UniqueConstraint('email')
+    ),
+    'patients': lambda: op.create_table(
+        'patients',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('patient_id', sa.String(length=20), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('first_name', sa.String(length=50), nullable=False),
+        sa.Column('last_name', sa.String(length=50), nullable=False),
+        sa.Column('date_of_birth', sa.Date(), nullable=False),
+        sa.Column('age', sa.Integer(), nullable=True),
+        sa.Column('gender', sa.String(length=10), nullable=False),
+        sa.Column('phone', sa.String(length=20), nullable=True),
+        sa.Column('email', sa.String(length=120), nullable=True),
+        sa.Column('address', sa.Text(), nullable=True),
+        sa.Column('medical_history', sa.Text(), nullable=True),
+        sa.Column('current_medications', sa.Text(), nullable=True),
+        sa.Column('allergies', sa.Text(), nullable=True),
+        sa.Column('blood_type', sa.String(length=5), nullable=True),
+        sa.Column('height', sa.Float(), nullable=True),
+        sa.Column('weight', sa.Float(), nullable=True),
+        sa.Column('emergency_contact_name', sa.String(length=100), nullable=True),
+        sa.Column('emergency_contact_phone', sa.String(length=20), nullable=True),
+        sa.Column('emergency_contact_relationship', sa.String(length=50), nullable=True),
+        sa.Column('insurance_provider', sa.String(length=100), nullable=True),
+        sa.Column('insurance_number', sa.String(length=50), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        *_timestamps(),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('patient_id')
+    ),
+    'appointments': lambda: op.create_table(
+        'appointments',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('patient_id', sa.Integer(), nullable=False),
+        sa.Column('doctor_id', sa.Integer(), nullable=True),
+        sa.Column('doctor_name', sa.String(length=100), nullable=False),
+        sa.Column('appointment_date', sa.DateTime(), nullable=False),
+        sa.Column('appointment_type', sa.String(length=50), nullable=True),
+        sa.Column('symptoms', sa.Text(), nullable=True),
+        sa.Column('diagnosis', sa.Text(), nullable=True),
+        sa.Column('prescription', sa.Text(), nullable=True),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        *_timestamps(),
+        sa.ForeignKeyConstraint(['patient_id'], ['patients.id']),
+        sa.ForeignKeyConstraint(['doctor_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    ),
+    'notifications': lambda: op.create_table(
+        'notifications',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('patient_id', sa.Integer(), nullable=True),
+        sa.Column('appointment_id', sa.Integer(), nullable=True),
+        sa.Column('type', sa.String(length=30), nullable=False),
+        sa.Column('message', sa.String(length=255), nullable=False),
+        sa.Column('priority', sa.String(length=10), nullable=True),
+        sa.Column('event_date', sa.DateTime(), nullable=True),
+        sa.Column('due_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['patient_id'], ['patients.id']),
+        sa.ForeignKeyConstraint(['appointment_id'], ['appointments.id']),
+        sa.PrimaryKeyConstraint('id')
+    ),
+    'waitlist_entries': lambda: op.create_table(
+        'waitlist_entries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('doctor_id', sa.Integer(), nullable=False),
+        sa.Column('patient_id', sa.Integer(), nullable=False),
+        sa.Column('window_start', sa.DateTime(), nullable=False),
+        sa.Column('window_end', sa.DateTime(), nullable=False),
+        sa.Column('priority', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('offered_slot', sa.DateTime(), nullable=True),
+        sa.Column('offered_at', sa.DateTime(), nullable=True),
+        sa.Column('appointment_id', sa.Integer(), nullable=True),
+        *_timestamps(),
+        sa.ForeignKeyConstraint(['doctor_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['patient_id'], ['patients.id']),
+        sa.ForeignKeyConstraint(['appointment_id'], ['appointments.id']),
+        sa.PrimaryKeyConstraint('id')
+    ),
+    'stat_counters': lambda: op.create_table(
+        'stat_counters',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('dimension', sa.String(length=30), nullable=False),
+        sa.Column('bucket', sa.String(length=30), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('user_id', 'dimension', 'bucket')
+    ),
+    'daily_registrations': lambda: op.create_table(
+        'daily_registrations',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('user_id', 'day')
+    ),
+    'daily_appointments': lambda: op.create_table(
+        'daily_appointments',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('user_id', 'day', 'status')
+    ),
+    'daily_doctor_appointments': lambda: op.create_table(
+        'daily_doctor_appointments',
+        sa.Column('doctor_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['doctor_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('doctor_id', 'day', 'status')
+    ),
+    'rollup_watermarks': lambda: op.create_table(
+        'rollup_watermarks',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('watermark', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('name')
+    ),
+    'rollup_dirty_days': lambda: op.create_table(
+        'rollup_dirty_days',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    ),
+}
+
+# (index name, table, columns)
+INDEXES = [
+    ('idx_users_role', 'users', ['role']),
+    ('idx_users_is_active', 'users', ['is_active']),
+    ('idx_users_created_at', 'users', ['created_at']),
+    ('idx_patients_user_active_created', 'patients', ['user_id', 'is_active', 'created_at']),
+    ('idx_patients_name', 'patients', ['first_name', 'last_name']),
+    ('idx_patients_date_of_birth', 'patients', ['date_of_birth']),
+    ('idx_patients_gender', 'patients', ['gender']),
+    ('idx_patients_is_active', 'patients', ['is_active']),
+    ('idx_patients_created_at', 'patients', ['created_at']),
+    ('idx_appointments_doctor_date', 'appointments', ['doctor_id', 'appointment_date']),
+    ('idx_appointments_patient_date', 'appointments', ['patient_id', 'appointment_date']),
+    ('idx_appointments_date', 'appointments', ['appointment_date']),
+    ('idx_appointments_doctor_name', 'appointments', ['doctor_name']),
+    ('idx_appointments_status', 'appointments', ['status']),
+    ('idx_notifications_user_due', 'notifications', ['user_id', 'due_at']),
+    ('idx_notifications_appointment', 'notifications', ['appointment_id']),
+    ('idx_notifications_patient', 'notifications', ['patient_id']),
+    ('idx_waitlist_doctor_status', 'waitlist_entries', ['doctor_id', 'status']),
+    ('idx_waitlist_patient', 'waitlist_entries', ['patient_id']),
+    ('idx_daily_registrations_day', 'daily_registrations', ['day']),
+    ('idx_daily_appointments_day', 'daily_appointments', ['day']),
+    ('idx_daily_doctor_appointments_day', 'daily_doctor_appointments', ['day']),
+]
+
+
+def _existing_indexes(inspector, table_name):
+    names = set()
+    columns = set()
+    for index in inspector.get_indexes(table_name):
+        names.add(index['name'])
+        columns.add(tuple(index['column_names']))
+    for constraint in inspector.get_unique_constraints(table_name):
+        names.add(constraint['name'])
+        columns.add(tuple(constraint['column_names']))
+    return names, columns
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    
+    # Tables added since the database was set up
+    for name, create in TABLES.items():
+        if name not in existing_tables:
+            create()
+    
+    if 'appointments' in existing_tables:
+        columns = {column['name'] for column in inspector.get_columns('appointments')}
+        if 'doctor_id' not in columns:
+            with op.batch_alter_table('appointments') as batch_op:
+                batch_op.add_column(sa.Column('doctor_id', sa.Integer(), nullable=True))
+                batch_op.create_foreign_key('fk_appointments_doctor', 'users', ['doctor_id'], ['id'])
+    
+    inspector = sa.inspect(bind)
+    for name, table_name, columns in INDEXES:
+        names, covered = _existing_indexes(inspector, table_name)
+        if name in names or tuple(columns) in covered:
+            continue
+        op.create_index(name, table_name, columns, unique=False)
+
+
+def downgrade():
+    # Baseline revision: the indexes and columns it may have added can back foreign
+    # keys and existed before on most databases, so nothing is dropped
+    pass
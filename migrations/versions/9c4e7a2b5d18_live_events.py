@@ -0,0 +1,38 @@
+"""live_events outbox for the live update server
+
+Revision ID: 9c4e7a2b5d18
+Revises: 3f2a9c1d7b64
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4e7a2b5d18'
+down_revision = '3f2a9c1d7b64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created by db.create_all() or the setup scripts may already have it
+    if 'live_events' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'live_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('event', sa.String(length=30), nullable=False),
+        sa.Column('user_ids', sa.Text(), nullable=False),
+        sa.Column('private', sa.Boolean(), nullable=True),
+        sa.Column('data', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_live_events_created_at', 'live_events', ['created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_live_events_created_at', table_name='live_events')
+    op.drop_table('live_events')
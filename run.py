@@ -1,27 +1,14 @@
 from app import create_app, db
-from app.models import User, Patient, Appointment
+from app.bootstrap import bootstrap_database
 
 def init_database():
     """Initialize database tables"""
     try:
         print("🔧 Initializing database...")
-        db.create_all()
-        print("✅ Database tables created successfully!")
-        
-        # Check if admin user exists
-        admin_user = User.query.filter_by(username='admin').first()
-        if not admin_user:
-            # Create admin user
-            admin_user = User(
-                username='admin',
-                email='admin@medora.com',
-                password='Admin123!',
-                first_name='Admin',
-                last_name='User',
-                role='admin'
-            )
-            db.session.add(admin_user)
-            db.session.commit()
+        # Migrations create missing tables, columns and indexes (db.create_all() skips indexes on existing tables)
+        admin_created = bootstrap_database()
+        print("✅ Database schema is up to date!")
+        if admin_created:
             print("✅ Admin user created successfully")
         else:
             print("✅ Admin user already exists")
@@ -54,7 +41,7 @@ def main():
     print("⏹️  Press Ctrl+C to stop the server")
     print("=" * 60)
     
-    # Run the application
+    # Run the development server (production: `flask serve` or `gunicorn -c gunicorn.conf.py wsgi:app`)
     app.run(host='0.0.0.0', port=5000, debug=True)
 
 if __name__ == "__main__":
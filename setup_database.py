@@ -84,6 +84,7 @@ def create_database():
             CREATE TABLE IF NOT EXISTS appointments (
                 id INT AUTO_INCREMENT PRIMARY KEY,
                 patient_id INT NOT NULL,
+                doctor_id INT,
                 doctor_name VARCHAR(100) NOT NULL,
                 appointment_date DATETIME NOT NULL,
                 appointment_type VARCHAR(50),
@@ -94,7 +95,131 @@ def create_database():
                 status VARCHAR(20) DEFAULT 'scheduled',
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                FOREIGN KEY (patient_id) REFERENCES patients(id) ON DELETE CASCADE
+                FOREIGN KEY (patient_id) REFERENCES patients(id) ON DELETE CASCADE,
+                FOREIGN KEY (doctor_id) REFERENCES users(id),
+                INDEX idx_appointments_doctor_date (doctor_id, appointment_date)
+            )
+        """)
+        
+        # Create notifications table
+        print("Creating notifications table...")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS notifications (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                user_id INT NOT NULL,
+                patient_id INT,
+                appointment_id INT,
+                type VARCHAR(30) NOT NULL,
+                message VARCHAR(255) NOT NULL,
+                priority VARCHAR(10) DEFAULT 'medium',
+                event_date DATETIME,
+                due_at DATETIME NOT NULL,
+                expires_at DATETIME,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+                FOREIGN KEY (patient_id) REFERENCES patients(id) ON DELETE CASCADE,
+                FOREIGN KEY (appointment_id) REFERENCES appointments(id) ON DELETE CASCADE,
+                INDEX idx_notifications_user_due (user_id, due_at)
+            )
+        """)
+        
+        # Create waitlist table
+        print("Creating waitlist table...")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS waitlist_entries (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                doctor_id INT NOT NULL,
+                patient_id INT NOT NULL,
+                window_start DATETIME NOT NULL,
+                window_end DATETIME NOT NULL,
+                priority INT DEFAULT 0,
+                status VARCHAR(20) DEFAULT 'waiting',
+                offered_slot DATETIME,
+                offered_at DATETIME,
+                appointment_id INT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                FOREIGN KEY (doctor_id) REFERENCES users(id) ON DELETE CASCADE,
+                FOREIGN KEY (patient_id) REFERENCES patients(id) ON DELETE CASCADE,
+                FOREIGN KEY (appointment_id) REFERENCES appointments(id) ON DELETE SET NULL,
+                INDEX idx_waitlist_doctor_status (doctor_id, status),
+                INDEX idx_waitlist_patient (patient_id)
+            )
+        """)
+        
+        # Create statistics counters table
+        print("Creating statistics counters table...")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS stat_counters (
+                user_id INT NOT NULL,
+                dimension VARCHAR(30) NOT NULL,
+                bucket VARCHAR(30) NOT NULL,
+                count INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, dimension, bucket),
+                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+            )
+        """)
+        
+        # Create daily rollup tables
+        print("Creating daily rollup tables...")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS daily_registrations (
+                user_id INT NOT NULL,
+                day DATE NOT NULL,
+                count INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, day),
+                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+                INDEX idx_daily_registrations_day (day)
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS daily_appointments (
+                user_id INT NOT NULL,
+                day DATE NOT NULL,
+                status VARCHAR(20) NOT NULL,
+                count INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, day, status),
+                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+                INDEX idx_daily_appointments_day (day)
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS daily_doctor_appointments (
+                doctor_id INT NOT NULL,
+                day DATE NOT NULL,
+                status VARCHAR(20) NOT NULL,
+                count INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (doctor_id, day, status),
+                FOREIGN KEY (doctor_id) REFERENCES users(id) ON DELETE CASCADE,
+                INDEX idx_daily_doctor_appointments_day (day)
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS rollup_watermarks (
+                name VARCHAR(50) PRIMARY KEY,
+                watermark DATETIME,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS rollup_dirty_days (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                day DATE NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        # Create live events table (change events relayed to the live update server)
+        print("Creating live events table...")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS live_events (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                event VARCHAR(30) NOT NULL,
+                user_ids TEXT NOT NULL,
+                private BOOLEAN DEFAULT FALSE,
+                data TEXT NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                INDEX idx_live_events_created_at (created_at)
             )
         """)
         
@@ -120,6 +245,22 @@ def create_database():
             cursor.execute("CREATE INDEX idx_appointment_date ON appointments(appointment_date)")
         except:
             pass  # Index might already exist
+        try:
+            cursor.execute("CREATE INDEX idx_patients_created_at ON patients(created_at)")
+        except:
+            pass  # Index might already exist
+        try:
+            cursor.execute("CREATE INDEX idx_patients_user_active_created ON patients(user_id, is_active, created_at)")
+        except:
+            pass  # Index might already exist
+        try:
+            cursor.execute("CREATE INDEX idx_appointments_patient_date ON appointments(patient_id, appointment_date)")
+        except:
+            pass  # Index might already exist
+        try:
+            cursor.execute("CREATE INDEX idx_users_created_at ON users(created_at)")
+        except:
+            pass  # Index might already exist
         
         # Insert default admin user (password: Admin123!)
         print("Creating default admin user...")
@@ -0,0 +1,113 @@
+"""Dashboard statistics: the single-statement aggregate path and the source switch."""
+
+import os
+import sys
+from datetime import datetime, date, timedelta
+
+import pytest
+from flask import g
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models import User, Patient, Appointment
+from app.query_monitor import QueryStats
+from app.counters import rebuild_counters
+from app import dashboard
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """Application on a scratch SQLite file seeded with one doctor's patients and appointments"""
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'medora.db'}")
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        seed()
+        dashboard.statistics_cache.clear()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+def seed():
+    """Patients cover every gender, a few blood types and age bands; one inactive patient is ignored"""
+    now = datetime.now()
+    today = date.today()
+    db.session.execute(User.__table__.insert(), [{
+        'username': 'doctor', 'email': 'doctor@medora.local', 'password_hash': 'x',
+        'first_name': 'Doc', 'last_name': 'Tor', 'role': 'doctor', 'is_active': True,
+        'created_at': now, 'updated_at': now
+    }])
+    patients = [
+        ('Male', 'A+', 10, True, 5),
+        ('Female', 'O-', 25, True, 40),
+        ('Female', 'O-', 40, True, 70),
+        ('Other', None, 70, True, 300),
+        ('Male', 'B+', 55, False, 10),
+    ]
+    db.session.execute(Patient.__table__.insert(), [{
+        'patient_id': f'TEST{i:06d}', 'user_id': 1, 'first_name': f'First{i}', 'last_name': f'Last{i}',
+        'date_of_birth': today - timedelta(days=365 * age + 30), 'gender': gender, 'blood_type': blood_type,
+        'is_active': is_active, 'created_at': now - timedelta(days=days_ago), 'updated_at': now
+    } for i, (gender, blood_type, age, is_active, days_ago) in enumerate(patients)])
+    appointments = [(1, 'scheduled'), (1, 'completed'), (2, 'cancelled'), (3, 'scheduled'), (5, 'scheduled')]
+    db.session.execute(Appointment.__table__.insert(), [{
+        'patient_id': patient_id, 'doctor_id': 1, 'doctor_name': 'Dr. Doc Tor',
+        'appointment_date': now + timedelta(days=i + 1), 'status': status,
+        'created_at': now, 'updated_at': now
+    } for i, (patient_id, status) in enumerate(appointments)])
+    rebuild_counters()
+    db.session.commit()
+
+def count_statements(app, fn):
+    """Run fn inside a request and return (result, SQL statements it executed)"""
+    with app.test_request_context():
+        g.query_stats = QueryStats()
+        result = fn()
+        return result, g.query_stats.count
+
+def test_aggregate_statistics_run_one_statement(app):
+    statistics, statements = count_statements(app, lambda: dashboard.aggregate_dashboard_statistics(1))
+    
+    assert statements == 1
+    assert statistics['total_patients'] == 4
+    assert statistics['total_appointments'] == 4
+    assert statistics['gender_distribution'] == {'Male': 1, 'Female': 2, 'Other': 1}
+    assert statistics['blood_type_distribution'] == {'A+': 1, 'O-': 2}
+    assert statistics['age_distribution'] == {'0-17': 1, '18-29': 1, '30-49': 1, '65+': 1}
+    assert statistics['appointment_status_distribution'] == {'scheduled': 2, 'completed': 1, 'cancelled': 1}
+    assert sum(statistics['monthly_registrations'].values()) == 3
+
+def test_aggregate_statistics_match_counters(app):
+    assert dashboard.aggregate_dashboard_statistics(1) == dashboard.compute_dashboard_statistics(1)
+
+def test_unknown_values_are_broken_down_separately(app):
+    Appointment.query.filter(Appointment.id == 1).update({'status': 'Scheduled'})
+    db.session.commit()
+    
+    statistics, statements = count_statements(app, lambda: dashboard.aggregate_dashboard_statistics(1))
+    
+    assert statements == 2
+    assert statistics['appointment_status_distribution'] == {
+        'scheduled': 1, 'Scheduled': 1, 'completed': 1, 'cancelled': 1
+    }
+
+@pytest.mark.parametrize('source, used', [('aggregate', 'aggregate'), ('counters', 'counters')])
+def test_stats_source_selects_the_compute_path(app, monkeypatch, source, used):
+    calls = []
+    monkeypatch.setattr(dashboard, 'aggregate_dashboard_statistics', lambda user_id: calls.append('aggregate') or {})
+    monkeypatch.setattr(dashboard, 'compute_dashboard_statistics', lambda user_id: calls.append('counters') or {})
+    app.config['DASHBOARD_STATS_SOURCE'] = source
+    
+    dashboard.get_dashboard_statistics(1)
+    
+    assert calls == [used]
+
+def test_aggregate_source_serves_the_dashboard(app):
+    app.config['DASHBOARD_STATS_SOURCE'] = 'aggregate'
+    
+    statistics, statements = count_statements(app, lambda: dashboard.get_dashboard_statistics(1))
+    
+    # The counter version read for the cache, then the aggregate statement
+    assert statements == 2
+    assert statistics['total_patients'] == 4
+    assert dashboard.get_dashboard_statistics(1) is statistics
@@ -0,0 +1,13 @@
+"""
+WSGI entry point for production servers.
+
+    gunicorn -c gunicorn.conf.py wsgi:app      # or: flask --app wsgi serve
+    gunicorn -c gunicorn.live.conf.py wsgi:app # live update streams (gevent workers)
+
+The app is created once here; with preload_app the master imports this module
+before forking, so workers share the loaded code.
+"""
+
+from app import create_app
+
+app = create_app()